@@ -0,0 +1,394 @@
+"""
+Векторизованный движок, который ведёт тысячи партий одновременно.
+
+K досок хранятся одним массивом ``(K, 10, 10)`` типа uint8. Один вызов
+:meth:`BatchEngine.fire` применяет вектор выстрелов ко всем доскам сразу:
+маски попаданий, потопления и пометка клеток вокруг потопленных кораблей
+(как в ``utils.mark_around_sunk``) считаются операциями над массивами.
+:meth:`BatchEngine.choose` стреляет как режим "classic"
+(``strategies.HuntStrategy``): вслепую, а после попадания — добивание
+с запоминанием направления, отказом от направления после промаха и
+продолжением линии после второго попадания. Состояние добивания каждой
+доски хранится в массивах, и все доски обновляются одними операциями,
+поэтому статистика пакета совпадает со статистикой режима "classic".
+
+Модуль требует NumPy; это необязательная зависимость, остальная игра
+работает без неё.
+"""
+
+import argparse
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy — необязательная зависимость
+    np = None
+
+from fleet import generate_fleets
+from strategies import DIRECTIONS
+
+EMPTY = 0
+SHIP = 1
+HIT = 2
+MISS = 3
+
+_CODES = {"~": EMPTY, "S": SHIP, "X": HIT, "O": MISS}
+_CHARS = "~SXO"
+
+
+def _require_numpy():
+    """
+    Проверяет, что NumPy установлен.
+
+    :raises ImportError: Если NumPy не установлен.
+    """
+    if np is None:
+        raise ImportError("Для пакетного движка нужен NumPy: pip install numpy")
+
+
+def _shift(mask, dr, dc):
+    """
+    Сдвигает маски ``(K, H, W)`` на (dr, dc) без переноса через края.
+
+    :rtype: numpy.ndarray
+    """
+    out = np.zeros_like(mask)
+    h, w = mask.shape[1:]
+    out[:, max(dr, 0):h + min(dr, 0), max(dc, 0):w + min(dc, 0)] = \
+        mask[:, max(-dr, 0):h + min(-dr, 0), max(-dc, 0):w + min(-dc, 0)]
+    return out
+
+
+def _neighbourhood(mask):
+    """
+    Расширяет маски на восемь соседей каждой клетки.
+
+    :rtype: numpy.ndarray
+    """
+    rows = mask | _shift(mask, 0, 1) | _shift(mask, 0, -1)
+    return rows | _shift(rows, 1, 0) | _shift(rows, -1, 0)
+
+
+class BatchEngine:
+    """
+    Пакет из K партий, которые обрабатываются одновременно.
+
+    :ivar cells: Состояние клеток: ``EMPTY``, ``SHIP``, ``HIT`` или ``MISS``.
+    :vartype cells: numpy.ndarray
+    :ivar labels: Номер корабля в каждой клетке (индекс его первой клетки) или -1.
+    :vartype labels: numpy.ndarray
+    :ivar hp: Число целых клеток корабля для каждой доски и номера корабля.
+    :vartype hp: numpy.ndarray
+    :ivar alive: Число непотопленных кораблей на каждой доске.
+    :vartype alive: numpy.ndarray
+    :ivar shots: Число выстрелов по каждой доске.
+    :vartype shots: numpy.ndarray
+    :ivar hunting: Идёт ли на доске добивание подбитого корабля.
+    :vartype hunting: numpy.ndarray
+    :ivar last_hit: Строка и столбец последнего попадания, форма ``(K, 2)``.
+    :vartype last_hit: numpy.ndarray
+    :ivar directions: Направления (индексы в ``DIRECTIONS``), которые ещё стоит
+                      проверить, в порядке проверки; -1 — вычеркнутое направление.
+    :vartype directions: numpy.ndarray
+    :ivar current: Направление последнего выстрела добивания или -1.
+    :vartype current: numpy.ndarray
+    """
+
+    def __init__(self, cells):
+        """
+        Конструктор класса BatchEngine.
+
+        :param cells: Массив ``(K, H, W)`` с кодами клеток.
+        :type cells: numpy.ndarray
+        :raises ImportError: Если NumPy не установлен.
+        :raises ValueError: Если массив не трёхмерный.
+        """
+        _require_numpy()
+        cells = np.array(cells, dtype=np.uint8)
+        if cells.ndim != 3:
+            raise ValueError("Ожидается массив досок формы (K, H, W)")
+        self.cells = cells
+        k, h, w = cells.shape
+
+        # Разметка связных кораблей: каждая клетка получает минимальный
+        # индекс клетки своего корабля, распространяемый по соседям.
+        ships = (cells == SHIP) | (cells == HIT)
+        none = h * w
+        labels = np.where(ships, np.arange(h * w, dtype=np.int32).reshape(1, h, w), none)
+        while True:
+            best = labels.copy()
+            for dr, dc in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                shifted = np.full_like(labels, none)
+                shifted[:, max(dr, 0):h + min(dr, 0), max(dc, 0):w + min(dc, 0)] = \
+                    labels[:, max(-dr, 0):h + min(-dr, 0), max(-dc, 0):w + min(-dc, 0)]
+                best = np.minimum(best, np.where(ships, shifted, none))
+            if np.array_equal(best, labels):
+                break
+            labels = best
+        self.labels = np.where(ships, labels, -1)
+
+        self.hp = np.zeros((k, h * w), dtype=np.int16)
+        boards, flat = np.nonzero((cells == SHIP).reshape(k, -1))
+        np.add.at(self.hp, (boards, self.labels.reshape(k, -1)[boards, flat]), 1)
+        self.alive = np.count_nonzero(self.hp, axis=1)
+        self.shots = np.zeros(k, dtype=np.int32)
+
+        self.hunting = np.zeros(k, dtype=bool)
+        self.last_hit = np.zeros((k, 2), dtype=np.int32)
+        self.directions = np.full((k, len(DIRECTIONS)), -1, dtype=np.int8)
+        self.current = np.full(k, -1, dtype=np.int8)
+        # Клетки, выбранные последним choose(); выстрел в другую сбрасывает направление.
+        self._chosen = None
+
+    @classmethod
+    def from_boards(cls, boards):
+        """
+        Создаёт движок из списка досок в формате списков символов.
+
+        :param boards: Игровые доски.
+        :type boards: Iterable[list[list[str]]]
+        :rtype: BatchEngine
+        """
+        _require_numpy()
+        return cls([[[_CODES[cell] for cell in row] for row in board] for board in boards])
+
+    @classmethod
+    def from_masks(cls, masks, width=10, height=10):
+        """
+        Создаёт движок из битовых масок кораблей (см. ``bitboard``).
+
+        :param masks: Маски кораблей, по одной на партию.
+        :type masks: Iterable[int]
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        :rtype: BatchEngine
+        """
+        _require_numpy()
+        cells = width * height
+        nbytes = (cells + 7) // 8
+        raw = b"".join(mask.to_bytes(nbytes, "little") for mask in masks)
+        packed = np.frombuffer(raw, dtype=np.uint8).reshape(-1, nbytes)
+        bits = np.unpackbits(packed, axis=1, bitorder="little")[:, :cells]
+        return cls(bits.reshape(-1, height, width) * SHIP)
+
+    @classmethod
+    def random(cls, count, rng=None):
+        """
+        Создаёт движок с ``count`` случайными расстановками флота.
+
+        :param count: Количество партий.
+        :type count: int
+        :param rng: Генератор случайных чисел для расстановок.
+        :type rng: random.Random | None
+        :rtype: BatchEngine
+        """
+        _require_numpy()
+        return cls.from_masks(generate_fleets(count, rng=rng))
+
+    def board(self, i):
+        """
+        Возвращает i-ю доску в формате списков символов.
+
+        :rtype: list[list[str]]
+        """
+        return [[_CHARS[cell] for cell in row] for row in self.cells[i].tolist()]
+
+    @property
+    def done(self):
+        """
+        Маска партий, в которых все корабли потоплены.
+
+        :rtype: numpy.ndarray
+        """
+        return self.alive == 0
+
+    def fire(self, rows, cols, active=None):
+        """
+        Применяет по одному выстрелу к каждой доске.
+
+        :param rows: Строки выстрелов, форма ``(K,)``.
+        :type rows: numpy.ndarray
+        :param cols: Столбцы выстрелов, форма ``(K,)``.
+        :type cols: numpy.ndarray
+        :param active: Маска досок, по которым стреляют (по умолчанию — все незаконченные).
+        :type active: numpy.ndarray | None
+        :returns: Кортеж масок (hit, sunk) формы ``(K,)``.
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        k = self.cells.shape[0]
+        idx = np.arange(k)
+        if active is None:
+            active = ~self.done
+        rows = np.asarray(rows)
+        cols = np.asarray(cols)
+
+        current = self.cells[idx, rows, cols]
+        hit = active & (current == SHIP)
+        miss = active & (current == EMPTY)
+        self.shots += active & ((current == SHIP) | (current == EMPTY))
+
+        self.cells[idx[miss], rows[miss], cols[miss]] = MISS
+        self.cells[idx[hit], rows[hit], cols[hit]] = HIT
+
+        labels = self.labels[idx, rows, cols]
+        hit_boards = idx[hit]
+        self.hp[hit_boards, labels[hit]] -= 1
+        sunk = np.zeros(k, dtype=bool)
+        sunk[hit_boards] = self.hp[hit_boards, labels[hit]] == 0
+        self.alive -= sunk
+
+        if sunk.any():
+            boards = idx[sunk]
+            ship = self.labels[boards] == labels[sunk][:, None, None]
+            halo = _neighbourhood(ship) & (self.cells[boards] == EMPTY)
+            self.cells[boards] = np.where(halo, MISS, self.cells[boards])
+
+        self._update(rows, cols, active & ~hit, hit, sunk)
+        return hit, sunk
+
+    def _reset(self, boards):
+        """
+        Заканчивает добивание на досках ``boards``.
+
+        :param boards: Маска досок формы ``(K,)``.
+        :type boards: numpy.ndarray
+        """
+        self.hunting[boards] = False
+        self.directions[boards] = -1
+        self.current[boards] = -1
+
+    def _update(self, rows, cols, miss, hit, sunk):
+        """
+        Продолжает или заканчивает добивание по результатам выстрелов,
+        как ``HuntStrategy.update``.
+
+        :param rows: Строки выстрелов, форма ``(K,)``.
+        :type rows: numpy.ndarray
+        :param cols: Столбцы выстрелов, форма ``(K,)``.
+        :type cols: numpy.ndarray
+        :param miss: Маска промахов.
+        :type miss: numpy.ndarray
+        :param hit: Маска попаданий.
+        :type hit: numpy.ndarray
+        :param sunk: Маска потоплений.
+        :type sunk: numpy.ndarray
+        """
+        if self._chosen is None:
+            self.current[:] = -1
+        else:
+            chosen_rows, chosen_cols = self._chosen
+            self.current[(rows != chosen_rows) | (cols != chosen_cols)] = -1
+        self._chosen = None
+
+        # Промах вычёркивает направление, в котором стреляли.
+        missed = miss & (self.current >= 0)
+        self.directions[missed] = np.where(
+            self.directions[missed] == self.current[missed, None], -1, self.directions[missed]
+        )
+        self.current[miss] = -1
+
+        # Первое попадание: направления перемешает choose().
+        first = hit & ~self.hunting
+        self.hunting |= first
+        self.directions[first] = -1
+        self.current[first] = -1
+        # Второе попадание в том же направлении: дальше только по линии, вперёд и назад.
+        line = hit & ~first & (self.current >= 0)
+        forward = self.current[line]
+        self.directions[line] = -1
+        self.directions[line, 0] = forward
+        self.directions[line, 1] = (forward + 2) % len(DIRECTIONS)
+        self.last_hit[hit, 0] = rows[hit]
+        self.last_hit[hit, 1] = cols[hit]
+        self._reset(sunk)
+
+    def choose(self, rng):
+        """
+        Выбирает выстрел для каждой доски, как ``HuntStrategy.choose``.
+
+        При добивании проверяются оставшиеся направления от последнего
+        попадания по порядку, и выстрел идёт в первую непроверенную
+        соседнюю клетку; если направления кончились, все четыре заново
+        перемешиваются. Если ни одна соседняя клетка не подходит,
+        добивание заканчивается. Без добивания выбирается случайная
+        непроверенная клетка доски.
+
+        :param rng: Генератор NumPy (``numpy.random.default_rng``).
+        :type rng: numpy.random.Generator
+        :returns: Кортеж массивов (rows, cols) формы ``(K,)``.
+        :rtype: tuple[numpy.ndarray, numpy.ndarray]
+        """
+        k, h, w = self.cells.shape
+        idx = np.arange(k)
+        open_cells = (self.cells == EMPTY) | (self.cells == SHIP)
+
+        empty = self.hunting & (self.directions < 0).all(axis=1)
+        if empty.any():
+            self.directions[empty] = rng.random((int(empty.sum()), len(DIRECTIONS))).argsort(axis=1)
+
+        steps = np.array(DIRECTIONS)
+        valid = self.directions >= 0
+        picked = np.where(valid, self.directions, 0)
+        rows = self.last_hit[:, :1] + steps[picked, 0]
+        cols = self.last_hit[:, 1:] + steps[picked, 1]
+        inside = valid & (rows >= 0) & (rows < h) & (cols >= 0) & (cols < w)
+        fits = inside & open_cells[idx[:, None], rows.clip(0, h - 1), cols.clip(0, w - 1)]
+        fits &= self.hunting[:, None]
+        found = fits.any(axis=1)
+        slot = fits.argmax(axis=1)
+        self._reset(self.hunting & ~found)
+        self.current = np.where(found, self.directions[idx, slot], -1).astype(np.int8)
+
+        keys = rng.random((k, h * w))
+        keys[~open_cells.reshape(k, -1)] = -1.0
+        flat = keys.argmax(axis=1)
+        targets = (np.where(found, rows[idx, slot], flat // w), np.where(found, cols[idx, slot], flat % w))
+        self._chosen = targets
+        return targets
+
+    def play(self, rng, max_turns=None):
+        """
+        Доигрывает все партии пакета до конца.
+
+        :param rng: Генератор NumPy (``numpy.random.default_rng``).
+        :type rng: numpy.random.Generator
+        :param max_turns: Предел числа шагов (по умолчанию — число клеток доски).
+        :type max_turns: int | None
+        :returns: Число выстрелов до победы в каждой партии.
+        :rtype: numpy.ndarray
+        """
+        limit = max_turns or self.cells.shape[1] * self.cells.shape[2]
+        for _ in range(limit):
+            if self.done.all():
+                break
+            rows, cols = self.choose(rng)
+            self.fire(rows, cols)
+        return self.shots.copy()
+
+
+def main():
+    """
+    Измеряет скорость пакетного движка (партий в минуту).
+    """
+    _require_numpy()
+    parser = argparse.ArgumentParser(description="Пакетный прогон партий на NumPy")
+    parser.add_argument("-k", "--batch", type=int, default=10000, help="партий в пакете")
+    parser.add_argument("--seed", type=int, default=None, help="зерно генератора")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = BatchEngine.random(args.batch)
+    setup = time.perf_counter() - start
+    shots = engine.play(np.random.default_rng(args.seed))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{args.batch} партий: расстановка {setup:.2f} с, всего {elapsed:.2f} с, "
+        f"{args.batch / elapsed * 60:.0f} партий в минуту, "
+        f"в среднем {shots.mean():.1f} выстрелов"
+    )
+
+
+if __name__ == "__main__":
+    main()
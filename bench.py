@@ -0,0 +1,343 @@
+"""
+Набор замеров производительности для горячих путей игры.
+
+Микрозамеры покрывают функции ``utils`` и ``Game.computer_shot``,
+макрозамеры — целые партии компьютер против компьютера. Каждый замер —
+функция ``bench(n)``, которая сама готовит данные, выполняет ``n``
+операций и возвращает время, затраченное только на эти операции. Число
+операций подбирается так, чтобы один прогон длился не меньше
+``min_time``; результатом считается время одной операции (лучшее и
+медиана по нескольким прогонам).
+
+Результаты выводятся в JSON. Режим сравнения сверяет медианы с
+сохранённым эталоном и завершается с кодом 1, если какой-либо замер
+замедлился больше допустимого порога::
+
+    python3 bench.py -o baseline.json
+    python3 bench.py --compare baseline.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from game import COMPUTER, Game
+from simulate import play_game
+from utils import (auto_place_computer, can_place, count_ships, create_board, find_ship_cells,
+                   load_board, mark_around_sunk, save_board)
+
+FORMAT_VERSION = 1
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Регистрирует функцию замера под именем ``name``.
+
+    :param name: Имя замера в отчёте.
+    :type name: str
+    :rtype: Callable
+    """
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def _fleet_board():
+    """
+    Возвращает доску с фиксированной случайной расстановкой и клетку четырёхпалубника.
+
+    :rtype: tuple[list[list[str]], tuple[int, int]]
+    """
+    board = auto_place_computer(random.Random(1))
+    for r, row in enumerate(board):
+        for c, cell in enumerate(row):
+            if cell == "S" and len(find_ship_cells(board, r, c)) == 4:
+                return board, (r, c)
+    raise AssertionError("В расстановке нет четырёхпалубника")
+
+
+@benchmark("can_place")
+def bench_can_place(n):
+    board, _ = _fleet_board()
+    rng = random.Random(2)
+    probes = [(rng.randrange(10), rng.randrange(10), rng.randint(1, 4), rng.random() < 0.5)
+              for _ in range(256)]
+    probes = (probes * (n // len(probes) + 1))[:n]
+    start = time.perf_counter()
+    for row, col, size, horizontal in probes:
+        can_place(board, row, col, size, horizontal)
+    return time.perf_counter() - start
+
+
+@benchmark("find_ship_cells")
+def bench_find_ship_cells(n):
+    board, (row, col) = _fleet_board()
+    start = time.perf_counter()
+    for _ in range(n):
+        find_ship_cells(board, row, col)
+    return time.perf_counter() - start
+
+
+@benchmark("mark_around_sunk")
+def bench_mark_around_sunk(n):
+    board, (row, col) = _fleet_board()
+    for r, c in find_ship_cells(board, row, col):
+        board[r][c] = "X"
+    # Повторные вызовы ставят 'O' в те же клетки, поэтому доска не меняется.
+    start = time.perf_counter()
+    for _ in range(n):
+        mark_around_sunk(board, row, col)
+    return time.perf_counter() - start
+
+
+@benchmark("count_ships")
+def bench_count_ships(n):
+    board, _ = _fleet_board()
+    start = time.perf_counter()
+    for _ in range(n):
+        count_ships(board)
+    return time.perf_counter() - start
+
+
+@benchmark("auto_place_computer")
+def bench_auto_place_computer(n):
+    rng = random.Random(3)
+    start = time.perf_counter()
+    for _ in range(n):
+        auto_place_computer(rng)
+    return time.perf_counter() - start
+
+
+@benchmark("save_board")
+def bench_save_board(n):
+    board, _ = _fleet_board()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "board.txt")
+        start = time.perf_counter()
+        for _ in range(n):
+            save_board(board, path)
+        return time.perf_counter() - start
+
+
+@benchmark("load_board")
+def bench_load_board(n):
+    board, _ = _fleet_board()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "board.txt")
+        save_board(board, path)
+        start = time.perf_counter()
+        for _ in range(n):
+            load_board(path)
+        return time.perf_counter() - start
+
+
+def _bench_computer_shot(n, ai):
+    """
+    Замеряет ``n`` выстрелов компьютера; новые партии создаются вне замера.
+
+    :rtype: float
+    """
+    rng = random.Random(4)
+    elapsed = 0.0
+    left = n
+    while left:
+        game = Game(auto_place_computer(rng), create_board(), ai, rng.getrandbits(64))
+        start = time.perf_counter()
+        while left and game.player_fleet.alive:
+            game.computer_shot()
+            left -= 1
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+
+@benchmark("computer_shot.classic")
+def bench_computer_shot_classic(n):
+    return _bench_computer_shot(n, "classic")
+
+
+@benchmark("computer_shot.density")
+def bench_computer_shot_density(n):
+    return _bench_computer_shot(n, "density")
+
+
+def _bench_make_unmake(n, ai):
+    """
+    Замеряет ``n`` пар пробный ход компьютера + откат в середине партии.
+
+    :rtype: float
+    """
+    game = Game(auto_place_computer(random.Random(6)), ai=ai, seed=6)
+    game.turn = COMPUTER
+    for _ in range(20):
+        game.computer_shot()
+    game.turn = COMPUTER
+    start = time.perf_counter()
+    for _ in range(n):
+        game.make()
+        game.unmake()
+    return time.perf_counter() - start
+
+
+@benchmark("make_unmake.classic")
+def bench_make_unmake_classic(n):
+    return _bench_make_unmake(n, "classic")
+
+
+@benchmark("make_unmake.density")
+def bench_make_unmake_density(n):
+    return _bench_make_unmake(n, "density")
+
+
+def _bench_self_play(n, ai):
+    """
+    Замеряет ``n`` целых партий компьютер против компьютера, включая расстановку.
+
+    :rtype: float
+    """
+    rng = random.Random(5)
+    start = time.perf_counter()
+    for _ in range(n):
+        play_game(auto_place_computer(rng), auto_place_computer(rng), ai, rng.getrandbits(64))
+    return time.perf_counter() - start
+
+
+@benchmark("self_play.classic")
+def bench_self_play_classic(n):
+    return _bench_self_play(n, "classic")
+
+
+@benchmark("self_play.density")
+def bench_self_play_density(n):
+    return _bench_self_play(n, "density")
+
+
+def measure(func, min_time=0.2, repeat=5):
+    """
+    Выполняет один замер.
+
+    Число операций удваивается, пока прогон не займёт ``min_time``, затем
+    прогон повторяется ``repeat`` раз.
+
+    :param func: Функция замера ``bench(n)``.
+    :type func: Callable[[int], float]
+    :param min_time: Минимальная длительность одного прогона в секундах.
+    :type min_time: float
+    :param repeat: Число прогонов.
+    :type repeat: int
+    :returns: Словарь с числом операций и временем одной операции (best, median, mean).
+    :rtype: dict
+    """
+    n = 1
+    while func(n) < min_time:
+        n *= 2
+    times = [func(n) / n for _ in range(repeat)]
+    return {
+        "ops": n,
+        "repeat": repeat,
+        "best": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+    }
+
+
+def run_benchmarks(names=None, min_time=0.2, repeat=5):
+    """
+    Выполняет замеры и собирает отчёт.
+
+    :param names: Подстроки имён замеров для отбора (None — все замеры).
+    :type names: Iterable[str] | None
+    :param min_time: Минимальная длительность одного прогона в секундах.
+    :type min_time: float
+    :param repeat: Число прогонов каждого замера.
+    :type repeat: int
+    :returns: Отчёт, пригодный для сохранения в JSON.
+    :rtype: dict
+    """
+    names = list(names or [])
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = measure(func, min_time, repeat)
+    return {
+        "version": FORMAT_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "benchmarks": results,
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Сравнивает медианы замеров с эталоном.
+
+    Замеры, которых нет в одном из отчётов, пропускаются.
+
+    :param baseline: Эталонный отчёт.
+    :type baseline: dict
+    :param current: Текущий отчёт.
+    :type current: dict
+    :param threshold: Допустимое относительное замедление (0.2 — на 20%).
+    :type threshold: float
+    :returns: Список кортежей (name, base, now, ratio, regressed) по общим замерам.
+    :rtype: list[tuple[str, float, float, float, bool]]
+    """
+    rows = []
+    for name, now in current["benchmarks"].items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            continue
+        ratio = now["median"] / base["median"]
+        rows.append((name, base["median"], now["median"], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main():
+    """
+    Точка входа: выполняет замеры, печатает или сохраняет отчёт и при
+    необходимости сравнивает его с эталоном.
+    """
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument("names", nargs="*", help="подстроки имён замеров (по умолчанию — все)")
+    parser.add_argument("-o", "--output", default=None, help="файл для отчёта JSON")
+    parser.add_argument("--min-time", type=float, default=0.2, help="минимальная длительность прогона, с")
+    parser.add_argument("--repeat", type=int, default=5, help="число прогонов")
+    parser.add_argument("--compare", metavar="BASELINE", default=None, help="эталонный отчёт JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое замедление (доля)")
+    parser.add_argument("--list", action="store_true", help="только перечислить замеры")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+
+    report = run_benchmarks(args.names, args.min_time, args.repeat)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    elif args.compare is None:
+        print(text)
+
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressed = False
+        for name, base, now, ratio, slower in compare(baseline, report, args.threshold):
+            mark = "  РЕГРЕССИЯ" if slower else ""
+            print(f"{name:24} {base * 1e6:12.2f} мкс -> {now * 1e6:12.2f} мкс  x{ratio:.2f}{mark}")
+            regressed = regressed or slower
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Битовое представление игровой доски.
+
+Клетка (row, col) соответствует биту с номером ``row * width + col``,
+поэтому вся доска 10x10 помещается в одно целое число. Доска хранится
+в виде трёх масок: корабли (``S`` и ``X``), попадания (``X``) и
+промахи (``O``). Все операции — проверка размещения, поиск корабля,
+пометка клеток вокруг потопленного корабля и подсчёт кораблей —
+выполняются побитовыми сдвигами без обхода клеток в цикле.
+"""
+
+from functools import lru_cache
+
+SIZE = 10
+
+_CELLS = {"~", "S", "X", "O"}
+_SHIPS = str.maketrans("~SXO", "0110")
+_HITS = str.maketrans("~SXO", "0010")
+_MISSES = str.maketrans("~SXO", "0001")
+
+
+@lru_cache(maxsize=None)
+def _edge_masks(width, height):
+    """
+    Строит вспомогательные маски для доски заданного размера.
+
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :returns: Кортеж (вся доска, доска без первого столбца, доска без последнего столбца).
+    :rtype: tuple[int, int, int]
+    """
+    full = (1 << (width * height)) - 1
+    first_col = 0
+    for r in range(height):
+        first_col |= 1 << (r * width)
+    last_col = first_col << (width - 1)
+    return full, full & ~first_col, full & ~last_col
+
+
+def cell_bit(row, col, width=SIZE):
+    """
+    Возвращает маску из одного бита для клетки (row, col).
+
+    :param row: Строка клетки.
+    :type row: int
+    :param col: Столбец клетки.
+    :type col: int
+    :param width: Ширина доски.
+    :type width: int
+    :returns: Битовая маска клетки.
+    :rtype: int
+    """
+    return 1 << (row * width + col)
+
+
+def iter_cells(mask, width=SIZE):
+    """
+    Перебирает клетки, отмеченные в маске, в порядке возрастания индекса.
+
+    :param mask: Битовая маска.
+    :type mask: int
+    :param width: Ширина доски.
+    :type width: int
+    :returns: Генератор координат (row, col).
+    :rtype: Iterator[tuple[int, int]]
+    """
+    while mask:
+        low = mask & -mask
+        yield divmod(low.bit_length() - 1, width)
+        mask ^= low
+
+
+def spread(mask, width=SIZE, height=SIZE):
+    """
+    Расширяет маску на соседей по горизонтали и вертикали.
+
+    :param mask: Битовая маска.
+    :type mask: int
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :returns: Маска, дополненная четырьмя соседями каждой клетки.
+    :rtype: int
+    """
+    full, not_first, not_last = _edge_masks(width, height)
+    return (
+        mask
+        | ((mask << 1) & not_first)
+        | ((mask & not_first) >> 1)
+        | ((mask << width) & full)
+        | (mask >> width)
+    )
+
+
+def neighbourhood(mask, width=SIZE, height=SIZE):
+    """
+    Расширяет маску на все восемь соседей каждой клетки (включая диагонали).
+
+    :param mask: Битовая маска.
+    :type mask: int
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :returns: Маска клеток вместе с их окрестностью.
+    :rtype: int
+    """
+    full, not_first, _ = _edge_masks(width, height)
+    row = mask | ((mask << 1) & not_first) | ((mask & not_first) >> 1)
+    return row | ((row << width) & full) | (row >> width)
+
+
+def ship_mask(row, col, size, horizontal, width=SIZE):
+    """
+    Строит маску клеток корабля без проверки границ доски.
+
+    :param row: Начальная строка.
+    :type row: int
+    :param col: Начальный столбец.
+    :type col: int
+    :param size: Длина корабля.
+    :type size: int
+    :param horizontal: Ориентация корабля (True — горизонтально, False — вертикально).
+    :type horizontal: bool
+    :param width: Ширина доски.
+    :type width: int
+    :returns: Битовая маска клеток корабля.
+    :rtype: int
+    """
+    start = row * width + col
+    if horizontal:
+        return ((1 << size) - 1) << start
+    mask = 0
+    for k in range(size):
+        mask |= 1 << (start + k * width)
+    return mask
+
+
+def can_place(ships, row, col, size, horizontal, width=SIZE, height=SIZE):
+    """
+    Проверяет, можно ли разместить корабль, одним пересечением масок.
+
+    :param ships: Маска уже размещённых кораблей.
+    :type ships: int
+    :param row: Начальная строка.
+    :type row: int
+    :param col: Начальный столбец.
+    :type col: int
+    :param size: Длина корабля.
+    :type size: int
+    :param horizontal: Ориентация корабля (True — горизонтально, False — вертикально).
+    :type horizontal: bool
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :returns: True, если размещение возможно, иначе False.
+    :rtype: bool
+    """
+    if row < 0 or col < 0:
+        return False
+    if horizontal:
+        if col + size > width or row >= height:
+            return False
+    elif row + size > height or col >= width:
+        return False
+    footprint = ship_mask(row, col, size, horizontal, width)
+    return not neighbourhood(footprint, width, height) & ships
+
+
+def find_ship(ships, row, col, width=SIZE, height=SIZE):
+    """
+    Выделяет связный корабль, содержащий клетку (row, col).
+
+    :param ships: Маска кораблей.
+    :type ships: int
+    :param row: Строка клетки.
+    :type row: int
+    :param col: Столбец клетки.
+    :type col: int
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :returns: Маска клеток корабля или 0, если в клетке нет корабля.
+    :rtype: int
+    """
+    component = cell_bit(row, col, width) & ships
+    while component:
+        grown = spread(component, width, height) & ships
+        if grown == component:
+            break
+        component = grown
+    return component
+
+
+def split_ships(ships, width=SIZE, height=SIZE):
+    """
+    Разбивает маску кораблей на отдельные корабли.
+
+    :param ships: Маска кораблей.
+    :type ships: int
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :returns: Список масок отдельных кораблей.
+    :rtype: list[int]
+    """
+    result = []
+    while ships:
+        component = ships & -ships
+        while True:
+            grown = spread(component, width, height) & ships
+            if grown == component:
+                break
+            component = grown
+        result.append(component)
+        ships &= ~component
+    return result
+
+
+def count_ships(ships, width=SIZE, height=SIZE):
+    """
+    Подсчитывает количество кораблей в маске.
+
+    :param ships: Маска кораблей.
+    :type ships: int
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :returns: Количество кораблей.
+    :rtype: int
+    """
+    return len(split_ships(ships, width, height))
+
+
+class BitBoard:
+    """
+    Игровая доска в виде трёх битовых масок.
+
+    :ivar ships: Клетки с кораблями (целыми и подбитыми).
+    :vartype ships: int
+    :ivar hits: Клетки с попаданиями.
+    :vartype hits: int
+    :ivar misses: Клетки, помеченные как промах.
+    :vartype misses: int
+    :ivar width: Ширина доски.
+    :vartype width: int
+    :ivar height: Высота доски.
+    :vartype height: int
+    """
+
+    __slots__ = ("ships", "hits", "misses", "width", "height")
+
+    def __init__(self, ships=0, hits=0, misses=0, width=SIZE, height=SIZE):
+        """
+        Конструктор класса BitBoard.
+
+        :param ships: Маска кораблей.
+        :type ships: int
+        :param hits: Маска попаданий.
+        :type hits: int
+        :param misses: Маска промахов.
+        :type misses: int
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        """
+        self.ships = ships
+        self.hits = hits
+        self.misses = misses
+        self.width = width
+        self.height = height
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Создаёт битовую доску из списка списков символов.
+
+        :param board: Игровая доска.
+        :type board: list[list[str]]
+        :returns: Битовая доска.
+        :rtype: BitBoard
+        :raises ValueError: Если на доске встречается недопустимый символ.
+        """
+        height = len(board)
+        width = len(board[0]) if height else 0
+        # Клетка 0 — младший бит, поэтому строка разворачивается перед int(..., 2).
+        text = "".join(map("".join, board))[::-1]
+        for cell in set(text) - _CELLS:
+            raise ValueError(f"Недопустимый символ в доске: '{cell}'")
+        if not text:
+            return cls(0, 0, 0, width, height)
+        ships = int(text.translate(_SHIPS), 2)
+        hits = int(text.translate(_HITS), 2)
+        misses = int(text.translate(_MISSES), 2)
+        return cls(ships, hits, misses, width, height)
+
+    def to_board(self):
+        """
+        Преобразует битовую доску обратно в список списков символов.
+
+        :returns: Игровая доска.
+        :rtype: list[list[str]]
+        """
+        width = self.width
+        board = [["~"] * width for _ in range(self.height)]
+        for mask, char in ((self.misses, "O"), (self.ships, "S"), (self.hits, "X")):
+            for r, c in iter_cells(mask, width):
+                board[r][c] = char
+        return board
+
+    def can_place(self, row, col, size, horizontal):
+        """
+        Проверяет, можно ли разместить корабль на этой доске.
+
+        :returns: True, если размещение возможно, иначе False.
+        :rtype: bool
+        """
+        return can_place(self.ships, row, col, size, horizontal, self.width, self.height)
+
+    def place_ship(self, row, col, size, horizontal):
+        """
+        Размещает корабль на доске без проверки правил.
+
+        :returns: None (метод изменяет доску).
+        :rtype: None
+        """
+        self.ships |= ship_mask(row, col, size, horizontal, self.width)
+
+    def find_ship(self, row, col):
+        """
+        Возвращает маску корабля, содержащего клетку (row, col).
+
+        :rtype: int
+        """
+        return find_ship(self.ships, row, col, self.width, self.height)
+
+    def is_sunk(self, ship):
+        """
+        Проверяет, потоплен ли корабль, заданный маской.
+
+        :param ship: Маска клеток корабля.
+        :type ship: int
+        :rtype: bool
+        """
+        return ship & self.hits == ship
+
+    def mark_around_sunk(self, row, col):
+        """
+        Помечает клетки вокруг корабля, содержащего (row, col), как промахи.
+
+        :returns: Маска клеток, которые были помечены этим вызовом.
+        :rtype: int
+        """
+        ship = self.find_ship(row, col)
+        halo = neighbourhood(ship, self.width, self.height) & ~self.ships & ~self.misses
+        self.misses |= halo
+        return halo
+
+    def count_ships(self, afloat_only=False):
+        """
+        Подсчитывает корабли на доске.
+
+        :param afloat_only: Учитывать только корабли, в которых есть целые клетки
+                            (аналог ``utils.count_ships``, который считает клетки 'S').
+        :type afloat_only: bool
+        :rtype: int
+        """
+        ships = split_ships(self.ships, self.width, self.height)
+        if afloat_only:
+            return sum(1 for ship in ships if ship & ~self.hits)
+        return len(ships)
@@ -0,0 +1,408 @@
+"""
+Компактный двоичный корпус расстановок флота.
+
+Файл корпуса состоит из 32-байтного заголовка и записей фиксированной
+длины. Каждая запись — маска кораблей (см. ``bitboard``) в порядке байтов
+little-endian; для доски 10x10 это 13 байт на расстановку. Так как длина
+записи постоянна, индекс не хранится отдельно: i-я запись начинается со
+смещения ``HEADER.size + i * record_size``.
+
+Формат заголовка (``HEADER``): сигнатура ``SBCORPUS``, версия, ширина и
+высота доски, длина записи и число записей. В версии 1 ширина и высота
+занимали по байту (доски до 255x255); такие файлы по-прежнему читаются,
+а при дописывании заголовок переписывается в текущей версии.
+
+Чтение идёт через ``mmap``: записи не копируются в память целиком, а
+произвольный доступ к i-й записи стоит O(1).
+"""
+
+import argparse
+import mmap
+import os
+import struct
+
+from bitboard import SIZE, BitBoard
+from fleet import generate_fleets
+from rules import DEFAULT_RULES, Rules
+from utils import load_board, save_board
+
+MAGIC = b"SBCORPUS"
+VERSION = 2
+HEADER = struct.Struct("<8sHHHHHQ6x")
+# Заголовки прежних версий той же длины.
+_HEADERS = {1: struct.Struct("<8sHBBHHQ8x"), VERSION: HEADER}
+_PREFIX = struct.Struct("<8sH")
+# Наибольшее значение полей размера доски и длины записи.
+_LIMIT = 0xFFFF
+
+
+def record_size(width=SIZE, height=SIZE):
+    """
+    Возвращает длину одной записи в байтах.
+
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :rtype: int
+    """
+    return (width * height + 7) // 8
+
+
+class CorpusWriter:
+    """
+    Запись расстановок в корпус (новый или уже существующий).
+
+    Число записей в заголовке обновляется при :meth:`flush` и :meth:`close`.
+
+    :ivar path: Путь к файлу корпуса.
+    :vartype path: str
+    :ivar width: Ширина доски.
+    :vartype width: int
+    :ivar height: Высота доски.
+    :vartype height: int
+    :ivar count: Число записей в корпусе.
+    :vartype count: int
+    """
+
+    def __init__(self, path, width=SIZE, height=SIZE):
+        """
+        Конструктор класса CorpusWriter.
+
+        Если файл уже существует, записи дописываются в его конец.
+
+        :param path: Путь к файлу корпуса.
+        :type path: str
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        :raises ValueError: Если доска слишком велика для заголовка, существующий
+                            файл не является корпусом или размер доски в нём другой.
+        """
+        self.path = path
+        self.width = width
+        self.height = height
+        self._size = record_size(width, height)
+        if max(width, height, self._size) > _LIMIT:
+            raise ValueError(f"Доска {width}x{height} слишком велика для корпуса")
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._file = open(path, "r+b")
+            try:
+                header = _read_header(self._file.read(HEADER.size), path)
+                if (header["width"], header["height"]) != (width, height):
+                    raise ValueError(f"Корпус '{path}' содержит доски другого размера")
+            except Exception:
+                self._file.close()
+                raise
+            self.count = header["count"]
+            self._file.seek(HEADER.size + self.count * self._size)
+            self._file.truncate()
+        else:
+            self._file = open(path, "w+b")
+            self.count = 0
+            self._write_header()
+
+    def _write_header(self):
+        """
+        Записывает заголовок с текущим числом записей.
+        """
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write(
+            HEADER.pack(MAGIC, VERSION, self.width, self.height, self._size, 0, self.count)
+        )
+        self._file.seek(max(position, HEADER.size))
+
+    def append(self, ships):
+        """
+        Дописывает одну расстановку.
+
+        :param ships: Маска кораблей.
+        :type ships: int
+        """
+        self._file.write(ships.to_bytes(self._size, "little"))
+        self.count += 1
+
+    def extend(self, masks):
+        """
+        Дописывает много расстановок одной операцией записи.
+
+        :param masks: Маски кораблей.
+        :type masks: Iterable[int]
+        :returns: Число дописанных записей.
+        :rtype: int
+        """
+        size = self._size
+        chunk = b"".join(ships.to_bytes(size, "little") for ships in masks)
+        self._file.write(chunk)
+        added = len(chunk) // size
+        self.count += added
+        return added
+
+    def flush(self):
+        """
+        Обновляет заголовок и сбрасывает буферы на диск.
+        """
+        self._write_header()
+        self._file.flush()
+
+    def close(self):
+        """
+        Закрывает корпус, предварительно обновив заголовок.
+        """
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Corpus:
+    """
+    Чтение корпуса через ``mmap`` с произвольным доступом к записям.
+
+    :ivar path: Путь к файлу корпуса.
+    :vartype path: str
+    :ivar width: Ширина доски.
+    :vartype width: int
+    :ivar height: Высота доски.
+    :vartype height: int
+    """
+
+    def __init__(self, path):
+        """
+        Конструктор класса Corpus.
+
+        :param path: Путь к файлу корпуса.
+        :type path: str
+        :raises ValueError: Если файл не является корпусом или обрезан.
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            header = _read_header(self._file.read(HEADER.size), path)
+            self.width = header["width"]
+            self.height = header["height"]
+            self._size = header["record_size"]
+            self._count = header["count"]
+            if HEADER.size + self._count * self._size > os.path.getsize(path):
+                raise ValueError(f"Корпус '{path}' обрезан")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __len__(self):
+        """
+        Возвращает число записей.
+
+        :rtype: int
+        """
+        return self._count
+
+    def record(self, i):
+        """
+        Возвращает копию байтов i-й записи.
+
+        Возвращается ``bytes``, а не срез отображения: запись остаётся
+        действительной и после :meth:`close`, а живые ссылки на записи не
+        мешают закрыть файл.
+
+        :param i: Номер записи (поддерживаются отрицательные номера).
+        :type i: int
+        :rtype: bytes
+        :raises IndexError: Если номер вне диапазона.
+        """
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("Номер записи вне диапазона")
+        start = HEADER.size + i * self._size
+        return self._map[start:start + self._size]
+
+    def __getitem__(self, i):
+        """
+        Возвращает маску кораблей i-й записи.
+
+        :rtype: int
+        """
+        return int.from_bytes(self.record(i), "little")
+
+    def __iter__(self):
+        """
+        Перебирает маски кораблей всех записей по порядку.
+
+        :rtype: Iterator[int]
+        """
+        data = self._map
+        size = self._size
+        from_bytes = int.from_bytes
+        end = HEADER.size + self._count * size
+        for start in range(HEADER.size, end, size):
+            yield from_bytes(data[start:start + size], "little")
+
+    def board(self, i):
+        """
+        Возвращает i-ю расстановку в виде игровой доски.
+
+        :rtype: list[list[str]]
+        """
+        return BitBoard(self[i], width=self.width, height=self.height).to_board()
+
+    def close(self):
+        """
+        Закрывает отображение файла.
+        """
+        if not self._file.closed:
+            try:
+                self._map.close()
+            finally:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_header(data, path):
+    """
+    Разбирает заголовок корпуса.
+
+    :returns: Словарь с полями version, width, height, record_size, count.
+    :rtype: dict
+    :raises ValueError: Если заголовок некорректен.
+    """
+    if len(data) < HEADER.size:
+        raise ValueError(f"Файл '{path}' не является корпусом расстановок")
+    magic, version = _PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"Файл '{path}' не является корпусом расстановок")
+    if version not in _HEADERS:
+        raise ValueError(f"Неподдерживаемая версия корпуса: {version}")
+    _, _, width, height, size, _, count = _HEADERS[version].unpack(data)
+    if size != record_size(width, height):
+        raise ValueError(f"Некорректная длина записи в корпусе '{path}'")
+    return {"version": version, "width": width, "height": height, "record_size": size, "count": count}
+
+
+def _board_rules(width, height):
+    """
+    Возвращает правила с размером доски корпуса.
+
+    Корпус не хранит состав флота, а ``load_board`` и ``save_board``
+    проверяют только размер, поэтому флот — один однопалубный корабль,
+    который помещается на любой доске.
+
+    :rtype: Rules
+    """
+    return Rules(width, height, (1,))
+
+
+def text_to_corpus(filenames, path, width=SIZE, height=SIZE):
+    """
+    Переносит расстановки из текстовых файлов (формат ``save_board``) в корпус.
+
+    Файлы, которые ``load_board`` не смог прочитать (в том числе доски
+    другого размера), пропускаются.
+
+    :param filenames: Текстовые файлы с досками.
+    :type filenames: Iterable[str]
+    :param path: Путь к корпусу (дописывается, если уже существует).
+    :type path: str
+    :param width: Ширина досок.
+    :type width: int
+    :param height: Высота досок.
+    :type height: int
+    :returns: Список пропущенных файлов.
+    :rtype: list[str]
+    :raises ValueError: Если существующий корпус содержит доски другого размера.
+    """
+    skipped = []
+    rules = _board_rules(width, height)
+
+    def masks():
+        for filename in filenames:
+            board = load_board(filename, rules)
+            if board is None:
+                skipped.append(filename)
+                continue
+            yield BitBoard.from_board(board).ships
+
+    with CorpusWriter(path, width, height) as writer:
+        writer.extend(masks())
+    return skipped
+
+
+def corpus_to_text(path, directory, pattern="board_{:06d}.txt"):
+    """
+    Выгружает корпус в текстовые файлы (формат ``save_board``), по файлу на расстановку.
+
+    :param path: Путь к корпусу.
+    :type path: str
+    :param directory: Каталог для файлов (создаётся при необходимости).
+    :type directory: str
+    :param pattern: Шаблон имени файла с номером записи.
+    :type pattern: str
+    :returns: Число записанных файлов.
+    :rtype: int
+    :raises IOError: При ошибке записи в файл.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with Corpus(path) as corpus:
+        rules = _board_rules(corpus.width, corpus.height)
+        for i in range(len(corpus)):
+            save_board(corpus.board(i), os.path.join(directory, pattern.format(i)), rules)
+        return len(corpus)
+
+
+def main():
+    """
+    Инструменты командной строки: упаковка, распаковка, генерация и сводка корпуса.
+    """
+    parser = argparse.ArgumentParser(description="Двоичный корпус расстановок")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pack = sub.add_parser("pack", help="текстовые файлы -> корпус")
+    pack.add_argument("corpus")
+    pack.add_argument("files", nargs="+")
+    pack.add_argument("--width", type=int, default=DEFAULT_RULES.width, help="ширина досок")
+    pack.add_argument("--height", type=int, default=DEFAULT_RULES.height, help="высота досок")
+
+    unpack = sub.add_parser("unpack", help="корпус -> текстовые файлы")
+    unpack.add_argument("corpus")
+    unpack.add_argument("directory")
+
+    generate = sub.add_parser("generate", help="дописать случайные расстановки")
+    generate.add_argument("corpus")
+    generate.add_argument("-n", "--count", type=int, default=10000)
+    generate.add_argument("--uniform", action="store_true")
+
+    info = sub.add_parser("info", help="сводка по корпусу")
+    info.add_argument("corpus")
+
+    args = parser.parse_args()
+    if args.command == "pack":
+        skipped = text_to_corpus(args.files, args.corpus, args.width, args.height)
+        for filename in skipped:
+            print(f"Пропущен файл: {filename}")
+    elif args.command == "unpack":
+        print(f"Записано файлов: {corpus_to_text(args.corpus, args.directory)}")
+    elif args.command == "generate":
+        with CorpusWriter(args.corpus) as writer:
+            writer.extend(generate_fleets(args.count, uniform=args.uniform))
+            print(f"Расстановок в корпусе: {writer.count}")
+    else:
+        with Corpus(args.corpus) as corpus:
+            print(f"{corpus.path}: {len(corpus)} расстановок, доска {corpus.width}x{corpus.height}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Прицеливание компьютера по плотности вероятности.
+
+Для каждой клетки хранится взвешенное число допустимых размещений ещё
+не потопленных кораблей, которые эту клетку покрывают. Стрельба ведётся
+по клетке с максимальным значением. Счётчики обновляются инкрементально:
+промах или потопление корабля вычёркивает только размещения, задевающие
+изменившиеся клетки, а максимум извлекается из кучи с ленивым удалением
+устаревших записей.
+
+Потопление меняет вес всех размещений одной длины, поэтому плотность
+всех клеток уменьшается на число размещений этой длины через клетку —
+это одно поэлементное вычитание списков, а не повторный подсчёт по
+всем длинам. Ничьи разрешаются случайными ключами клеток, которые
+выбираются один раз при создании.
+
+После :meth:`DensityTargeter.mark` изменения записываются в журнал, и
+:meth:`DensityTargeter.rollback` отменяет их за время, пропорциональное
+числу изменений: вычеркнутые размещения возвращаются, а для клеток с
+восстановленной плотностью в кучу добавляются свежие записи.
+"""
+
+import heapq
+import random
+from collections import Counter
+from operator import sub
+
+from bitboard import SIZE, cell_bit, iter_cells, neighbourhood
+from placements import placement_index
+from utils import FLEET
+
+# Виды записей журнала изменений.
+_CLOSE, _HITS, _PLACEMENT, _SINK = range(4)
+
+
+class DensityTargeter:
+    """
+    Выбор выстрела по максимуму плотности допустимых размещений кораблей.
+
+    :ivar width: Ширина доски.
+    :vartype width: int
+    :ivar height: Высота доски.
+    :vartype height: int
+    :ivar remaining: Сколько кораблей каждой длины ещё не потоплено.
+    :vartype remaining: collections.Counter
+    :ivar score: Текущая плотность для каждой клетки (индекс row * width + col).
+    :vartype score: list[int]
+    """
+
+    def __init__(self, fleet=FLEET, width=SIZE, height=SIZE, rng=None):
+        """
+        Конструктор класса DensityTargeter.
+
+        :param fleet: Длины кораблей флота противника.
+        :type fleet: Iterable[int]
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        :param rng: Генератор случайных чисел для разрешения ничьих.
+        :type rng: random.Random | None
+        """
+        self.width = width
+        self.height = height
+        self.rng = rng or random
+        self.remaining = Counter(fleet)
+
+        cells = width * height
+        index = placement_index(tuple(sorted(self.remaining)), width, height)
+        self._placements = index.placements
+        self._by_cell = index.by_cell
+        self._valid = [True] * len(self._placements)
+        self._cover = {size: list(cover) for size, cover in index.cover.items()}
+
+        self._closed = bytearray(cells)
+        self._hits = 0
+        rand = self.rng.random
+        self._tie = [rand() for _ in range(cells)]
+        score = [0] * cells
+        for size, count in self.remaining.items():
+            cover = self._cover[size]
+            for i in range(cells):
+                score[i] += count * cover[i]
+        self.score = score
+        self._journal = None
+        self._rebuild()
+
+    def _rebuild(self):
+        """
+        Пересобирает кучу максимумов по текущей плотности.
+
+        Вызывается при создании и после потопления корабля, когда
+        плотность меняется сразу у всех клеток.
+        """
+        closed = self._closed
+        tie = self._tie
+        self._heap = [(-s, tie[i], i) for i, s in enumerate(self.score) if not closed[i]]
+        heapq.heapify(self._heap)
+
+    def _invalidate(self, i):
+        """
+        Вычёркивает все размещения, покрывающие клетку с индексом i.
+        """
+        tie = self._tie
+        heap = self._heap
+        score = self.score
+        journal = self._journal
+        for pid in self._by_cell[i]:
+            if not self._valid[pid]:
+                continue
+            self._valid[pid] = False
+            if journal is not None:
+                journal.append((_PLACEMENT, pid))
+            placement = self._placements[pid]
+            size = placement.size
+            weight = self.remaining[size]
+            cover = self._cover[size]
+            for j in placement.cells:
+                cover[j] -= 1
+                if weight:
+                    score[j] -= weight
+                    if not self._closed[j]:
+                        heapq.heappush(heap, (-score[j], tie[j], j))
+
+    def _target(self):
+        """
+        Выбирает клетку рядом с подбитым, но ещё не потопленным кораблём.
+
+        Рассматриваются только размещения, которые покрывают попадания и не
+        касаются других попаданий; размещения, покрывающие больше попаданий,
+        получают больший вес.
+
+        :returns: Индекс клетки или None, если подходящих размещений нет.
+        :rtype: int | None
+        """
+        hits = self._hits
+        weights = {}
+        seen = set()
+        for r, c in iter_cells(hits, self.width):
+            for pid in self._by_cell[r * self.width + c]:
+                if pid in seen or not self._valid[pid]:
+                    continue
+                seen.add(pid)
+                placement = self._placements[pid]
+                size = placement.size
+                if not self.remaining[size] or placement.zone & hits & ~placement.footprint:
+                    continue
+                weight = self.remaining[size] * (bin(placement.footprint & hits).count("1") ** 2)
+                for j in placement.cells:
+                    if not self._closed[j]:
+                        weights[j] = weights.get(j, 0) + weight
+        if not weights:
+            return None
+        best = max(weights.values())
+        return self.rng.choice([j for j, w in weights.items() if w == best])
+
+    def choose(self, state=None):
+        """
+        Выбирает клетку для следующего выстрела.
+
+        :param state: Хеш Зобриста видимой доски; не используется: оценки
+                      обновляются на каждом выстреле, и выбор дешевле обращения к кэшу.
+        :type state: int | None
+        :returns: Координаты (row, col).
+        :rtype: tuple[int, int]
+        :raises ValueError: Если на доске не осталось клеток для выстрела.
+        """
+        i = self._target() if self._hits else None
+        if i is None:
+            heap = self._heap
+            while heap:
+                neg, _, j = heap[0]
+                if self._closed[j] or -neg != self.score[j]:
+                    heapq.heappop(heap)
+                    continue
+                i = j
+                break
+        if i is None:
+            try:
+                i = self._closed.index(0)
+            except ValueError:
+                raise ValueError("Не осталось клеток для выстрела") from None
+        return divmod(i, self.width)
+
+    def update(self, row, col, hit, sunk_cells=None):
+        """
+        Учитывает результат выстрела.
+
+        :param row: Строка выстрела.
+        :type row: int
+        :param col: Столбец выстрела.
+        :type col: int
+        :param hit: Было ли попадание.
+        :type hit: bool
+        :param sunk_cells: Клетки потопленного корабля, если выстрел его потопил.
+        :type sunk_cells: Iterable[tuple[int, int]] | None
+        :returns: None (метод изменяет состояние).
+        :rtype: None
+        """
+        journal = self._journal
+        i = row * self.width + col
+        self._close(i)
+        if not hit:
+            self._invalidate(i)
+            return
+
+        if journal is not None:
+            journal.append((_HITS, self._hits))
+        self._hits |= cell_bit(row, col, self.width)
+        if not sunk_cells:
+            return
+
+        ship = 0
+        for r, c in sunk_cells:
+            ship |= cell_bit(r, c, self.width)
+        self._hits &= ~ship
+        zone = neighbourhood(ship, self.width, self.height)
+        for r, c in iter_cells(zone, self.width):
+            j = r * self.width + c
+            self._close(j)
+            self._invalidate(j)
+        size = bin(ship).count("1")
+        if journal is not None:
+            journal.append((_SINK, size if self.remaining[size] else 0, self.score, self._heap))
+        if self.remaining[size]:
+            self.remaining[size] -= 1
+            # Вес каждого размещения этой длины уменьшился на единицу.
+            self.score = list(map(sub, self.score, self._cover[size]))
+        self._rebuild()
+
+    def _close(self, i):
+        """
+        Закрывает клетку с индексом i для выстрелов.
+        """
+        if not self._closed[i]:
+            self._closed[i] = 1
+            if self._journal is not None:
+                self._journal.append((_CLOSE, i))
+
+    def mark(self):
+        """
+        Включает журнал изменений (если он выключен) и возвращает отметку.
+
+        :returns: Отметка для :meth:`rollback`.
+        :rtype: int
+        """
+        if self._journal is None:
+            self._journal = []
+        return len(self._journal)
+
+    def rollback(self, mark):
+        """
+        Отменяет изменения, сделанные после отметки ``mark``.
+
+        :param mark: Отметка, полученная от :meth:`mark`.
+        :type mark: int
+        """
+        journal = self._journal
+        closed, tie = self._closed, self._tie
+        push = heapq.heappush
+        while len(journal) > mark:
+            entry = journal.pop()
+            kind = entry[0]
+            if kind == _CLOSE:
+                i = entry[1]
+                closed[i] = 0
+                push(self._heap, (-self.score[i], tie[i], i))
+            elif kind == _PLACEMENT:
+                pid = entry[1]
+                self._valid[pid] = True
+                placement = self._placements[pid]
+                weight = self.remaining[placement.size]
+                cover = self._cover[placement.size]
+                score, heap = self.score, self._heap
+                for j in placement.cells:
+                    cover[j] += 1
+                    if weight:
+                        score[j] += weight
+                        if not closed[j]:
+                            push(heap, (-score[j], tie[j], j))
+            elif kind == _HITS:
+                self._hits = entry[1]
+            else:
+                _, size, self.score, self._heap = entry
+                if size:
+                    self.remaining[size] += 1
+        # Устаревшие записи копятся при частых откатах; куча пересобирается,
+        # когда их становится больше, чем клеток.
+        if len(self._heap) > 2 * len(closed):
+            self._rebuild()
+
+    def forget(self):
+        """
+        Выключает журнал изменений; ранее полученные отметки становятся недействительными.
+        """
+        self._journal = None
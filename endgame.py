@@ -0,0 +1,455 @@
+"""
+Точный расчёт эндшпиля: перебор всех расстановок оставшихся кораблей.
+
+Когда на доске остаётся мало кораблей и мало свободных клеток, все
+расстановки, согласованные с историей выстрелов, можно перечислить и
+получить точную вероятность корабля в каждой клетке.
+
+Перебор идёт по клеткам в порядке индекса. Каждый корабль "привязан" к
+своей первой клетке (левой или верхней), поэтому в клетке ``f`` решается
+только одно: начинается ли здесь какой-то корабль. Всё, что стоит до
+``f``, уже решено, и дальнейший перебор зависит только от ``f``,
+оставшихся кораблей и занятых клеток начиная с ``f``. По этому ключу
+подзадачи запоминаются; словарь переживает отдельные ходы, поэтому
+после нового промаха переиспользуются все подзадачи за ним.
+
+Отсечения: клетка с попаданием не может остаться пустой, корабль не
+может касаться чужого попадания или стоять только на попаданиях, а
+оставшиеся корабли должны уместиться в свободные клетки.
+
+Перебор включается, когда оценка его работы (см.
+:meth:`EndgameSolver.search_size`) не больше порога ``threshold``. Оценка
+грубая, поэтому при выборе хода перебор ещё и ограничен бюджетом работы
+``work_limit``: если бюджет исчерпан, ход выбирает обычный ИИ. Работа
+считается так, будто запомненных подзадач нет (каждая подзадача хранит
+свою цену вместе с результатом), поэтому исчерпание бюджета зависит
+только от состояния доски, а не от того, что запомнено на прошлых ходах.
+
+Вероятности зависят только от видимого состояния доски, поэтому при
+заданном хеше состояния (см. ``zobrist``) они берутся из кэша решений
+и пересчитываются только при промахе кэша.
+"""
+
+from collections import Counter
+from functools import lru_cache
+from math import comb
+
+from bitboard import SIZE, cell_bit, iter_cells, neighbourhood, ship_mask
+from placements import FLEET, zone_mask
+
+# Порог оценки работы перебора, ниже которого включается точный перебор.
+THRESHOLD = 1_500_000
+# Бюджет работы перебора на один ход (см. :meth:`EndgameSolver._spend`).
+WORK_LIMIT = 60_000
+# Наибольшее число запомненных подзадач; при переполнении словарь очищается.
+MEMO_LIMIT = 200_000
+
+
+@lru_cache(maxsize=65536)
+def _anchored(cell, size, width, height):
+    """
+    Возвращает размещения корабля длины ``size`` с первой клеткой ``cell``.
+
+    Маски строятся напрямую, без индекса размещений: на большой доске
+    индекс всех размещений строится дольше, чем весь перебор эндшпиля.
+
+    :returns: Кортеж пар (маска корабля, маска запретной зоны).
+    :rtype: tuple[tuple[int, int], ...]
+    """
+    row, col = divmod(cell, width)
+    found = []
+    for horizontal in ((True,) if size == 1 else (True, False)):
+        if (col if horizontal else row) + size <= (width if horizontal else height):
+            found.append((
+                ship_mask(row, col, size, horizontal, width),
+                zone_mask(row, col, size, horizontal, width, height),
+            ))
+    return tuple(found)
+
+
+class _Exhausted(Exception):
+    """
+    Перебор исчерпал бюджет работы.
+    """
+
+
+class Observations:
+    """
+    Известное о доске противника: промахи, попадания и потопленные корабли.
+
+    :ivar width: Ширина доски.
+    :vartype width: int
+    :ivar height: Высота доски.
+    :vartype height: int
+    :ivar remaining: Сколько кораблей каждой длины ещё не потоплено.
+    :vartype remaining: collections.Counter
+    """
+
+    def __init__(self, fleet=FLEET, width=SIZE, height=SIZE):
+        """
+        Конструктор класса Observations.
+
+        :param fleet: Длины кораблей флота противника.
+        :type fleet: Iterable[int]
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        """
+        self.width = width
+        self.height = height
+        self.remaining = Counter(fleet)
+        self._fleet = ",".join(map(str, sorted(fleet, reverse=True)))
+        # Клетки, где кораблей быть не может: промахи, потопленные корабли и их зоны.
+        self._blocked = 0
+        # Попадания по ещё не потопленным кораблям.
+        self._hits = 0
+        # Клетки, по которым стрелять уже незачем.
+        self._closed = 0
+
+    def update(self, row, col, hit, sunk_cells=None):
+        """
+        Учитывает результат выстрела.
+
+        :param row: Строка выстрела.
+        :type row: int
+        :param col: Столбец выстрела.
+        :type col: int
+        :param hit: Было ли попадание.
+        :type hit: bool
+        :param sunk_cells: Клетки потопленного корабля, если выстрел его потопил.
+        :type sunk_cells: Iterable[tuple[int, int]] | None
+        :returns: None (метод изменяет состояние).
+        :rtype: None
+        """
+        bit = cell_bit(row, col, self.width)
+        self._closed |= bit
+        if not hit:
+            self._blocked |= bit
+            return
+        self._hits |= bit
+        if not sunk_cells:
+            return
+
+        ship = 0
+        for r, c in sunk_cells:
+            ship |= cell_bit(r, c, self.width)
+        self._hits &= ~ship
+        zone = neighbourhood(ship, self.width, self.height)
+        self._blocked |= zone
+        self._closed |= zone
+        size = bin(ship).count("1")
+        if self.remaining[size]:
+            self.remaining[size] -= 1
+
+    def mark(self):
+        """
+        Возвращает отметку для :meth:`rollback`: всё состояние умещается в несколько чисел.
+
+        :rtype: tuple
+        """
+        return self._blocked, self._hits, self._closed, tuple(self.remaining.items())
+
+    def rollback(self, mark):
+        """
+        Возвращает состояние на момент отметки ``mark``.
+
+        :param mark: Отметка, полученная от :meth:`mark`.
+        :type mark: tuple
+        """
+        self._blocked, self._hits, self._closed, remaining = mark
+        self.remaining = Counter(dict(remaining))
+
+    def forget(self):
+        """
+        Ничего не делает: журнала изменений нет, отметка хранит всё состояние.
+        """
+
+    def _key(self, kind, state):
+        """
+        Возвращает ключ кэша решений для видимого состояния ``state``.
+
+        :param kind: Вид решения (имя модуля ИИ).
+        :type kind: str
+        :param state: Хеш Зобриста видимой доски.
+        :type state: int
+        :rtype: tuple
+        """
+        return kind, self.width, self.height, self._fleet, state
+
+    def _open_cells(self):
+        """
+        Возвращает индексы клеток, по которым ещё имеет смысл стрелять.
+
+        :rtype: list[int]
+        """
+        width = self.width
+        mask = ((1 << width * self.height) - 1) & ~self._closed
+        return [r * width + c for r, c in iter_cells(mask, width)]
+
+
+class EndgameSolver(Observations):
+    """
+    Точные вероятности клеток перебором всех согласованных расстановок.
+
+    :ivar threshold: Порог оценки работы перебора для :meth:`choose`.
+    :vartype threshold: int
+    :ivar work_limit: Бюджет работы перебора в :meth:`choose` (None — без ограничения).
+    :vartype work_limit: int | None
+    :ivar fleets: Число согласованных расстановок в последнем расчёте.
+    :vartype fleets: int
+    :ivar cache: Кэш решений или None.
+    :vartype cache: zobrist.DecisionCache | None
+    """
+
+    def __init__(self, fleet=FLEET, width=SIZE, height=SIZE, rng=None, threshold=THRESHOLD,
+                 cache=None, work_limit=WORK_LIMIT):
+        """
+        Конструктор класса EndgameSolver.
+
+        :param fleet: Длины кораблей флота противника.
+        :type fleet: Iterable[int]
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        :param rng: Генератор для выбора среди равновероятных клеток
+                    (None — первая по индексу).
+        :type rng: random.Random | None
+        :param threshold: Порог оценки работы перебора.
+        :type threshold: int
+        :param cache: Кэш решений для вероятностей по хешу состояния (None — без кэша).
+        :type cache: zobrist.DecisionCache | None
+        :param work_limit: Бюджет работы перебора в :meth:`choose` (None — без ограничения).
+        :type work_limit: int | None
+        """
+        super().__init__(fleet, width, height)
+        self.rng = rng
+        self.threshold = threshold
+        self.work_limit = work_limit
+        self.cache = cache
+        self.fleets = 0
+        self._sizes = tuple(sorted(set(fleet), reverse=True))
+        self._full = (1 << width * height) - 1
+        self._memo = {}
+        self._work = None
+        # Цена единицы работы: операции над масками доски дороже на большой доске.
+        self._step = 1 + width * height // 256
+
+    def search_size(self):
+        """
+        Оценивает работу перебора оставшихся кораблей.
+
+        Корабль начинается в свободной клетке и лежит в одном из двух
+        направлений, поэтому k кораблей одной длины дают не больше
+        C(2F, k) вариантов, где F — число свободных клеток. Каждая
+        подзадача к тому же просматривает свободные клетки, поэтому число
+        вариантов умножается на F: на большой доске с тем же числом
+        расстановок перебор дороже. Оценка считается без перебора размещений.
+
+        :rtype: int
+        """
+        free = bin(self._full & ~self._blocked).count("1")
+        size = free
+        for length, count in self.remaining.items():
+            if count:
+                size *= comb(free if length == 1 else 2 * free, count)
+        return size
+
+    def probabilities(self, state=None, work_limit=None):
+        """
+        Считает вероятность корабля в каждой клетке перебором всех расстановок.
+
+        :param state: Хеш Зобриста видимой доски; если задан и есть кэш,
+                      результат берётся из кэша или кладётся в него.
+        :type state: int | None
+        :param work_limit: Бюджет работы перебора (None — без ограничения).
+        :type work_limit: int | None
+        :returns: Вероятности по индексам клеток (row * width + col) или None,
+                  если согласованных расстановок нет или бюджет исчерпан.
+        :rtype: list[float] | None
+        """
+        if state is None or self.cache is None:
+            return self._probabilities(work_limit)
+        # Исчерпанный бюджет тоже запоминается, поэтому ключ зависит от бюджета.
+        key = self._key("endgame" if work_limit is None else f"endgame/{work_limit}", state)
+        cached = self.cache.get(key)
+        if cached is None:
+            probabilities = self._probabilities(work_limit)
+            # В кэше только ненулевые клетки: на больших досках карта разреженная.
+            occupied = () if probabilities is None else tuple(
+                (cell, p) for cell, p in enumerate(probabilities) if p
+            )
+            self.cache.put(key, (self.fleets, occupied))
+            return probabilities
+        self.fleets, occupied = cached
+        if not self.fleets:
+            return None
+        probabilities = [0.0] * (self.width * self.height)
+        for cell, p in occupied:
+            probabilities[cell] = p
+        return probabilities
+
+    def occupancy(self, work_limit=None):
+        """
+        Перебирает все согласованные расстановки и считает занятость клеток.
+
+        :param work_limit: Бюджет работы перебора (None — без ограничения).
+        :type work_limit: int | None
+        :returns: Число расстановок и, для каждой занятой клетки, в скольких
+                  расстановках на ней стоит корабль; (0, {}), если бюджет исчерпан.
+        :rtype: tuple[int, dict[int, int]]
+        """
+        counts = tuple(self.remaining[size] for size in self._sizes)
+        if len(self._memo) > MEMO_LIMIT:
+            self._memo.clear()
+        self._work = work_limit
+        try:
+            total, occupied, _ = self._solve(0, counts, self._blocked)
+        except _Exhausted:
+            return 0, {}
+        finally:
+            self._work = None
+        return total, occupied
+
+    def _probabilities(self, work_limit=None):
+        """
+        Считает вероятности перебором, без кэша решений (см. :meth:`probabilities`).
+
+        :rtype: list[float] | None
+        """
+        self.fleets, occupied = self.occupancy(work_limit)
+        if not self.fleets:
+            return None
+        probabilities = [0.0] * (self.width * self.height)
+        for cell, n in occupied.items():
+            probabilities[cell] = n / self.fleets
+        return probabilities
+
+    def _spend(self, work):
+        """
+        Списывает работу с бюджета перебора, если он задан.
+
+        Единица работы — подзадача или просмотр свободной клетки в ней;
+        на большой доске она дороже, потому что дольше операции над масками.
+
+        :param work: Число единиц работы.
+        :type work: int
+        :raises _Exhausted: Если бюджет исчерпан.
+        """
+        if self._work is not None:
+            self._work -= work * self._step
+            if self._work < 0:
+                raise _Exhausted
+
+    def _solve(self, f, counts, taken):
+        """
+        Перебирает расстановки кораблей ``counts``, которые начинаются не раньше клетки ``f``.
+
+        Цена подзадачи — работа её перебора без словаря подзадач: своя работа
+        плюс цены всех вызванных подзадач, в том числе найденных в словаре.
+
+        :param f: Первая нерешённая клетка.
+        :type f: int
+        :param counts: Число оставшихся кораблей каждой длины (в порядке ``_sizes``).
+        :type counts: tuple[int, ...]
+        :param taken: Маска клеток, где корабль стоять не может.
+        :type taken: int
+        :returns: Число расстановок, для каждой клетки — в скольких из них она
+                  занята, и цена подзадачи.
+        :rtype: tuple[int, dict[int, int], int]
+        """
+        hits = self._hits
+        key = (f, counts, taken >> f, hits >> f)
+        cached = self._memo.get(key)
+        if cached is not None:
+            self._spend(cached[2])
+            return cached
+        self._spend(1)
+
+        free = self._full & ~taken & ~((1 << f) - 1)
+        # Подбитые клетки до f уже покрыты кораблями и поэтому входят в taken.
+        if not any(counts):
+            result = (0, {}, 1) if hits & free else (1, {}, 1)
+            self._memo[key] = result
+            return result
+        need = sum(size * count for size, count in zip(self._sizes, counts))
+        if need > bin(free).count("1"):
+            result = (0, {}, 1)
+            self._memo[key] = result
+            return result
+
+        total = 0
+        occupied = {}
+        cost = 1
+        width, height = self.width, self.height
+        while free:
+            self._spend(1)
+            cost += 1
+            low = free & -free
+            g = low.bit_length() - 1
+            for k, size in enumerate(self._sizes):
+                if not counts[k]:
+                    continue
+                rest = counts[:k] + (counts[k] - 1,) + counts[k + 1:]
+                for footprint, zone in _anchored(g, size, width, height):
+                    if (
+                        footprint & taken
+                        or (zone ^ footprint) & hits
+                        # Корабль только из подбитых клеток уже был бы потоплен.
+                        or footprint & hits == footprint
+                    ):
+                        continue
+                    if any(rest):
+                        n, below, spent = self._solve(g + 1, rest, taken | zone)
+                        cost += spent
+                    else:
+                        # Последний корабль: расстановка годится, если все попадания покрыты.
+                        n, below = (0 if hits & ~(taken | zone) else 1), {}
+                    if not n:
+                        continue
+                    total += n
+                    if below:
+                        # Слияние счётчиков подзадачи тоже работа, и немалая.
+                        self._spend(len(below))
+                        cost += len(below)
+                    for cell, m in below.items():
+                        occupied[cell] = occupied.get(cell, 0) + m
+                    mask = footprint
+                    while mask:
+                        bit = mask & -mask
+                        cell = bit.bit_length() - 1
+                        occupied[cell] = occupied.get(cell, 0) + n
+                        mask ^= bit
+            if hits & low:
+                # Попадание должно быть покрыто кораблём, который начинается не позже него.
+                break
+            free ^= low
+
+        result = (total, occupied, cost)
+        self._memo[key] = result
+        return result
+
+    def choose(self, state=None):
+        """
+        Выбирает клетку с наибольшей точной вероятностью корабля.
+
+        :param state: Хеш Зобриста видимой доски для кэша решений.
+        :type state: int | None
+        :returns: Координаты (row, col) или None, если перебор слишком велик
+                  (оценка выше порога или исчерпан бюджет работы) или
+                  согласованных расстановок нет.
+        :rtype: tuple[int, int] | None
+        """
+        if self.search_size() > self.threshold:
+            return None
+        probabilities = self.probabilities(state, self.work_limit)
+        if probabilities is None:
+            return None
+        cells = self._open_cells()
+        if not cells:
+            return None
+        best = max(probabilities[i] for i in cells)
+        cells = [i for i in cells if probabilities[i] == best]
+        cell = self.rng.choice(cells) if self.rng is not None else cells[0]
+        return divmod(cell, self.width)
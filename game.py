@@ -1,7 +1,65 @@
 import random
+from collections import namedtuple
+from dataclasses import dataclass
+from typing import Optional
 from utils import *
+from ledger import ShotLedger
+from registry import ShipRegistry
+from render import BoardRenderer
+from rules import DEFAULT_RULES
+from validate import validate_fleet
+from zobrist import board_hash, keys
+import strategies
 
-LETTERS = "АБВГДЕЖЗИК"
+PLAYER = "player"
+COMPUTER = "computer"
+
+
+@dataclass(frozen=True)
+class ShotResult:
+    """
+    Результат одного выстрела, возвращаемый игровым движком.
+
+    :ivar shooter: Кто стрелял: ``PLAYER`` или ``COMPUTER``.
+    :vartype shooter: str
+    :ivar row: Строка выстрела.
+    :vartype row: int
+    :ivar col: Столбец выстрела.
+    :vartype col: int
+    :ivar hit: Было ли попадание.
+    :vartype hit: bool
+    :ivar sunk: Номер корабля, потопленного этим выстрелом, иначе None.
+    :vartype sunk: int | None
+    :ivar game_over: Закончилась ли игра этим выстрелом.
+    :vartype game_over: bool
+    :ivar winner: Победитель (``PLAYER`` или ``COMPUTER``), если игра окончена.
+    :vartype winner: str | None
+    :ivar rejected: Причина, по которой выстрел не засчитан: "repeat" (уже
+                    стреляли) или "already_empty" (клетка заведомо пуста).
+    :vartype rejected: str | None
+    """
+
+    shooter: str
+    row: int
+    col: int
+    hit: bool = False
+    sunk: Optional[int] = None
+    game_over: bool = False
+    winner: Optional[str] = None
+    rejected: Optional[str] = None
+
+
+Snapshot = namedtuple(
+    "Snapshot",
+    "epoch seq journal player_shots computer_shots player_fleet computer_fleet strategy "
+    "moves turn winner player_hash computer_hash",
+)
+Snapshot.__doc__ = """
+Снимок состояния партии для :meth:`Game.restore`.
+
+Хранит не доски, а отметки в журналах изменений и несколько скалярных
+полей, поэтому снимок занимает O(1) памяти.
+"""
 
 
 class Game:
@@ -11,164 +69,462 @@ class Game:
     Управляет состоянием игры, ходами игрока и компьютера,
     отображением досок и проверкой победы.
 
+    Движок не пишет в консоль: методы :meth:`fire` и :meth:`step`
+    возвращают :class:`ShotResult`, а подписчики, добавленные через
+    :meth:`subscribe`, получают тот же результат после каждого выстрела.
+
+    Для перебора вариантов (ИИ с просмотром вперёд, анализ "что если")
+    есть :meth:`snapshot`/:meth:`restore` и :meth:`make`/:meth:`unmake`.
+    После первого снимка каждое изменение досок, журналов выстрелов,
+    реестров и прицела записывается в журнал изменений, и откат стоит
+    O(изменённых клеток) без копирования досок.
+
     :ivar player_board: Доска игрока с кораблями.
     :vartype player_board: list[list[str]]
     :ivar computer_board: Доска компьютера с кораблями.
     :vartype computer_board: list[list[str]]
-    :ivar player_shots: Список сделанных игроком выстрелов.
-    :vartype player_shots: list[tuple[int, int]]
-    :ivar computer_shots: Список сделанных компьютером выстрелов.
-    :vartype computer_shots: list[tuple[int, int]]
-    :ivar hunting: Флаг режима "охоты" компьютера после попадания.
-    :vartype hunting: bool
-    :ivar last_hit: Координаты последнего попадания компьютера.
-    :vartype last_hit: tuple[int, int] | None
-    :ivar directions_to_try: Список направлений для стрельбы в режиме охоты.
-    :vartype directions_to_try: list[tuple[int, int]]
-    :ivar current_direction: Текущее выбранное направление в режиме охоты.
-    :vartype current_direction: tuple[int, int] | None
+    :ivar player_fleet: Реестр кораблей игрока.
+    :vartype player_fleet: ShipRegistry
+    :ivar computer_fleet: Реестр кораблей компьютера.
+    :vartype computer_fleet: ShipRegistry
+    :ivar player_shots: Журнал выстрелов игрока.
+    :vartype player_shots: ShotLedger
+    :ivar computer_shots: Журнал выстрелов компьютера.
+    :vartype computer_shots: ShotLedger
+    :ivar turn: Чей ход: ``PLAYER``, ``COMPUTER`` или None после окончания игры.
+    :vartype turn: str | None
+    :ivar winner: Победитель или None, пока игра идёт.
+    :vartype winner: str | None
+    :ivar renderer: Рендерер кадра для :meth:`print_boards`.
+    :vartype renderer: BoardRenderer
+    :ivar ai: Режим прицеливания компьютера — имя стратегии из :attr:`AI_MODES`.
+    :vartype ai: str
+    :ivar strategy: Стратегия стрельбы компьютера (см. ``strategies``).
+    :vartype strategy: strategies.Strategy
+    :ivar seed: Зерно генератора партии; по нему партия воспроизводится.
+    :vartype seed: int
+    :ivar rng: Генератор случайных чисел партии.
+    :vartype rng: random.Random
+    :ivar auto_placed: Была ли доска компьютера расставлена автоматически (из ``rng``).
+    :vartype auto_placed: bool
+    :ivar moves: Засчитанные выстрелы по порядку: кортежи (shooter, r, c).
+    :vartype moves: list[tuple[str, int, int]]
+    :ivar rules: Правила партии: размер доски и состав флота.
+    :vartype rules: Rules
+    :ivar player_hash: Хеш Зобриста доски компьютера в том виде, как её видит игрок.
+    :vartype player_hash: int
+    :ivar computer_hash: Хеш Зобриста доски игрока в том виде, как её видит компьютер;
+                         по нему решения ИИ берутся из кэша ``zobrist.CACHE``.
+    :vartype computer_hash: int
     """
 
-    def __init__(self, board):
+    AI_MODES = tuple(strategies.STRATEGIES)
+    # Режимы, выбор которых зависит от бюджета времени, а не только от зерна.
+    TIMED_AI_MODES = ("montecarlo",)
+
+    def __init__(self, board, computer_board=None, ai="classic", seed=None, rules=DEFAULT_RULES):
         """
         Конструктор класса Game.
 
         :param board: Готовая доска игрока с расставленными кораблями.
         :type board: list[list[str]]
+        :param computer_board: Доска компьютера; если не задана, расставляется автоматически.
+        :type computer_board: list[list[str]] | None
+        :param ai: Режим прицеливания компьютера: "classic" — случайная стрельба
+                   с добиванием, "parity" — то же с поиском по клеткам одного цвета,
+                   "density" — стрельба по максимуму плотности размещений,
+                   "montecarlo" — по выборке согласованных расстановок с бюджетом времени.
+        :type ai: str
+        :param seed: Зерно генератора партии; если не задано, берётся из модуля ``random``.
+        :type seed: int | None
+        :param rules: Правила партии: размер доски и состав флота.
+        :type rules: Rules
+        :raises ValueError: Если задан неизвестный режим прицеливания или
+                            размер доски не совпадает с правилами.
         """
+        if ai not in self.AI_MODES:
+            raise ValueError(f"Неизвестный режим прицеливания: '{ai}'")
+        for b in (board, computer_board):
+            if b is not None and (len(b) != rules.height or len(b[0]) != rules.width):
+                raise ValueError(f"Доска должна иметь размер {rules.width}x{rules.height}")
+        self.rules = rules
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.moves = []
+
         self.player_board = board
-        self.computer_board = auto_place_computer()
-        self.player_shots = []
-        self.computer_shots = []
+        self.auto_placed = computer_board is None
+        if computer_board is None:
+            computer_board = auto_place_computer(self.rng, rules)
+        self.computer_board = computer_board
+        self.player_fleet = ShipRegistry(board)
+        self.computer_fleet = ShipRegistry(computer_board)
+        self.player_shots = ShotLedger(rules.width, rules.height)
+        self.computer_shots = ShotLedger(rules.width, rules.height)
+        # Хеши обновляются в _set и _mark_around на каждой открытой клетке.
+        self._miss_keys, self._hit_keys = keys(rules.cells)
+        self.player_hash = board_hash(computer_board)
+        self.computer_hash = board_hash(board)
+
+        self.turn = PLAYER
+        self.winner = None
+        self._listeners = []
+
+        # Журнал изменений клеток: (доска, r, c, прежнее значение); None — выключен.
+        # Состояние генератора пишется туда же записью (None, 0, 0, состояние),
+        # но только перед первым его использованием после снимка.
+        self._journal = None
+        self._rng_saved = False
+        self._epoch = 0
+        self._taken = 0
+        self._made = []
+
+        self.renderer = BoardRenderer()
+        self.ai = ai
+        self.strategy = strategies.create(ai, rules, self.rng, self.computer_shots)
+
+    def subscribe(self, callback):
+        """
+        Подписывает обработчик на результаты выстрелов.
+
+        :param callback: Функция, принимающая :class:`ShotResult`.
+        :type callback: Callable[[ShotResult], None]
+        :returns: Тот же обработчик (удобно для :meth:`unsubscribe`).
+        :rtype: Callable[[ShotResult], None]
+        """
+        self._listeners.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        """
+        Отписывает обработчик, добавленный через :meth:`subscribe`.
+
+        :param callback: Ранее подписанный обработчик.
+        :type callback: Callable[[ShotResult], None]
+        """
+        self._listeners.remove(callback)
+
+    def snapshot(self):
+        """
+        Делает снимок текущего состояния партии.
+
+        Первый снимок включает журнал изменений; до вызова :meth:`commit`
+        он ведётся при каждом выстреле.
+
+        :returns: Снимок для :meth:`restore`.
+        :rtype: Snapshot
+        """
+        if self._journal is None:
+            self._journal = []
+        self._taken += 1
+        self._rng_saved = False
+        return Snapshot(
+            self._epoch,
+            self._taken,
+            len(self._journal),
+            self.player_shots.mark(),
+            self.computer_shots.mark(),
+            self.player_fleet.mark(),
+            self.computer_fleet.mark(),
+            self.strategy.mark(),
+            len(self.moves),
+            self.turn,
+            self.winner,
+            self.player_hash,
+            self.computer_hash,
+        )
+
+    def restore(self, snapshot):
+        """
+        Возвращает партию в состояние снимка за O(изменений после снимка).
+
+        Снимки восстанавливаются в порядке стека: восстановление снимка
+        делает недействительными снимки, сделанные после него. Подписчики
+        не уведомляются, а рендерер перерисует кадр целиком.
+
+        :param snapshot: Снимок, полученный от :meth:`snapshot`.
+        :type snapshot: Snapshot
+        :raises ValueError: Если снимок недействителен.
+        """
+        if (
+            self._journal is None
+            or snapshot.epoch != self._epoch
+            or snapshot.journal > len(self._journal)
+            or snapshot.moves > len(self.moves)
+        ):
+            raise ValueError("Снимок недействителен")
+        journal = self._journal
+        while len(journal) > snapshot.journal:
+            board, r, c, value = journal.pop()
+            if board is None:
+                self.rng.setstate(value)
+            else:
+                board[r][c] = value
+        self.player_shots.rollback(snapshot.player_shots)
+        self.computer_shots.rollback(snapshot.computer_shots)
+        self.player_fleet.rollback(snapshot.player_fleet)
+        self.computer_fleet.rollback(snapshot.computer_fleet)
+        self.strategy.rollback(snapshot.strategy)
+        del self.moves[snapshot.moves:]
+        self.turn = snapshot.turn
+        self.winner = snapshot.winner
+        self.player_hash = snapshot.player_hash
+        self.computer_hash = snapshot.computer_hash
+        self._rng_saved = False
+        while self._made and self._made[-1].seq > snapshot.seq:
+            self._made.pop()
+        self.renderer.reset()
+
+    def commit(self):
+        """
+        Фиксирует текущее состояние: выключает журнал изменений.
+
+        Все сделанные ранее снимки и ходы :meth:`make` становятся недействительными.
+        """
+        self._journal = None
+        self._epoch += 1
+        self._made.clear()
+        for part in (self.player_shots, self.computer_shots, self.player_fleet, self.computer_fleet):
+            part.forget()
+        self.strategy.forget()
+
+    def make(self, r=None, c=None):
+        """
+        Делает пробный ход стороны, чья сейчас очередь; отменяется через :meth:`unmake`.
+
+        Подписчики о пробных ходах не уведомляются.
+
+        :param r: Строка выстрела (с 0); для хода компьютера необязательна —
+                  без координат клетку выбирает ИИ.
+        :type r: int | None
+        :param c: Столбец выстрела (с 0).
+        :type c: int | None
+        :returns: Результат выстрела.
+        :rtype: ShotResult
+        :raises ValueError: Если игра окончена или для хода игрока не заданы координаты.
+        """
+        if self.winner is not None:
+            raise ValueError("Игра уже окончена")
+        if self.turn == PLAYER and r is None:
+            raise ValueError("Для хода игрока нужны координаты")
+        self._made.append(self.snapshot())
+        listeners, self._listeners = self._listeners, ()
+        try:
+            if self.turn == PLAYER:
+                return self._player_fire(r, c)
+            return self._computer_fire(None if r is None else (r, c))
+        finally:
+            self._listeners = listeners
+
+    def unmake(self):
+        """
+        Отменяет последний ход, сделанный через :meth:`make`.
+
+        :raises ValueError: Если отменять нечего.
+        """
+        if not self._made:
+            raise ValueError("Нет ходов для отмены")
+        self.restore(self._made.pop())
+
+    def _set(self, board, r, c, value):
+        """
+        Открывает клетку доски значением "X" или "O", отмечая изменение в журнале и в хеше.
+        """
+        if self._journal is not None:
+            self._journal.append((board, r, c, board[r][c]))
+        board[r][c] = value
+        key = (self._hit_keys if value == "X" else self._miss_keys)[r * self.rules.width + c]
+        if board is self.computer_board:
+            self.player_hash ^= key
+        else:
+            self.computer_hash ^= key
+
+    def _save_rng(self):
+        """
+        Запоминает состояние генератора в журнале перед его первым использованием после снимка.
+        """
+        if self._journal is not None and not self._rng_saved:
+            self._journal.append((None, 0, 0, self.rng.getstate()))
+            self._rng_saved = True
+
+    def _mark_around(self, board, cells):
+        """
+        Помечает клетки вокруг потопленного корабля, отмечая изменения в журнале.
+
+        :returns: Помеченные клетки.
+        :rtype: list[tuple[int, int]]
+        """
+        marked = mark_around(board, cells)
+        if self._journal is not None:
+            self._journal.extend((board, x, y, "~") for x, y in marked)
+        h = 0
+        width, misses = self.rules.width, self._miss_keys
+        for x, y in marked:
+            h ^= misses[x * width + y]
+        if board is self.computer_board:
+            self.player_hash ^= h
+        else:
+            self.computer_hash ^= h
+        return marked
+
+    def _settle(self, shooter, r, c, hit, sunk):
+        """
+        Подводит итог выстрела: победа, смена хода и уведомление подписчиков.
 
-        self.hunting = False
-        self.last_hit = None
-        self.directions_to_try = []
-        self.current_direction = None
+        :returns: Результат выстрела.
+        :rtype: ShotResult
+        """
+        self.moves.append((shooter, r, c))
+        target = self.computer_fleet if shooter == PLAYER else self.player_fleet
+        if hit and target.alive == 0:
+            self.winner = shooter
+            self.turn = None
+        elif not hit:
+            self.turn = COMPUTER if shooter == PLAYER else PLAYER
+
+        result = ShotResult(shooter, r, c, hit, sunk, self.winner is not None, self.winner)
+        for callback in self._listeners:
+            callback(result)
+        return result
+
+    def _check_turn(self, shooter):
+        """
+        Проверяет, что игра не окончена и сейчас ход ``shooter``.
+
+        :raises ValueError: Если игра окончена или ход другой стороны.
+        """
+        if self.winner is not None:
+            raise ValueError("Игра уже окончена")
+        if self.turn != shooter:
+            raise ValueError("Сейчас ход другой стороны")
+
+    def fire(self, r, c):
+        """
+        Выстрел игрока в клетку (r, c) с проверкой очерёдности хода.
+
+        :param r: Строка выстрела (с 0).
+        :type r: int
+        :param c: Столбец выстрела (с 0).
+        :type c: int
+        :returns: Результат выстрела; для повторного выстрела или заведомо
+                  пустой клетки заполнено поле ``rejected``, а ход не меняется.
+        :rtype: ShotResult
+        :raises ValueError: Если игра окончена или сейчас ход компьютера.
+        """
+        self._check_turn(PLAYER)
+        return self._player_fire(r, c)
+
+    def step(self):
+        """
+        Ход компьютера (один выстрел) с проверкой очерёдности хода.
+
+        :returns: Результат выстрела.
+        :rtype: ShotResult
+        :raises ValueError: Если игра окончена или сейчас ход игрока.
+        """
+        self._check_turn(COMPUTER)
+        return self._computer_fire()
 
     def player_shot(self, r, c):
         """
         Обрабатывает выстрел игрока по компьютеру.
 
-        :param r: Строка выстрела (0-9).
+        Очерёдность хода не проверяется; см. также :meth:`fire`.
+
+        :param r: Строка выстрела (с 0).
         :type r: int
-        :param c: Столбец выстрела (0-9).
+        :param c: Столбец выстрела (с 0).
         :type c: int
         :returns: True при попадании, False при промахе,
                   None при повторном выстреле в ту же клетку,
                   строка "already_empty" если клетка уже помечена как пустая.
         :rtype: bool | None | str
         """
-        if (r, c) in self.player_shots:
+        result = self._player_fire(r, c)
+        if result.rejected == "repeat":
             return None
+        if result.rejected:
+            return result.rejected
+        return result.hit
+
+    def _player_fire(self, r, c):
+        """
+        Выполняет выстрел игрока без проверки очерёдности.
+
+        :rtype: ShotResult
+        """
+        if (r, c) in self.player_shots:
+            return ShotResult(PLAYER, r, c, rejected="repeat")
 
         if self.computer_board[r][c] == "O":
-            return "already_empty"
+            return ShotResult(PLAYER, r, c, rejected="already_empty")
 
-        self.player_shots.append((r, c))
+        self.player_shots.add(r, c)
         hit = self.computer_board[r][c] == "S"
+        sunk = None
 
         if hit:
-            self.computer_board[r][c] = "X"
-            cells = find_ship_cells(self.computer_board, r, c)
-            if all(self.computer_board[x][y] == "X" for x, y in cells):
-                mark_around_sunk(self.computer_board, r, c)
-                print("Вы уничтожили корабль!")
+            self._set(self.computer_board, r, c, "X")
+            ship_id = self.computer_fleet.hit(r, c)
+            if self.computer_fleet.is_sunk(ship_id):
+                self._mark_around(self.computer_board, self.computer_fleet.cells[ship_id])
+                sunk = ship_id
         else:
-            self.computer_board[r][c] = "O"
-        return hit
+            self._set(self.computer_board, r, c, "O")
+        return self._settle(PLAYER, r, c, hit, sunk)
 
     def computer_shot(self):
         """
         Обрабатывает выстрел компьютера по игроку.
 
-        Использует стратегию:
-        1. Случайная стрельба до первого попадания.
-        2. После попадания — режим "охоты" с поиском в соседних клетках.
-        3. После потопления корабля — сброс режима охоты.
+        Клетку выбирает стратегия :attr:`strategy`: в режиме "classic" —
+        случайная стрельба с добиванием после попадания, "parity" — то же,
+        но поиск по клеткам одного цвета, "density" и "montecarlo" — по
+        оценке вероятностей (см. ``strategies``).
+
+        Очерёдность хода не проверяется; см. также :meth:`step`.
 
         :returns: Кортеж (r, c, hit, sunk) — координаты выстрела,
                   флаг попадания, флаг потопления корабля.
         :rtype: tuple[int, int, bool, bool]
         """
-        if not self.hunting:
-            while True:
-                r = random.randint(0, 9)
-                c = random.randint(0, 9)
-                if (r, c) not in self.computer_shots:
-                    break
+        result = self._computer_fire()
+        return result.row, result.col, result.hit, result.sunk is not None
+
+    def _computer_fire(self, target=None):
+        """
+        Выполняет выстрел компьютера без проверки очерёдности.
+
+        :param target: Клетка (r, c), в которую стрелять вместо выбранной ИИ.
+        :type target: tuple[int, int] | None
+        :rtype: ShotResult
+        """
+        self._save_rng()
+        if target is None:
+            r, c = self.strategy.choose(self.computer_hash)
         else:
-            if not self.directions_to_try:
-                self.directions_to_try = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-                random.shuffle(self.directions_to_try)
-
-            found = False
-            for dr, dc in self.directions_to_try:
-                start_r, start_c = self.last_hit
-                nr, nc = start_r + dr, start_c + dc
-
-                if (
-                    0 <= nr < 10
-                    and 0 <= nc < 10
-                    and (nr, nc) not in self.computer_shots
-                ):
-                    r, c = nr, nc
-                    found = True
-                    self.current_direction = (dr, dc)
-                    break
-
-            if not found:
-                self.hunting = False
-                self.last_hit = None
-                self.directions_to_try = []
-                self.current_direction = None
-                return self.computer_shot()
-
-        self.computer_shots.append((r, c))
+            r, c = target
+            if target in self.computer_shots:
+                return ShotResult(COMPUTER, r, c, rejected="repeat")
+
+        self.computer_shots.add(r, c)
         hit = self.player_board[r][c] == "S"
 
         if hit:
-            self.player_board[r][c] = "X"
-
-            if not self.hunting:
-                self.hunting = True
-                self.last_hit = (r, c)
-                self.directions_to_try = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-                random.shuffle(self.directions_to_try)
-                self.current_direction = None
-            else:
-                self.last_hit = (r, c)
-
-                if self.current_direction:
-                    self.directions_to_try = [self.current_direction]
-                    opposite_dir = (
-                        -self.current_direction[0],
-                        -self.current_direction[1],
-                    )
-                    if opposite_dir not in self.directions_to_try:
-                        self.directions_to_try.append(opposite_dir)
-
-            ship_cells = find_ship_cells(self.player_board, r, c)
-            sunk = all(self.player_board[x][y] == "X" for x, y in ship_cells)
+            self._set(self.player_board, r, c, "X")
+            ship_id = self.player_fleet.hit(r, c)
+            ship_cells = self.player_fleet.cells[ship_id]
+            sunk = self.player_fleet.is_sunk(ship_id)
+            self.strategy.update(r, c, True, ship_cells if sunk else None)
 
             if sunk:
-                mark_around_sunk(self.player_board, r, c)
-                self.hunting = False
-                self.last_hit = None
-                self.directions_to_try = []
-                self.current_direction = None
-
-            return r, c, hit, sunk
+                for x, y in self._mark_around(self.player_board, ship_cells):
+                    self.computer_shots.exclude(x, y)
+            return self._settle(COMPUTER, r, c, hit, ship_id if sunk else None)
 
-        else:
-            self.player_board[r][c] = "O"
-
-            if self.hunting and self.current_direction:
-                if self.current_direction in self.directions_to_try:
-                    self.directions_to_try.remove(self.current_direction)
-                self.current_direction = None
-
-            return r, c, hit, False
+        self._set(self.player_board, r, c, "O")
+        self.strategy.update(r, c, False)
+        return self._settle(COMPUTER, r, c, hit, None)
 
     def print_boards(self):
         """
@@ -178,117 +534,101 @@ class Game:
         - Доску игрока с кораблями ('S'), попаданиями ('X') и промахами ('O').
         - Доску компьютера с видимыми для игрока попаданиями ('X') и промахами ('O').
         - Счётчик оставшихся кораблей у игрока и компьютера.
-        """
-        print("\n" + "=" * 60)
-        print("ВАШЕ ПОЛЕ".center(28) + " | " + "КОМПЬЮТЕР".center(28))
-        print("    1 2 3 4 5 6 7 8 9 10      1 2 3 4 5 6 7 8 9 10")
-
-        for i in range(10):
-            left = []
-            for cell in self.player_board[i]:
-                if cell == "S":
-                    left.append("S ")
-                elif cell == "X":
-                    left.append("X ")
-                elif cell == "O":
-                    left.append("O ")
-                else:
-                    left.append("~ ")
-
-            right = []
-            for j in range(10):
-                if self.computer_board[i][j] == "X":
-                    right.append("X ")
-                elif self.computer_board[i][j] == "O":
-                    right.append("O ")
-                elif (i, j) in self.player_shots:
-                    right.append("O ")
-                else:
-                    right.append("~ ")
-
-            print(
-                f"{LETTERS[i]} | {''.join(left).rstrip()} | {LETTERS[i]} | {''.join(right).rstrip()}"
-            )
 
-        player_ships = count_ships(self.player_board)
-        computer_ships = count_ships(self.computer_board)
-        print(f"\nВаши корабли: {player_ships}/10 | Корабли противника: {computer_ships}/10")
+        Вывод выполняет :attr:`renderer`, который перерисовывает только
+        изменившиеся строки и пишет кадр одной записью.
+        """
+        self.renderer.render(self)
 
 
-def main():
+def main(rules=DEFAULT_RULES):
     """
     Основная функция игры.
 
     Запускает игровой цикл, обрабатывает ввод пользователя,
     координирует ходы игрока и компьютера до победы одного из них.
+
+    :param rules: Правила партии: размер доски и состав флота.
+    :type rules: Rules
     """
+    labels = rules.labels
+    rows = f"{labels[0]}-{labels[-1]}"
+    cols = f"1-{rules.width}"
+
     filename = input("Введите имя файла с расстановкой: ").strip()
-    board = load_board(filename)
+    board = load_board(filename, rules)
 
     if board is None:
         print("Ошибка загрузки файла!")
         return
 
-    game = Game(board)
-    player_turn = True
+    errors = validate_fleet(board, rules.fleet)
+    if errors:
+        print("Некорректная расстановка:")
+        for error in errors:
+            print(f"  {error.message}")
+        return
+
+    game = Game(board, rules=rules)
 
     while True:
         game.print_boards()
 
-        if count_ships(game.player_board) == 0:
+        if game.winner == COMPUTER:
             print("\n💀 КОМПЬЮТЕР ПОБЕДИЛ!")
             break
-        if count_ships(game.computer_board) == 0:
+        if game.winner == PLAYER:
             print("\n🎉 ВЫ ПОБЕДИЛИ!")
             break
 
-        if player_turn:
+        if game.turn == PLAYER:
             while True:
                 try:
-                    row = input("\nВаш ход - строка (А-К): ").upper().strip()
+                    row = input(f"\nВаш ход - строка ({rows}): ").upper().strip()
                     if not row:
-                        print("Ошибка! Введите букву от А до К.")
+                        print(f"Ошибка! Введите букву от {labels[0]} до {labels[-1]}.")
                         continue
 
-                    if row not in LETTERS:
-                        print("Ошибка! Используйте буквы от А до К.")
+                    if row not in labels:
+                        print(f"Ошибка! Используйте буквы от {labels[0]} до {labels[-1]}.")
                         continue
 
-                    col_str = input("Ваш ход - столбец (1-10): ").strip()
+                    col_str = input(f"Ваш ход - столбец ({cols}): ").strip()
                     if not col_str:
-                        print("Ошибка! Введите число от 1 до 10.")
+                        print(f"Ошибка! Введите число от 1 до {rules.width}.")
                         continue
 
                     col = int(col_str)
 
-                    pos = coord_to_index(row, col)
+                    pos = coord_to_index(row, col, rules)
 
                     if pos is None:
-                        print("Ошибка координат! Строка: А-К, столбец: 1-10.")
+                        print(f"Ошибка координат! Строка: {rows}, столбец: {cols}.")
                         continue
 
                     r, c = pos
-                    result = game.player_shot(r, c)
+                    result = game.fire(r, c)
 
-                    if result is None:
+                    if result.rejected == "repeat":
                         print("Уже стреляли сюда!")
                         continue
-                    elif result == "already_empty":
+                    elif result.rejected == "already_empty":
                         print("Эта клетка уже отмечена как пустая!")
                         continue
-                    elif result:
+                    elif result.hit:
+                        if result.sunk is not None:
+                            print("Вы уничтожили корабль!")
                         print("✅ Попадание! Стреляйте еще!")
-                        if count_ships(game.computer_board) == 0:
+                        if result.game_over:
                             break
                         game.print_boards()
                         continue
                     else:
                         print("💦 Промах!")
-                        player_turn = False
                         break
 
                 except ValueError:
-                    print("Ошибка! Введите число от 1 до 10.")
+                    print(f"Ошибка! Введите число от 1 до {rules.width}.")
                     continue
                 except KeyboardInterrupt:
                     print("\nИгра прервана.")
@@ -297,32 +637,22 @@ def main():
                     print("Неожиданная ошибка.")
                     continue
         else:
-            computer_turn = True
-            while computer_turn:
+            while game.turn == COMPUTER:
                 print("\nХод компьютера...")
-                rr, cc, hit, sunk = game.computer_shot()
-                print(f"Компьютер стреляет в ({LETTERS[rr]},{cc + 1})")
+                result = game.step()
+                print(f"Компьютер стреляет в ({labels[result.row]},{result.col + 1})")
 
-                if hit:
-                    if sunk:
+                if result.hit:
+                    if result.sunk is not None:
                         print("💥 Попал! Корабль потоплен!")
                         game.print_boards()
-                        if count_ships(game.player_board) == 0:
-                            break
-                        continue
                     else:
                         print("💥 Попал! Стреляет еще!")
-                        if count_ships(game.player_board) == 0:
-                            break
-                        game.print_boards()
-                        continue
+                        if not result.game_over:
+                            game.print_boards()
                 else:
                     print("💦 Промах!")
 
-                computer_turn = False
-
-            player_turn = True
-
 
 if __name__ == "__main__":
     main()
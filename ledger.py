@@ -0,0 +1,178 @@
+"""
+Журнал выстрелов по одной доске.
+
+Журнал отвечает на три вопроса за постоянное время: стреляли ли уже
+в клетку, какая случайная клетка ещё не проверена и в каком порядке
+делались выстрелы. Непроверенные клетки хранятся в списке-пуле вместе
+со словарём позиций; удаление из пула — перестановка с последним
+элементом, поэтому случайный выбор не требует повторных попыток.
+"""
+
+import random
+
+from bitboard import SIZE
+
+
+class ShotLedger:
+    """
+    Журнал выстрелов с проверкой за O(1) и выбором случайной непроверенной клетки.
+
+    Клетка считается закрытой, если в неё стреляли или если она исключена
+    из пула как заведомо пустая (например, вокруг потопленного корабля).
+
+    :ivar history: Выстрелы в порядке их совершения.
+    :vartype history: list[tuple[int, int]]
+    """
+
+    def __init__(self, width=SIZE, height=SIZE):
+        """
+        Конструктор класса ShotLedger.
+
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        """
+        self.history = []
+        self._pool = [(r, c) for r in range(height) for c in range(width)]
+        self._pos = {cell: i for i, cell in enumerate(self._pool)}
+        self._journal = None
+
+    def __contains__(self, cell):
+        """
+        Проверяет, закрыта ли клетка (выстрел был или клетка исключена).
+
+        :param cell: Координаты (row, col).
+        :type cell: tuple[int, int]
+        :rtype: bool
+        """
+        return cell not in self._pos
+
+    def __len__(self):
+        """
+        Возвращает количество сделанных выстрелов.
+
+        :rtype: int
+        """
+        return len(self.history)
+
+    def __iter__(self):
+        """
+        Перебирает выстрелы в порядке их совершения.
+
+        :rtype: Iterator[tuple[int, int]]
+        """
+        return iter(self.history)
+
+    def _take(self, cell):
+        """
+        Удаляет клетку из пула перестановкой с последним элементом.
+
+        :returns: True, если клетка была в пуле.
+        :rtype: bool
+        """
+        i = self._pos.pop(cell, None)
+        if i is None:
+            return False
+        last = self._pool.pop()
+        if i < len(self._pool):
+            self._pool[i] = last
+            self._pos[last] = i
+        if self._journal is not None:
+            self._journal.append((cell, i))
+        return True
+
+    def add(self, r, c):
+        """
+        Записывает выстрел в клетку (r, c).
+
+        :param r: Строка выстрела.
+        :type r: int
+        :param c: Столбец выстрела.
+        :type c: int
+        :returns: True, если выстрел новый; False, если клетка уже закрыта.
+        :rtype: bool
+        """
+        if not self._take((r, c)):
+            return False
+        self.history.append((r, c))
+        return True
+
+    def append(self, cell):
+        """
+        Записывает выстрел; совместимо с прежним списком выстрелов.
+
+        :param cell: Координаты (row, col).
+        :type cell: tuple[int, int]
+        """
+        self.add(*cell)
+
+    def exclude(self, r, c):
+        """
+        Исключает клетку из пула без записи выстрела.
+
+        :returns: True, если клетка была открыта.
+        :rtype: bool
+        """
+        return self._take((r, c))
+
+    def untried(self):
+        """
+        Возвращает количество ещё открытых клеток.
+
+        :rtype: int
+        """
+        return len(self._pool)
+
+    def random_untried(self, rng=random):
+        """
+        Выбирает случайную открытую клетку за O(1).
+
+        :param rng: Генератор случайных чисел.
+        :type rng: random.Random
+        :returns: Координаты (row, col).
+        :rtype: tuple[int, int]
+        :raises ValueError: Если открытых клеток не осталось.
+        """
+        if not self._pool:
+            raise ValueError("Не осталось клеток для выстрела")
+        return self._pool[rng.randrange(len(self._pool))]
+
+    def mark(self):
+        """
+        Включает журнал изменений (если он выключен) и возвращает отметку.
+
+        :returns: Отметка для :meth:`rollback`.
+        :rtype: int
+        """
+        if self._journal is None:
+            self._journal = []
+        return len(self._journal)
+
+    def rollback(self, mark):
+        """
+        Отменяет изменения, сделанные после отметки ``mark``, за O(изменений).
+
+        :param mark: Отметка, полученная от :meth:`mark`.
+        :type mark: int
+        """
+        journal = self._journal
+        pool, pos, history = self._pool, self._pos, self.history
+        while len(journal) > mark:
+            cell, i = journal.pop()
+            if history and history[-1] == cell:
+                history.pop()
+            if i < len(pool):
+                moved = pool[i]
+                pool[i] = cell
+                pos[moved] = len(pool)
+                pool.append(moved)
+            else:
+                pool.append(cell)
+            pos[cell] = i
+
+    def forget(self):
+        """
+        Выключает журнал изменений; ранее полученные отметки становятся недействительными.
+        """
+        self._journal = None
@@ -0,0 +1,297 @@
+"""
+Нагрузочное тестирование: много одновременных партий со скриптовыми игроками.
+
+Каждый игрок обстреливает доску в случайном порядке с заданной частотой
+ходов. Ход — выстрел игрока вместе с ответными выстрелами компьютера;
+его задержка измеряется от отправки выстрела до готовности ответа.
+Закончив партию, игрок сразу начинает новую.
+
+Игроки работают в одном из двух режимов:
+
+* в процессе — через ``Game.player_shot`` и ``Game.computer_shot``; обе
+  доски расставляются ``auto_place_computer`` генератором игрока. Как и
+  на сервере, ходы считаются в общем пуле потоков, поэтому в задержку
+  входит и ожидание свободного потока, и она растёт с одновременностью;
+* через сервер (``server.py``) — по протоколу ``NEW``/``FIRE``. Адрес
+  ``auto`` поднимает сервер внутри процесса, так что прогон не требует
+  ничего внешнего.
+
+Прогон повторяется для нескольких уровней одновременности, и для каждого
+печатается пропускная способность (ходов в секунду) и задержки p50/p99.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from game import COMPUTER, Game
+from rules import DEFAULT_RULES
+from server import GameServer
+from utils import auto_place_computer
+
+
+def _script(rng, rules=DEFAULT_RULES):
+    """
+    Возвращает порядок выстрелов скриптового игрока: все клетки в случайном порядке.
+
+    :param rng: Генератор игрока.
+    :type rng: random.Random
+    :param rules: Правила партии.
+    :type rules: Rules
+    :rtype: list[tuple[int, int]]
+    """
+    cells = [(r, c) for r in range(rules.height) for c in range(rules.width)]
+    rng.shuffle(cells)
+    return cells
+
+
+def percentile(values, q):
+    """
+    Возвращает перцентиль отсортированного списка (метод ближайшего ранга).
+
+    :param values: Отсортированные значения.
+    :type values: list[float]
+    :param q: Уровень от 0 до 1.
+    :type q: float
+    :returns: Значение перцентиля; 0.0 для пустого списка.
+    :rtype: float
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+
+class _Stats:
+    """
+    Общие счётчики прогона одного уровня.
+    """
+
+    def __init__(self):
+        self.latencies = []
+        self.games = 0
+
+
+def _local_turn(game, r, c):
+    """
+    Делает ход в партии: выстрел игрока и ответные выстрелы компьютера.
+
+    :returns: False, если выстрел отклонён (клетка уже открыта).
+    :rtype: bool
+    """
+    if game.player_shot(r, c) == "already_empty":
+        return False
+    while game.turn == COMPUTER:
+        game.computer_shot()
+    return True
+
+
+async def _local_player(rng, interval, deadline, stats, executor, rules=DEFAULT_RULES):
+    """
+    Скриптовый игрок, который играет через ``Game`` в том же процессе.
+
+    Ходы считаются в общем пуле ``executor``; задержка хода включает
+    ожидание свободного потока.
+    """
+    loop = asyncio.get_running_loop()
+    clock = time.perf_counter
+    while time.monotonic() < deadline:
+        game = Game(
+            auto_place_computer(rng, rules), auto_place_computer(rng, rules),
+            seed=rng.getrandbits(64), rules=rules,
+        )
+        for r, c in _script(rng, rules):
+            if time.monotonic() >= deadline:
+                return
+            start = clock()
+            if not await loop.run_in_executor(executor, _local_turn, game, r, c):
+                continue
+            stats.latencies.append(clock() - start)
+            if game.winner is not None:
+                stats.games += 1
+                break
+            await asyncio.sleep(interval)
+
+
+async def _request(reader, writer, line):
+    """
+    Отправляет команду серверу и читает ответ до строки OK/ERR.
+
+    :returns: Строки ответа.
+    :rtype: list[str]
+    :raises ConnectionError: Если сервер закрыл соединение.
+    """
+    writer.write((line + "\n").encode())
+    await writer.drain()
+    lines = []
+    while True:
+        reply = await reader.readline()
+        if not reply:
+            raise ConnectionError("Сервер закрыл соединение")
+        reply = reply.decode().rstrip("\n")
+        lines.append(reply)
+        if reply.startswith(("OK", "ERR")):
+            return lines
+
+
+async def _remote_player(rng, interval, deadline, stats, host, port, rules=DEFAULT_RULES):
+    """
+    Скриптовый игрок, который играет через сервер.
+
+    Правила должны совпадать с правилами сервера. Закончив прогон, игрок
+    всегда отправляет ``QUIT`` и закрывает соединение.
+    """
+    clock = time.perf_counter
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.monotonic() < deadline:
+            await _request(reader, writer, "NEW")
+            for r, c in _script(rng, rules):
+                if time.monotonic() >= deadline:
+                    return
+                start = clock()
+                lines = await _request(reader, writer, f"FIRE {r} {c}")
+                if lines[0].endswith("rejected already_empty"):
+                    continue
+                stats.latencies.append(clock() - start)
+                if any(line.startswith("OVER") for line in lines):
+                    stats.games += 1
+                    break
+                await asyncio.sleep(interval)
+    finally:
+        with contextlib.suppress(ConnectionError):
+            await _request(reader, writer, "QUIT")
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def run_level(concurrency, duration=5.0, rate=0.0, server=None, seed=None, rules=DEFAULT_RULES,
+                    executor=None):
+    """
+    Прогоняет ``concurrency`` одновременных игроков в течение ``duration`` секунд.
+
+    :param concurrency: Число одновременных партий.
+    :type concurrency: int
+    :param duration: Длительность прогона в секундах.
+    :type duration: float
+    :param rate: Ходов в секунду на игрока (0 — без ограничения).
+    :type rate: float
+    :param server: Адрес сервера (host, port) или None для игры в процессе.
+    :type server: tuple[str, int] | None
+    :param seed: Зерно для расстановок и порядка выстрелов.
+    :type seed: int | None
+    :param rules: Правила партий (при игре через сервер — правила сервера).
+    :type rules: Rules
+    :param executor: Пул для ходов при игре в процессе (None — собственный пул потоков).
+    :type executor: concurrent.futures.Executor | None
+    :returns: Сводка: concurrency, games, turns, elapsed, throughput, mean, p50, p99.
+    :rtype: dict
+    """
+    seeder = random.Random(seed)
+    own_executor = server is None and executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor()
+    interval = 1.0 / rate if rate > 0 else 0.0
+    stats = _Stats()
+    start = time.monotonic()
+    deadline = start + duration
+
+    players = []
+    for _ in range(concurrency):
+        rng = random.Random(seeder.getrandbits(64))
+        if server is None:
+            players.append(_local_player(rng, interval, deadline, stats, executor, rules))
+        else:
+            players.append(_remote_player(rng, interval, deadline, stats, *server, rules))
+    try:
+        await asyncio.gather(*players)
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False)
+    elapsed = time.monotonic() - start
+
+    latencies = sorted(stats.latencies)
+    return {
+        "concurrency": concurrency,
+        "games": stats.games,
+        "turns": len(latencies),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+async def run_sweep(levels, duration=5.0, rate=0.0, server=None, seed=None, rules=DEFAULT_RULES):
+    """
+    Прогоняет несколько уровней одновременности по очереди.
+
+    :param levels: Уровни одновременности.
+    :type levels: Iterable[int]
+    :param duration: Длительность прогона каждого уровня в секундах.
+    :type duration: float
+    :param rate: Ходов в секунду на игрока (0 — без ограничения).
+    :type rate: float
+    :param server: Адрес сервера (host, port), "auto" — поднять сервер в
+                   процессе, None — игра в процессе без сервера.
+    :type server: tuple[str, int] | str | None
+    :param seed: Зерно генератора.
+    :type seed: int | None
+    :param rules: Правила партий.
+    :type rules: Rules
+    :returns: Сводки по уровням.
+    :rtype: list[dict]
+    """
+    embedded = None
+    if server == "auto":
+        embedded = GameServer(port=0, idle_timeout=max(60.0, duration * 2), rules=rules)
+        server = ("127.0.0.1", await embedded.start())
+    try:
+        return [await run_level(level, duration, rate, server, seed, rules) for level in levels]
+    finally:
+        if embedded is not None:
+            await embedded.close()
+
+
+def main():
+    """
+    Точка входа: прогон по уровням одновременности и вывод таблицы или JSON.
+    """
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон скриптовыми игроками")
+    parser.add_argument("-c", "--concurrency", default="1,10,100",
+                        help="уровни одновременности через запятую")
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="длительность уровня, с")
+    parser.add_argument("-r", "--rate", type=float, default=0.0,
+                        help="ходов в секунду на игрока (0 — без ограничения)")
+    parser.add_argument("--server", default=None,
+                        help="host:port сервера или 'auto' (по умолчанию — игра в процессе)")
+    parser.add_argument("--seed", type=int, default=None, help="зерно генератора")
+    parser.add_argument("--json", action="store_true", help="вывести результат в JSON")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(",")]
+    server = args.server
+    if server not in (None, "auto"):
+        host, _, port = server.rpartition(":")
+        server = (host or "127.0.0.1", int(port))
+
+    results = asyncio.run(run_sweep(levels, args.duration, args.rate, server, args.seed))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'партий':>8} {'ходов':>9} {'ходов/с':>10} {'p50, мс':>9} {'p99, мс':>9}")
+    for row in results:
+        print(
+            f"{row['concurrency']:>8} {row['turns']:>9} {row['throughput']:>10.0f} "
+            f"{row['p50'] * 1e3:>9.3f} {row['p99'] * 1e3:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
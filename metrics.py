@@ -0,0 +1,313 @@
+"""
+Необязательные замеры времени этапов хода.
+
+Реестр метрик хранит для каждого этапа число вызовов, суммарное время и
+гистограмму задержек с логарифмическими корзинами (границы растут вдвое),
+по которой оцениваются p50/p95/p99. Реестр выгружается в JSON и в
+текстовый формат Prometheus.
+
+Замеры включаются явно через :func:`enable`: функции ``utils`` и
+методы ``Game`` подменяются обёртками, которые засекают время. Так как
+другие модули импортируют функции ``utils`` по имени (``game`` — через
+``from utils import *``), обёртка ставится во все загруженные модули,
+где лежит исходная функция. :func:`disable` возвращает исходные функции,
+поэтому в выключенном состоянии замеры ничего не стоят.
+
+Время вложенных вызовов входит во время внешних: ``mark_around_sunk``
+включает время ``find_ship_cells``, а ``Game.computer_shot`` — время всех
+вызванных им функций ``utils``.
+"""
+
+import argparse
+import functools
+import json
+import sys
+import time
+from bisect import bisect_left
+
+import utils
+from game import Game
+from simulate import play_game
+
+# Границы корзин гистограммы: от 1 мкс до ~17 с, каждая вдвое больше предыдущей.
+BOUNDS = tuple(1e-6 * 2 ** i for i in range(25))
+
+UTILS_FUNCTIONS = (
+    "create_board", "can_place", "place_ship", "find_ship_cells", "mark_around_sunk",
+    "mark_around", "count_ships", "coord_to_index", "auto_place_computer",
+    "parse_board", "check_board", "load_board", "save_board",
+)
+
+# Методы Game и имена этапов. Замеряются внутренние методы, через которые
+# проходят и устаревшие player_shot/computer_shot, и fire/step.
+GAME_METHODS = {
+    "_player_fire": "Game.player_shot",
+    "_computer_fire": "Game.computer_shot",
+    "print_boards": "Game.print_boards",
+}
+
+
+class Histogram:
+    """
+    Гистограмма задержек одного этапа.
+
+    :ivar counts: Число наблюдений в каждой корзине; последняя — больше ``BOUNDS[-1]``.
+    :vartype counts: list[int]
+    :ivar count: Общее число наблюдений.
+    :vartype count: int
+    :ivar total: Суммарное время в секундах.
+    :vartype total: float
+    """
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        """
+        Конструктор класса Histogram.
+        """
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        """
+        Добавляет одно наблюдение.
+
+        :param seconds: Длительность в секундах.
+        :type seconds: float
+        """
+        self.counts[bisect_left(BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def merge(self, other):
+        """
+        Добавляет наблюдения другой гистограммы.
+
+        :param other: Гистограмма того же этапа.
+        :type other: Histogram
+        """
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+
+    def quantile(self, q):
+        """
+        Оценивает квантиль по корзинам (линейно внутри корзины).
+
+        :param q: Уровень квантиля от 0 до 1.
+        :type q: float
+        :returns: Оценка в секундах; 0.0, если наблюдений нет.
+        :rtype: float
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(BOUNDS):
+                    return BOUNDS[-1]
+                lower = BOUNDS[i - 1] if i else 0.0
+                return lower + (BOUNDS[i] - lower) * (rank - seen) / n
+            seen += n
+        return BOUNDS[-1]
+
+
+class MetricsRegistry:
+    """
+    Реестр гистограмм по именам этапов.
+
+    :ivar histograms: Гистограммы этапов.
+    :vartype histograms: dict[str, Histogram]
+    """
+
+    def __init__(self):
+        """
+        Конструктор класса MetricsRegistry.
+        """
+        self.histograms = {}
+
+    def histogram(self, name):
+        """
+        Возвращает гистограмму этапа, создавая её при необходимости.
+
+        :param name: Имя этапа.
+        :type name: str
+        :rtype: Histogram
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def observe(self, name, seconds):
+        """
+        Добавляет наблюдение к этапу ``name``.
+
+        :param name: Имя этапа.
+        :type name: str
+        :param seconds: Длительность в секундах.
+        :type seconds: float
+        """
+        self.histogram(name).observe(seconds)
+
+    def merge(self, other):
+        """
+        Добавляет наблюдения другого реестра (например, из рабочего процесса).
+
+        :param other: Другой реестр.
+        :type other: MetricsRegistry
+        """
+        for name, histogram in other.histograms.items():
+            self.histogram(name).merge(histogram)
+
+    def reset(self):
+        """
+        Удаляет все наблюдения.
+        """
+        self.histograms.clear()
+
+    def to_dict(self):
+        """
+        Возвращает сводку по этапам.
+
+        :returns: Словарь ``{этап: {count, total, mean, p50, p95, p99}}``, время в секундах.
+        :rtype: dict
+        """
+        return {
+            name: {
+                "count": h.count,
+                "total": h.total,
+                "mean": h.total / h.count if h.count else 0.0,
+                "p50": h.quantile(0.50),
+                "p95": h.quantile(0.95),
+                "p99": h.quantile(0.99),
+            }
+            for name, h in sorted(self.histograms.items())
+        }
+
+    def to_json(self):
+        """
+        Выгружает сводку в JSON.
+
+        :rtype: str
+        """
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self, metric="battleship_stage_duration_seconds"):
+        """
+        Выгружает гистограммы в текстовом формате Prometheus.
+
+        :param metric: Имя метрики; этап передаётся меткой ``stage``.
+        :type metric: str
+        :rtype: str
+        """
+        lines = [
+            f"# HELP {metric} Длительность этапов хода.",
+            f"# TYPE {metric} histogram",
+        ]
+        for name, h in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, n in zip(BOUNDS, h.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {h.total!r}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Подменённые атрибуты: (объект, имя, исходное значение).
+_patched = []
+
+
+def _timed(func, histogram):
+    """
+    Оборачивает функцию замером времени.
+
+    :rtype: Callable
+    """
+    clock = time.perf_counter
+    observe = histogram.observe
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe(clock() - start)
+
+    return wrapper
+
+
+def enabled():
+    """
+    Проверяет, включены ли замеры.
+
+    :rtype: bool
+    """
+    return bool(_patched)
+
+
+def enable(registry=REGISTRY):
+    """
+    Включает замеры: подменяет функции ``utils`` и методы ``Game`` обёртками.
+
+    Повторный вызов без :func:`disable` ничего не делает.
+
+    :param registry: Реестр, в который пишутся наблюдения.
+    :type registry: MetricsRegistry
+    """
+    if _patched:
+        return
+    for attr, stage in GAME_METHODS.items():
+        original = Game.__dict__[attr]
+        _patched.append((Game, attr, original))
+        setattr(Game, attr, _timed(original, registry.histogram(stage)))
+
+    modules = [module for module in list(sys.modules.values()) if module is not None]
+    for name in UTILS_FUNCTIONS:
+        original = getattr(utils, name)
+        wrapper = _timed(original, registry.histogram(f"utils.{name}"))
+        for module in modules:
+            if getattr(module, "__dict__", {}).get(name) is original:
+                _patched.append((module, name, original))
+                setattr(module, name, wrapper)
+
+
+def disable():
+    """
+    Выключает замеры и возвращает исходные функции. Наблюдения в реестре сохраняются.
+    """
+    while _patched:
+        owner, name, original = _patched.pop()
+        setattr(owner, name, original)
+
+
+def main():
+    """
+    Прогоняет партии компьютер против компьютера с включёнными замерами и
+    печатает реестр в JSON или в формате Prometheus.
+    """
+    parser = argparse.ArgumentParser(description="Замеры этапов хода на прогоне партий")
+    parser.add_argument("-n", "--games", type=int, default=100, help="количество партий")
+    parser.add_argument("--ai", choices=Game.AI_MODES, default="classic", help="режим прицеливания")
+    parser.add_argument("--format", choices=("json", "prometheus"), default="json", help="формат вывода")
+    args = parser.parse_args()
+
+    enable()
+    try:
+        for _ in range(args.games):
+            play_game(ai=args.ai)
+    finally:
+        disable()
+    print(REGISTRY.to_json() if args.format == "json" else REGISTRY.to_prometheus(), end="")
+
+
+if __name__ == "__main__":
+    main()
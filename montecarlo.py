@@ -0,0 +1,319 @@
+"""
+Прицеливание компьютера выборкой расстановок, согласованных с наблюдениями.
+
+Вместо подсчёта отдельных размещений (см. ``density``) ИИ строит много
+случайных расстановок оставшихся кораблей целиком, каждая из которых
+согласуется со всем, что известно о доске: корабли не заходят на промахи
+и в зоны потопленных кораблей, покрывают все подбитые клетки ещё живых
+кораблей и не касаются друг друга. Стрельба ведётся по клетке, которую
+накрывает больше всего выборок.
+
+Расстановка строится жадно: сначала корабли, покрывающие подбитые клетки,
+затем остальные, от длинных к коротким; неудачная попытка отбрасывается.
+Распределение выборок не строго равномерное, зато одна выборка стоит
+несколько микросекунд.
+
+Решение ограничено бюджетом времени и работает "в любой момент": по
+истечении бюджета используется всё, что успели набрать. Выборку можно
+разделить между процессами пула (:func:`start_pool`); задачи, не
+успевшие к сроку, в решение не попадают и не задерживают ответ.
+
+Если задан кэш решений (см. ``zobrist``), набранные счётчики клеток
+запоминаются по хешу видимой доски, и в уже встречавшемся состоянии
+(чаще всего в дебюте) выборка не повторяется.
+"""
+
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from bitboard import SIZE, iter_cells, spread
+from endgame import Observations
+from placements import FLEET, placement_index
+
+# Бюджет времени на одно решение по умолчанию, с.
+BUDGET = 0.05
+# Предел числа выборок на одно решение.
+MAX_SAMPLES = 20000
+# Сколько случайных размещений пробуется для одного корабля.
+ATTEMPTS = 32
+
+_pool = None
+_pool_size = 0
+
+
+def start_pool(workers=None):
+    """
+    Запускает общий пул процессов для выборки.
+
+    :param workers: Число процессов (None — по числу ядер).
+    :type workers: int | None
+    :returns: Пул процессов.
+    :rtype: concurrent.futures.ProcessPoolExecutor
+    """
+    global _pool, _pool_size
+    stop_pool()
+    _pool_size = workers or os.cpu_count() or 1
+    _pool = ProcessPoolExecutor(max_workers=_pool_size)
+    return _pool
+
+
+def stop_pool():
+    """
+    Останавливает общий пул процессов, если он запущен.
+    """
+    global _pool, _pool_size
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+    _pool_size = 0
+
+
+def sample_fleet(rng, index, sizes, blocked, hits):
+    """
+    Строит одну случайную расстановку кораблей, согласованную с наблюдениями.
+
+    :param rng: Генератор случайных чисел.
+    :type rng: random.Random
+    :param index: Индекс размещений доски.
+    :type index: placements.PlacementIndex
+    :param sizes: Длины кораблей, которые нужно расставить.
+    :type sizes: Sequence[int]
+    :param blocked: Маска клеток, где кораблей быть не может.
+    :type blocked: int
+    :param hits: Маска подбитых клеток непотопленных кораблей.
+    :type hits: int
+    :returns: Маска кораблей или None, если расстановка не удалась.
+    :rtype: int | None
+    """
+    placements = index.placements
+    # random() заметно дешевле randrange(), а смещение выбора здесь несущественно.
+    random_ = rng.random
+    pending = Counter(sizes)
+    taken = blocked
+    ships = 0
+
+    uncovered = hits
+    while uncovered:
+        candidates = index.by_cell[(uncovered & -uncovered).bit_length() - 1]
+        for _ in range(ATTEMPTS):
+            placement = placements[candidates[int(random_() * len(candidates))]]
+            footprint = placement.footprint
+            if (
+                pending[placement.size]
+                and not footprint & taken
+                and not placement.zone & hits & ~footprint
+                # Корабль только из подбитых клеток уже был бы потоплен.
+                and footprint & ~hits
+            ):
+                break
+        else:
+            return None
+        pending[placement.size] -= 1
+        taken |= placement.zone
+        ships |= footprint
+        uncovered &= ~footprint
+
+    # Подбитые клетки уже покрыты, и их соседи вошли в taken вместе с зонами кораблей.
+    for size in sorted(pending.elements(), reverse=True):
+        candidates = index.by_size[size]
+        count = len(candidates)
+        for _ in range(ATTEMPTS):
+            placement = placements[candidates[int(random_() * count)]]
+            if not placement.footprint & taken:
+                break
+        else:
+            return None
+        taken |= placement.zone
+        ships |= placement.footprint
+    return ships
+
+
+def sample_counts(width, height, sizes, blocked, hits, seed, budget, limit):
+    """
+    Набирает выборки расстановок и считает, сколько раз корабль стоит в каждой клетке.
+
+    Выполняется в рабочем процессе или в вызывающем потоке.
+
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :param sizes: Длины непотопленных кораблей.
+    :type sizes: tuple[int, ...]
+    :param blocked: Маска клеток, где кораблей быть не может.
+    :type blocked: int
+    :param hits: Маска подбитых клеток непотопленных кораблей.
+    :type hits: int
+    :param seed: Зерно генератора.
+    :type seed: int
+    :param budget: Время на выборку в секундах (0 — без ограничения).
+    :type budget: float
+    :param limit: Наибольшее число попыток.
+    :type limit: int
+    :returns: Кортеж (счётчики клеток, число удачных выборок).
+    :rtype: tuple[list[int], int]
+    """
+    index = placement_index(tuple(sorted(set(sizes))), width, height)
+    rng = random.Random(seed)
+    counts = [0] * (width * height)
+    samples = 0
+    clock = time.perf_counter
+    deadline = clock() + budget if budget else None
+    for attempt in range(limit):
+        # Часы опрашиваются не на каждой попытке: они дороже самой проверки.
+        if deadline is not None and not attempt % 16 and clock() >= deadline:
+            break
+        ships = sample_fleet(rng, index, sizes, blocked, hits)
+        if ships is None:
+            continue
+        samples += 1
+        ships &= ~hits
+        while ships:
+            low = ships & -ships
+            counts[low.bit_length() - 1] += 1
+            ships ^= low
+    return counts, samples
+
+
+class MonteCarloTargeter(Observations):
+    """
+    Выбор выстрела по частоте клетки в выборке согласованных расстановок.
+
+    :ivar budget: Бюджет времени на решение в секундах (0 — без ограничения).
+    :vartype budget: float
+    :ivar max_samples: Предел числа попыток выборки на решение.
+    :vartype max_samples: int
+    :ivar samples: Число удачных выборок в последнем решении.
+    :vartype samples: int
+    :ivar cache: Кэш решений или None.
+    :vartype cache: zobrist.DecisionCache | None
+    """
+
+    def __init__(self, fleet=FLEET, width=SIZE, height=SIZE, rng=None, budget=None,
+                 max_samples=MAX_SAMPLES, executor=None, tasks=None, cache=None):
+        """
+        Конструктор класса MonteCarloTargeter.
+
+        :param fleet: Длины кораблей флота противника.
+        :type fleet: Iterable[int]
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        :param rng: Генератор, из которого берётся зерно собственного генератора.
+        :type rng: random.Random | None
+        :param budget: Бюджет времени на решение в секундах: None — :data:`BUDGET`,
+                       0 — без ограничения (выборка детерминирована зерном).
+        :type budget: float | None
+        :param max_samples: Предел числа попыток выборки на решение.
+        :type max_samples: int
+        :param executor: Пул процессов (None — общий пул :func:`start_pool`, если он запущен).
+        :type executor: concurrent.futures.Executor | None
+        :param tasks: Сколько задач отдавать пулу за решение (None — по размеру пула).
+        :type tasks: int | None
+        :param cache: Кэш решений для счётчиков клеток по хешу состояния (None — без кэша).
+        :type cache: zobrist.DecisionCache | None
+        """
+        super().__init__(fleet, width, height)
+        self.budget = BUDGET if budget is None else budget
+        self.max_samples = max_samples
+        self.samples = 0
+        self._executor = executor
+        self._tasks = tasks
+        self.cache = cache
+        self._rng = random.Random((rng or random).getrandbits(64))
+
+    def _sample(self, executor, seeds):
+        """
+        Набирает выборки в пределах бюджета времени, в потоке и в пуле процессов.
+
+        :param executor: Пул процессов или None (см. :meth:`_pool`).
+        :type executor: concurrent.futures.Executor | None
+        :param seeds: Зёрна задач пула и, последним, зерно выборки в потоке.
+        :type seeds: list[int]
+        :returns: Сколько раз корабль стоит в каждой клетке.
+        :rtype: list[int]
+        """
+        clock = time.perf_counter
+        deadline = clock() + self.budget
+        sizes = tuple(sorted(self.remaining.elements(), reverse=True))
+        task = (self.width, self.height, sizes, self._blocked, self._hits)
+
+        tasks = len(seeds) - 1
+        share = self.max_samples // (tasks + 1)
+        futures = [
+            executor.submit(sample_counts, *task, seed, self.budget * 0.75, share)
+            for seed in seeds[:tasks]
+        ]
+        counts, self.samples = sample_counts(
+            *task, seeds[-1], max(1e-9, deadline - clock()) if self.budget else 0,
+            self.max_samples - share * tasks,
+        )
+        if futures:
+            done, late = wait(futures, timeout=max(0.0, deadline - clock()))
+            for future in late:
+                future.cancel()
+            for future in done:
+                if future.exception() is None:
+                    more, samples = future.result()
+                    counts = [a + b for a, b in zip(counts, more)]
+                    self.samples += samples
+        return counts
+
+    def _pool(self):
+        """
+        Возвращает пул и число задач для него или (None, 0), если выборка идёт в потоке.
+
+        :rtype: tuple[concurrent.futures.Executor | None, int]
+        """
+        if not self.budget:
+            return None, 0
+        if self._executor is not None:
+            return self._executor, self._tasks or os.cpu_count() or 1
+        if _pool is not None:
+            return _pool, self._tasks or _pool_size
+        return None, 0
+
+    def choose(self, state=None):
+        """
+        Выбирает клетку для следующего выстрела, не превышая бюджета времени.
+
+        :param state: Хеш Зобриста видимой доски для кэша решений.
+        :type state: int | None
+        :returns: Координаты (row, col).
+        :rtype: tuple[int, int]
+        :raises ValueError: Если на доске не осталось клеток для выстрела.
+        """
+        # Зёрна выборки берутся и при попадании в кэш: иначе дальнейший поток
+        # генератора, а с ним и ходы партии, зависели бы от состояния кэша.
+        executor, tasks = self._pool()
+        seeds = [self._rng.getrandbits(64) for _ in range(tasks + 1)]
+        key = None if state is None or self.cache is None else self._key("montecarlo", state)
+        cached = None if key is None else self.cache.get(key)
+        if cached is not None:
+            self.samples, occupied = cached
+            counts = [0] * (self.width * self.height)
+            for cell, n in occupied:
+                counts[cell] = n
+        else:
+            counts = self._sample(executor, seeds)
+            if key is not None and self.samples:
+                self.cache.put(key, (self.samples, tuple((i, n) for i, n in enumerate(counts) if n)))
+
+        width = self.width
+        cells = self._open_cells()
+        if not cells:
+            raise ValueError("Не осталось клеток для выстрела")
+        best = max(counts[i] for i in cells)
+        if not best:
+            # Ни одной выборки к сроку: добиваем подбитый корабль или стреляем наугад.
+            # Диагональные соседи подбитой клетки кораблей не содержат.
+            near = spread(self._hits, width, self.height) & ~self._closed
+            if near:
+                cells = [r * width + c for r, c in iter_cells(near, width)]
+        else:
+            cells = [i for i in cells if counts[i] == best]
+        return divmod(self._rng.choice(cells), width)
@@ -0,0 +1,232 @@
+"""
+Заранее построенный индекс всех размещений кораблей.
+
+Индекс строится один раз для каждого размера доски и набора длин
+кораблей. Для каждого размещения хранятся маска клеток корабля
+(``footprint``) и маска запретной зоны (``zone`` — клетки корабля вместе
+с соседями). Размещение допустимо, если его зона не пересекается с уже
+стоящими кораблями, поэтому проверка кандидата сводится к одному
+побитовому "и", а перебор — к фильтрации готового списка.
+
+На больших досках маски размером во всю доску для каждого размещения
+заняли бы сотни мегабайт (на доске 100x100 — около 69 тысяч размещений
+по 1,25 КБ на маску). Поэтому начиная с ``EAGER_CELLS`` клеток индекс
+хранит только параметры размещений, а маски вычисляются при обращении
+(:class:`LazyPlacement`).
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+from bitboard import SIZE, ship_mask
+
+FLEET = (4, 3, 3, 2, 2, 2, 1, 1, 1, 1)
+
+# Доски с числом клеток больше этого получают индекс без хранимых масок.
+EAGER_CELLS = 1024
+
+Placement = namedtuple(
+    "Placement", ["row", "col", "size", "horizontal", "cells", "footprint", "zone"]
+)
+Placement.__doc__ = """
+Одно размещение корабля.
+
+:ivar row: Начальная строка.
+:ivar col: Начальный столбец.
+:ivar size: Длина корабля.
+:ivar horizontal: Ориентация (для однопалубных всегда True).
+:ivar cells: Индексы клеток корабля (row * width + col).
+:ivar footprint: Маска клеток корабля.
+:ivar zone: Маска клеток корабля вместе с окрестностью.
+"""
+
+
+def zone_mask(row, col, size, horizontal, width=SIZE, height=SIZE):
+    """
+    Возвращает маску корабля вместе с соседними клетками.
+
+    Зона корабля — прямоугольник, поэтому она собирается из одинаковых
+    полос по строкам, без сдвигов всей маски.
+
+    :rtype: int
+    """
+    rows, cols = (1, size) if horizontal else (size, 1)
+    first_row, last_row = max(row - 1, 0), min(row + rows, height - 1)
+    first_col, last_col = max(col - 1, 0), min(col + cols, width - 1)
+    span = ((1 << (last_col - first_col + 1)) - 1) << first_col
+    zone = 0
+    for r in range(first_row, last_row + 1):
+        zone |= span << (r * width)
+    return zone
+
+
+class LazyPlacement(namedtuple("LazyPlacement", ["row", "col", "size", "horizontal", "cells", "width", "height"])):
+    """
+    Размещение корабля, маски которого вычисляются при обращении.
+
+    Поля и свойства совпадают с :class:`Placement`.
+    """
+
+    __slots__ = ()
+
+    @property
+    def footprint(self):
+        """
+        Маска клеток корабля.
+
+        :rtype: int
+        """
+        return ship_mask(self.row, self.col, self.size, self.horizontal, self.width)
+
+    @property
+    def zone(self):
+        """
+        Маска клеток корабля вместе с окрестностью.
+
+        :rtype: int
+        """
+        return zone_mask(self.row, self.col, self.size, self.horizontal, self.width, self.height)
+
+
+class PlacementIndex:
+    """
+    Индекс всех размещений кораблей на доске заданного размера.
+
+    :ivar width: Ширина доски.
+    :vartype width: int
+    :ivar height: Высота доски.
+    :vartype height: int
+    :ivar placements: Все размещения; позиция в кортеже служит идентификатором.
+    :vartype placements: tuple[Placement | LazyPlacement, ...]
+    :ivar by_size: Идентификаторы размещений для каждой длины корабля.
+    :vartype by_size: dict[int, tuple[int, ...]]
+    :ivar by_cell: Для каждой клетки — идентификаторы размещений, которые её покрывают.
+    :vartype by_cell: tuple[tuple[int, ...], ...]
+    :ivar cover: Для каждой длины — число размещений, покрывающих каждую клетку.
+    :vartype cover: dict[int, tuple[int, ...]]
+    """
+
+    def __init__(self, sizes, width=SIZE, height=SIZE):
+        """
+        Конструктор класса PlacementIndex.
+
+        :param sizes: Длины кораблей (повторы игнорируются).
+        :type sizes: Iterable[int]
+        :param width: Ширина доски.
+        :type width: int
+        :param height: Высота доски.
+        :type height: int
+        """
+        self.width = width
+        self.height = height
+        cells = width * height
+        eager = cells <= EAGER_CELLS
+
+        placements = []
+        by_size = {}
+        by_cell = [[] for _ in range(cells)]
+        self._lookup = {}
+        for size in sorted(set(sizes)):
+            ids = []
+            for horizontal in ((True,) if size == 1 else (True, False)):
+                max_row = height if horizontal else height - size + 1
+                max_col = width - size + 1 if horizontal else width
+                for r in range(max_row):
+                    for c in range(max_col):
+                        if horizontal:
+                            covered = tuple(range(r * width + c, r * width + c + size))
+                        else:
+                            covered = tuple(range(r * width + c, (r + size) * width + c, width))
+                        pid = len(placements)
+                        if eager:
+                            footprint = ship_mask(r, c, size, horizontal, width)
+                            zone = zone_mask(r, c, size, horizontal, width, height)
+                            placements.append(Placement(r, c, size, horizontal, covered, footprint, zone))
+                        else:
+                            placements.append(LazyPlacement(r, c, size, horizontal, covered, width, height))
+                        self._lookup[(r, c, size, horizontal)] = pid
+                        if size == 1:
+                            self._lookup[(r, c, size, False)] = pid
+                        ids.append(pid)
+                        for i in covered:
+                            by_cell[i].append(pid)
+            by_size[size] = tuple(ids)
+
+        self.placements = tuple(placements)
+        self.by_size = by_size
+        self.by_cell = tuple(tuple(ids) for ids in by_cell)
+        self.cover = {}
+        for size, ids in by_size.items():
+            cover = [0] * cells
+            for pid in ids:
+                for i in placements[pid].cells:
+                    cover[i] += 1
+            self.cover[size] = tuple(cover)
+
+    def find(self, row, col, size, horizontal):
+        """
+        Находит размещение по его параметрам.
+
+        :returns: Размещение или None, если корабль не помещается на доске.
+        :rtype: Placement | LazyPlacement | None
+        """
+        pid = self._lookup.get((row, col, size, horizontal))
+        return None if pid is None else self.placements[pid]
+
+    def can_place(self, ships, row, col, size, horizontal):
+        """
+        Проверяет размещение одним пересечением масок.
+
+        :param ships: Маска уже размещённых кораблей.
+        :type ships: int
+        :returns: True, если размещение возможно, иначе False.
+        :rtype: bool
+        """
+        placement = self.find(row, col, size, horizontal)
+        return placement is not None and not placement.zone & ships
+
+    def valid(self, ships, size):
+        """
+        Перечисляет размещения корабля длины ``size``, совместимые с кораблями ``ships``.
+
+        :param ships: Маска уже размещённых кораблей.
+        :type ships: int
+        :param size: Длина корабля.
+        :type size: int
+        :returns: Список допустимых размещений.
+        :rtype: list[Placement | LazyPlacement]
+        """
+        placements = self.placements
+        return [placements[pid] for pid in self.by_size[size] if not placements[pid].zone & ships]
+
+    def count(self, ships, size):
+        """
+        Подсчитывает допустимые размещения корабля длины ``size``.
+
+        :param ships: Маска уже размещённых кораблей.
+        :type ships: int
+        :param size: Длина корабля.
+        :type size: int
+        :rtype: int
+        """
+        placements = self.placements
+        return sum(1 for pid in self.by_size[size] if not placements[pid].zone & ships)
+
+
+@lru_cache(maxsize=None)
+def placement_index(sizes=tuple(sorted(set(FLEET))), width=SIZE, height=SIZE):
+    """
+    Возвращает общий (кэшированный) индекс размещений.
+
+    :param sizes: Отсортированные длины кораблей без повторов.
+    :type sizes: tuple[int, ...]
+    :param width: Ширина доски.
+    :type width: int
+    :param height: Высота доски.
+    :type height: int
+    :rtype: PlacementIndex
+    """
+    return PlacementIndex(sizes, width, height)
+
+
+INDEX = placement_index()
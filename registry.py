@@ -0,0 +1,134 @@
+"""
+Реестр кораблей на доске.
+
+Реестр строится один раз при создании игры: каждой клетке корабля
+сопоставляется номер корабля, а для каждого корабля хранится число целых
+клеток. После этого попадание, потопление и число оставшихся кораблей
+определяются за O(1), без поиска в глубину и обхода всей доски.
+
+После :meth:`ShipRegistry.mark` реестр запоминает номера подбитых
+кораблей, и :meth:`ShipRegistry.rollback` возвращает им клетки.
+"""
+
+from bitboard import BitBoard, iter_cells, split_ships
+
+
+class ShipRegistry:
+    """
+    Реестр кораблей одной доски.
+
+    :ivar cells: Клетки каждого корабля (индекс списка — номер корабля).
+    :vartype cells: list[list[tuple[int, int]]]
+    :ivar hp: Число целых клеток каждого корабля.
+    :vartype hp: list[int]
+    :ivar alive: Число кораблей, у которых остались целые клетки.
+    :vartype alive: int
+    """
+
+    def __init__(self, board):
+        """
+        Конструктор класса ShipRegistry.
+
+        Клетки 'X' на доске считаются уже подбитыми.
+
+        :param board: Игровая доска с расставленными кораблями.
+        :type board: list[list[str]]
+        """
+        bb = BitBoard.from_board(board)
+        self.cells = []
+        self.hp = []
+        self.alive = 0
+        self._ship_at = {}
+        self._journal = None
+
+        for ship in split_ships(bb.ships, bb.width, bb.height):
+            ship_id = len(self.cells)
+            cells = list(iter_cells(ship, bb.width))
+            hp = len(cells) - bin(ship & bb.hits).count("1")
+            self.cells.append(cells)
+            self.hp.append(hp)
+            if hp:
+                self.alive += 1
+            for cell in cells:
+                self._ship_at[cell] = ship_id
+
+    def __len__(self):
+        """
+        Возвращает общее количество кораблей (включая потопленные).
+
+        :rtype: int
+        """
+        return len(self.cells)
+
+    def ship_at(self, r, c):
+        """
+        Возвращает номер корабля в клетке (r, c).
+
+        :returns: Номер корабля или None, если в клетке нет корабля.
+        :rtype: int | None
+        """
+        return self._ship_at.get((r, c))
+
+    def hit(self, r, c):
+        """
+        Регистрирует попадание в клетку (r, c).
+
+        Повторное попадание в одну и ту же клетку вызывающий код должен
+        отсекать сам (например, по журналу выстрелов).
+
+        :param r: Строка.
+        :type r: int
+        :param c: Столбец.
+        :type c: int
+        :returns: Номер подбитого корабля или None при промахе.
+        :rtype: int | None
+        """
+        ship_id = self._ship_at.get((r, c))
+        if ship_id is not None and self.hp[ship_id]:
+            self.hp[ship_id] -= 1
+            if not self.hp[ship_id]:
+                self.alive -= 1
+            if self._journal is not None:
+                self._journal.append(ship_id)
+        return ship_id
+
+    def is_sunk(self, ship_id):
+        """
+        Проверяет, потоплен ли корабль.
+
+        :param ship_id: Номер корабля.
+        :type ship_id: int
+        :rtype: bool
+        """
+        return self.hp[ship_id] == 0
+
+    def mark(self):
+        """
+        Включает журнал изменений (если он выключен) и возвращает отметку.
+
+        :returns: Отметка для :meth:`rollback`.
+        :rtype: int
+        """
+        if self._journal is None:
+            self._journal = []
+        return len(self._journal)
+
+    def rollback(self, mark):
+        """
+        Отменяет попадания, зарегистрированные после отметки ``mark``.
+
+        :param mark: Отметка, полученная от :meth:`mark`.
+        :type mark: int
+        """
+        journal = self._journal
+        while len(journal) > mark:
+            ship_id = journal.pop()
+            if not self.hp[ship_id]:
+                self.alive += 1
+            self.hp[ship_id] += 1
+
+    def forget(self):
+        """
+        Выключает журнал изменений; ранее полученные отметки становятся недействительными.
+        """
+        self._journal = None
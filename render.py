@@ -0,0 +1,160 @@
+"""
+Буферизованный вывод игровых досок в консоль.
+
+Рендерер запоминает уже отрисованные строки и перерисовывает только те
+строки досок, которые изменились с прошлого кадра. Кадр собирается
+целиком и выводится одной записью в поток. В режиме ANSI повторные
+кадры перерисовываются на месте: курсор переводится на изменившиеся
+строки, остальной экран не трогается.
+
+Изменившиеся строки определяются по новым выстрелам в ``Game.moves``:
+строка выстрела и соседние с ней, а после потопления — строки вокруг
+всего корабля. Поэтому на больших досках кадр не требует обхода всех
+клеток.
+"""
+
+import sys
+
+# Корабли компьютера игроку не показываются.
+_HIDE_SHIPS = str.maketrans("S", "~")
+
+
+class BoardRenderer:
+    """
+    Рендерер кадра с двумя досками: игрока и компьютера.
+
+    :ivar stream: Поток вывода (None — текущий ``sys.stdout``).
+    :vartype stream: io.TextIOBase | None
+    :ivar ansi: Перерисовывать кадр на месте с помощью ANSI-последовательностей.
+    :vartype ansi: bool
+    """
+
+    def __init__(self, stream=None, ansi=False):
+        """
+        Конструктор класса BoardRenderer.
+
+        :param stream: Поток вывода (None — текущий ``sys.stdout``).
+        :type stream: io.TextIOBase | None
+        :param ansi: Включить перерисовку на месте.
+        :type ansi: bool
+        """
+        self.stream = stream
+        self.ansi = ansi
+        self._game = None
+        self._seen = 0
+        self._rows = []
+        self._frame = None
+
+    def _row(self, game, i, label):
+        """
+        Возвращает строку кадра для i-й строки досок.
+
+        :param game: Игра.
+        :type game: game.Game
+        :param i: Номер строки.
+        :type i: int
+        :param label: Обозначение строки, дополненное до общей ширины.
+        :type label: str
+        :rtype: str
+        """
+        left = " ".join(game.player_board[i])
+        right = " ".join(game.computer_board[i]).translate(_HIDE_SHIPS)
+        return f"{label} | {left} | {label} | {right}"
+
+    def _dirty_rows(self, game):
+        """
+        Возвращает номера строк, которые могли измениться после прошлого кадра.
+
+        :rtype: set[int]
+        """
+        dirty = set()
+        for _, r, c in game.moves[self._seen:]:
+            rows = [r]
+            # Потопление помечает клетки вокруг всего корабля. Какая из досок
+            # изменилась, здесь неважно: лишняя строка просто перерисуется.
+            for fleet in (game.player_fleet, game.computer_fleet):
+                ship = fleet.ship_at(r, c)
+                if ship is not None and fleet.is_sunk(ship):
+                    rows.extend(row for row, _ in fleet.cells[ship])
+            for row in rows:
+                dirty.update((row - 1, row, row + 1))
+        return dirty
+
+    def frame(self, game):
+        """
+        Собирает строки кадра для текущего состояния игры.
+
+        :param game: Игра.
+        :type game: game.Game
+        :returns: Строки кадра без завершающих переводов строк.
+        :rtype: list[str]
+        """
+        rules = game.rules
+        width = max(len(label) for label in rules.labels)
+        labels = [label.ljust(width) for label in rules.labels]
+
+        if game is not self._game or len(game.moves) < self._seen:
+            self._game = game
+            self._rows = [self._row(game, i, label) for i, label in enumerate(labels)]
+        else:
+            for i in self._dirty_rows(game):
+                if 0 <= i < rules.height:
+                    self._rows[i] = self._row(game, i, labels[i])
+        self._seen = len(game.moves)
+
+        span = max(28, 2 * rules.width + width + 3)
+        numbers = " ".join(str(n) for n in range(1, rules.width + 1))
+        gap = " " * max(1, width + 6 - (len(numbers) - (2 * rules.width - 1)))
+        lines = [
+            "",
+            "=" * (2 * span + 4),
+            "ВАШЕ ПОЛЕ".center(span) + " | " + "КОМПЬЮТЕР".center(span),
+            " " * (width + 3) + numbers + gap + numbers,
+        ]
+        lines.extend(self._rows)
+        lines.append("")
+        lines.append(
+            f"Ваши корабли: {game.player_fleet.alive}/{len(game.player_fleet)}"
+            f" | Корабли противника: {game.computer_fleet.alive}/{len(game.computer_fleet)}"
+        )
+        return lines
+
+    def render(self, game):
+        """
+        Выводит кадр одной записью в поток.
+
+        :param game: Игра.
+        :type game: game.Game
+        :returns: None (функция пишет в поток).
+        :rtype: None
+        """
+        lines = self.frame(game)
+        previous = self._frame
+        self._frame = lines
+
+        if not self.ansi:
+            out = "\n".join(lines) + "\n"
+        elif previous is None or len(previous) != len(lines):
+            out = "\x1b[2J\x1b[H" + "\n".join(lines) + "\n"
+        else:
+            parts = [
+                f"\x1b[{n + 1};1H{line}\x1b[K"
+                for n, (line, old) in enumerate(zip(lines, previous))
+                if line is not old and line != old
+            ]
+            # Курсор — под кадр; сообщения, выведенные после прошлого кадра, стираются.
+            parts.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+            out = "".join(parts)
+
+        stream = self.stream or sys.stdout
+        stream.write(out)
+        stream.flush()
+
+    def reset(self):
+        """
+        Сбрасывает кэш; следующий кадр будет выведен полностью.
+        """
+        self._game = None
+        self._seen = 0
+        self._rows = []
+        self._frame = None
@@ -0,0 +1,271 @@
+"""
+Журнал ходов и воспроизведение партий.
+
+Партия полностью определяется зерном генератора (``Game.seed``),
+режимом ИИ, расстановками и последовательностью выстрелов. Журнал
+хранит это в одну строку::
+
+    v1 <ai> <seed> <корабли игрока> <корабли компьютера|-> <выстрелы>
+
+Расстановки записываются шестнадцатеричными масками (см. ``bitboard``);
+``-`` означает, что доска компьютера расставлена автоматически из зерна.
+Выстрелы — подряд идущие ``p<клетка>`` (игрок) и ``c<клетка>`` (компьютер),
+где клетка — индекс ``r * width + c``, например ``p45c7c8p0``.
+
+Партии с правилами не по умолчанию записываются в формате ``v2``, где
+после зерна добавлены размер доски и состав флота::
+
+    v2 <ai> <seed> <ширина>x<высота> <длины через запятую> <корабли игрока> ...
+
+Воспроизведение идёт без ввода-вывода и без проверки очерёдности, через
+те же методы движка, что и живая игра. Координаты выстрелов компьютера
+не подставляются, а вычисляются заново и сверяются с журналом, поэтому
+любое расхождение (например, после изменения ИИ) сразу обнаруживается.
+Исключение — режимы с бюджетом времени (``Game.TIMED_AI_MODES``): их
+выбор зависит от скорости машины, поэтому компьютер стреляет в клетки
+из журнала.
+"""
+
+import argparse
+import re
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from bitboard import BitBoard
+from game import COMPUTER, PLAYER, Game
+from render import BoardRenderer
+from rules import DEFAULT_RULES, Rules
+
+FORMAT = "v1"
+FORMAT_RULES = "v2"
+
+_SHOT = re.compile(r"([pc])(\d+)")
+_SHOOTERS = {"p": PLAYER, "c": COMPUTER}
+_CODES = {PLAYER: "p", COMPUTER: "c"}
+
+
+@dataclass
+class MoveLog:
+    """
+    Журнал одной партии.
+
+    :ivar seed: Зерно генератора партии.
+    :vartype seed: int
+    :ivar ai: Режим прицеливания компьютера.
+    :vartype ai: str
+    :ivar player_ships: Маска кораблей игрока.
+    :vartype player_ships: int
+    :ivar computer_ships: Маска кораблей компьютера или None, если доска
+                          расставлена автоматически из зерна.
+    :vartype computer_ships: int | None
+    :ivar shots: Засчитанные выстрелы по порядку: кортежи (shooter, r, c).
+    :vartype shots: list[tuple[str, int, int]]
+    :ivar rules: Правила партии (обозначения строк в журнал не попадают).
+    :vartype rules: Rules
+    """
+
+    seed: int
+    ai: str
+    player_ships: int
+    computer_ships: Optional[int] = None
+    shots: List[Tuple[str, int, int]] = field(default_factory=list)
+    rules: Rules = DEFAULT_RULES
+
+    def dumps(self):
+        """
+        Записывает журнал в строку.
+
+        :rtype: str
+        """
+        rules = self.rules
+        if (rules.width, rules.height, rules.fleet) == (
+            DEFAULT_RULES.width, DEFAULT_RULES.height, DEFAULT_RULES.fleet
+        ):
+            head = f"{FORMAT} {self.ai} {self.seed}"
+        else:
+            fleet = ",".join(map(str, rules.fleet))
+            head = f"{FORMAT_RULES} {self.ai} {self.seed} {rules.width}x{rules.height} {fleet}"
+        computer = "-" if self.computer_ships is None else f"{self.computer_ships:x}"
+        shots = "".join(f"{_CODES[shooter]}{r * rules.width + c}" for shooter, r, c in self.shots)
+        return f"{head} {self.player_ships:x} {computer} {shots}".rstrip()
+
+    @classmethod
+    def loads(cls, text):
+        """
+        Читает журнал из строки.
+
+        :param text: Строка в формате :meth:`dumps`.
+        :type text: str
+        :rtype: MoveLog
+        :raises ValueError: Если строка не является журналом.
+        """
+        parts = text.split()
+        rules = DEFAULT_RULES
+        if parts and parts[0] == FORMAT_RULES and len(parts) in (7, 8):
+            try:
+                width, height = map(int, parts[3].split("x"))
+                rules = Rules(width, height, tuple(map(int, parts[4].split(","))))
+            except ValueError:
+                raise ValueError("Некорректные правила в журнале партии") from None
+            del parts[3:5]
+        elif len(parts) not in (5, 6) or parts[0] != FORMAT:
+            raise ValueError("Строка не является журналом партии")
+        _, ai, seed, player, computer = parts[:5]
+        shots_text = parts[5] if len(parts) == 6 else ""
+        shots = []
+        position = 0
+        for match in _SHOT.finditer(shots_text):
+            if match.start() != position:
+                break
+            r, c = divmod(int(match.group(2)), rules.width)
+            shots.append((_SHOOTERS[match.group(1)], r, c))
+            position = match.end()
+        if position != len(shots_text):
+            raise ValueError(f"Некорректный выстрел в журнале: '{shots_text[position:position + 8]}'")
+        return cls(
+            int(seed),
+            ai,
+            int(player, 16),
+            None if computer == "-" else int(computer, 16),
+            shots,
+            rules,
+        )
+
+
+def record(game):
+    """
+    Составляет журнал партии по её текущему состоянию.
+
+    :param game: Игра (в том числе незаконченная).
+    :type game: game.Game
+    :rtype: MoveLog
+    """
+    # Маска кораблей включает подбитые клетки, поэтому её можно снять в любой момент партии.
+    player = BitBoard.from_board(game.player_board).ships
+    computer = None if game.auto_placed else BitBoard.from_board(game.computer_board).ships
+    return MoveLog(game.seed, game.ai, player, computer, list(game.moves), game.rules)
+
+
+def start(log):
+    """
+    Создаёт партию в начальном состоянии журнала.
+
+    :param log: Журнал партии.
+    :type log: MoveLog
+    :rtype: game.Game
+    """
+    rules = log.rules
+    computer = None
+    if log.computer_ships is not None:
+        computer = BitBoard(log.computer_ships, width=rules.width, height=rules.height).to_board()
+    player = BitBoard(log.player_ships, width=rules.width, height=rules.height).to_board()
+    return Game(player, computer, log.ai, log.seed, rules)
+
+
+def advance(game, log, begin, end):
+    """
+    Выполняет выстрелы журнала с номерами от ``begin`` до ``end`` (не включая).
+
+    :param game: Партия, в которой уже выполнено ``begin`` выстрелов журнала.
+    :type game: game.Game
+    :param log: Журнал партии.
+    :type log: MoveLog
+    :param begin: Номер первого выстрела.
+    :type begin: int
+    :param end: Номер выстрела, перед которым нужно остановиться.
+    :type end: int
+    :raises ValueError: Если партия разошлась с журналом.
+    """
+    for turn in range(begin, end):
+        shooter, r, c = log.shots[turn]
+        if shooter == PLAYER:
+            result = game._player_fire(r, c)
+            if result.rejected:
+                raise ValueError(f"Ход {turn}: выстрел игрока в ({r}, {c}) не засчитан")
+        else:
+            result = game._computer_fire((r, c) if game.ai in Game.TIMED_AI_MODES else None)
+            if result.rejected or (result.row, result.col) != (r, c):
+                raise ValueError(
+                    f"Ход {turn}: компьютер выстрелил в ({result.row}, {result.col}), "
+                    f"а в журнале ({r}, {c})"
+                )
+
+
+def replay(log, turns=None):
+    """
+    Воспроизводит партию по журналу.
+
+    :param log: Журнал партии.
+    :type log: MoveLog
+    :param turns: Сколько выстрелов выполнить (None — все).
+    :type turns: int | None
+    :returns: Партия после ``turns`` выстрелов.
+    :rtype: game.Game
+    :raises ValueError: Если партия разошлась с журналом.
+    """
+    end = len(log.shots) if turns is None else min(turns, len(log.shots))
+    game = start(log)
+    advance(game, log, 0, end)
+    return game
+
+
+def bisect(log, predicate):
+    """
+    Находит первый ход, после которого выполняется условие.
+
+    Условие должно быть монотонным: если оно выполнено после хода t, то
+    выполнено и после всех следующих ходов (например, "потоплено не меньше
+    трёх кораблей"). Поиск двоичный: O(log n) воспроизведений.
+
+    :param log: Журнал партии.
+    :type log: MoveLog
+    :param predicate: Условие на состояние партии.
+    :type predicate: Callable[[game.Game], bool]
+    :returns: Наименьшее число выстрелов t, при котором ``predicate(replay(log, t))``
+              истинно, или None, если условие не выполняется и в конце партии.
+    :rtype: int | None
+    """
+    low, high = 0, len(log.shots)
+    if not predicate(replay(log, high)):
+        return None
+    while low < high:
+        middle = (low + high) // 2
+        if predicate(replay(log, middle)):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+def main():
+    """
+    Воспроизводит журналы из файла (по одному в строке) и печатает итог каждой партии.
+    """
+    parser = argparse.ArgumentParser(description="Воспроизведение партий по журналам")
+    parser.add_argument("logs", help="файл с журналами, по одному в строке")
+    parser.add_argument("--turn", type=int, default=None,
+                        help="остановиться после указанного числа выстрелов и показать доски")
+    args = parser.parse_args()
+
+    renderer = BoardRenderer()
+    with open(args.logs, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                log = MoveLog.loads(line)
+                started = time.perf_counter()
+                game = replay(log, args.turn)
+                elapsed = time.perf_counter() - started
+            except ValueError as e:
+                print(f"строка {number}: {e}")
+                continue
+            outcome = f"победил {game.winner}" if game.winner else "партия не окончена"
+            print(f"строка {number}: {len(game.moves)} выстрелов, {outcome}, {elapsed * 1e3:.2f} мс")
+            if args.turn is not None:
+                print("\n".join(renderer.frame(game)))
+
+
+if __name__ == "__main__":
+    main()
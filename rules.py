@@ -0,0 +1,151 @@
+"""
+Правила партии: размер доски и состав флота.
+
+Объект :class:`Rules` передаётся в функции ``utils`` и в ``Game``;
+правила по умолчанию (:data:`DEFAULT_RULES`) — классическая доска 10x10
+и флот 1×4, 2×3, 3×2, 4×1.
+
+Строки доски обозначаются буквами ``letters``. Если строк больше, чем
+букв, обозначения становятся двухбуквенными и длиннее (как столбцы в
+электронных таблицах): после "К" идут "АА", "АБ" и так далее.
+"""
+
+from collections import Counter
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Tuple
+
+from bitboard import SIZE
+from placements import FLEET
+
+LETTERS = "АБВГДЕЖЗИК"
+
+
+def row_labels(count, letters=LETTERS):
+    """
+    Возвращает обозначения ``count`` строк доски.
+
+    :param count: Число строк.
+    :type count: int
+    :param letters: Алфавит обозначений.
+    :type letters: str
+    :rtype: tuple[str, ...]
+    """
+    base = len(letters)
+    labels = []
+    for n in range(1, count + 1):
+        label = ""
+        while n:
+            n, digit = divmod(n - 1, base)
+            label = letters[digit] + label
+        labels.append(label)
+    return tuple(labels)
+
+
+@dataclass(frozen=True)
+class Rules:
+    """
+    Размер доски и состав флота.
+
+    :ivar width: Ширина доски (число столбцов).
+    :vartype width: int
+    :ivar height: Высота доски (число строк).
+    :vartype height: int
+    :ivar fleet: Длины кораблей флота.
+    :vartype fleet: tuple[int, ...]
+    :ivar letters: Алфавит обозначений строк.
+    :vartype letters: str
+    """
+
+    width: int = SIZE
+    height: int = SIZE
+    fleet: Tuple[int, ...] = FLEET
+    letters: str = LETTERS
+
+    def __post_init__(self):
+        """
+        Проверяет правила.
+
+        :raises ValueError: Если размеры доски не положительные, флот пуст
+                            или корабль не помещается на доске.
+        """
+        object.__setattr__(self, "fleet", tuple(self.fleet))
+        if self.width < 1 or self.height < 1:
+            raise ValueError("Размеры доски должны быть положительными")
+        if not self.fleet or min(self.fleet) < 1:
+            raise ValueError("Флот должен состоять из кораблей положительной длины")
+        if max(self.fleet) > max(self.width, self.height):
+            raise ValueError(f"Корабль длины {max(self.fleet)} не помещается на доске")
+        if len(set(self.letters)) != len(self.letters) or len(self.letters) < 2:
+            raise ValueError("Алфавит обозначений строк должен состоять из разных букв")
+
+    @property
+    def cells(self):
+        """
+        Число клеток доски.
+
+        :rtype: int
+        """
+        return self.width * self.height
+
+    @cached_property
+    def labels(self):
+        """
+        Обозначения строк доски.
+
+        :rtype: tuple[str, ...]
+        """
+        return row_labels(self.height, self.letters)
+
+    @cached_property
+    def _rows(self):
+        """
+        Номер строки по её обозначению.
+
+        :rtype: dict[str, int]
+        """
+        return {label: i for i, label in enumerate(self.labels)}
+
+    def create_board(self):
+        """
+        Создаёт пустую доску по правилам.
+
+        :rtype: list[list[str]]
+        """
+        return [["~"] * self.width for _ in range(self.height)]
+
+    def contains(self, row, col):
+        """
+        Проверяет, что клетка лежит на доске.
+
+        :rtype: bool
+        """
+        return 0 <= row < self.height and 0 <= col < self.width
+
+    def coord(self, label, number):
+        """
+        Преобразует обозначение строки и номер столбца (с 1) в индексы.
+
+        :param label: Обозначение строки (регистр и пробелы не важны).
+        :type label: str
+        :param number: Номер столбца, начиная с 1.
+        :type number: int
+        :returns: Кортеж (row, col) или None, если координаты вне доски.
+        :rtype: tuple[int, int] | None
+        """
+        row = self._rows.get(label.upper().strip())
+        if row is None or not 1 <= number <= self.width:
+            return None
+        return row, int(number) - 1
+
+    def fleet_summary(self):
+        """
+        Описывает состав флота, например "1×4, 2×3, 3×2, 4×1".
+
+        :rtype: str
+        """
+        counts = Counter(self.fleet)
+        return ", ".join(f"{counts[size]}×{size}" for size in sorted(counts, reverse=True))
+
+
+DEFAULT_RULES = Rules()
@@ -0,0 +1,402 @@
+"""
+Асинхронный TCP-сервер, на котором одновременно идёт много партий.
+
+Протокол строковый (UTF-8, одна команда на строку). Ответ на каждую
+команду — ноль или больше строк данных и завершающая строка ``OK ...``
+или ``ERR <причина>``. Координаты передаются числами с нуля: строка,
+затем столбец.
+
+Команды:
+
+``NEW [classic|parity|density|montecarlo]``
+    Новая партия; доска игрока расставляется автоматически.
+    Ответ: ``OK <session>``.
+``RESUME <session>``
+    Подключиться к существующей партии (например, после обрыва связи).
+    Ответ: ``OK <session>``.
+``FIRE <row> <col>``
+    Выстрел игрока. Данные — строки ``SHOT <кто> <row> <col> <итог>``,
+    где итог — ``miss``, ``hit``, ``sunk`` или ``rejected <причина>``;
+    после промаха игрока сразу следуют выстрелы компьютера. Если партия
+    закончилась, перед ``OK`` идёт строка ``OVER <победитель>``.
+``BOARD``
+    Строки ``OWN <клетки>`` (своя доска) и ``ENEMY <клетки>`` (доска
+    противника со скрытыми кораблями).
+``PING``
+    Проверка связи.
+``QUIT``
+    Закрыть соединение; партия остаётся доступной до вытеснения.
+
+Если команда завершилась непредвиденной ошибкой (в том числе в ходе
+компьютера), ошибка записывается в журнал ``logging``, клиент получает
+``ERR internal error``, а соединение и партия остаются.
+
+Партия без команд дольше ``idle_timeout`` секунд вытесняется, а её
+соединение закрывается строкой ``BYE idle``. Ходы компьютера считаются в
+пуле потоков, чтобы медленное решение ИИ не останавливало цикл событий.
+Время хода ИИ ``montecarlo`` ограничено ``--mc-budget``, а его выборку
+можно вынести в пул процессов (``--mc-workers``). С ключом ``--cache``
+кэш решений ИИ загружается из файла при запуске и сохраняется при остановке.
+"""
+
+import argparse
+import asyncio
+import logging
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import montecarlo
+import zobrist
+from game import COMPUTER, Game
+from rules import DEFAULT_RULES, Rules
+from utils import auto_place_computer
+
+# Корабли противника клиенту не показываются.
+_HIDE_SHIPS = str.maketrans("S", "~")
+
+_log = logging.getLogger(__name__)
+
+
+class Session:
+    """
+    Состояние одной партии на сервере.
+
+    :ivar id: Идентификатор партии.
+    :vartype id: str
+    :ivar game: Игровой движок.
+    :vartype game: game.Game
+    :ivar last_active: Время последней команды (``time.monotonic``).
+    :vartype last_active: float
+    :ivar writer: Поток подключённого клиента или None.
+    :vartype writer: asyncio.StreamWriter | None
+    """
+
+    def __init__(self, session_id, game):
+        """
+        Конструктор класса Session.
+
+        :param session_id: Идентификатор партии.
+        :type session_id: str
+        :param game: Игровой движок.
+        :type game: game.Game
+        """
+        self.id = session_id
+        self.game = game
+        self.last_active = time.monotonic()
+        self.writer = None
+        # Команды одной партии выполняются по очереди, даже с разных соединений.
+        self.lock = asyncio.Lock()
+
+
+def format_shot(result):
+    """
+    Превращает результат выстрела в строку протокола.
+
+    :param result: Результат выстрела.
+    :type result: game.ShotResult
+    :rtype: str
+    """
+    if result.rejected:
+        outcome = f"rejected {result.rejected}"
+    elif result.sunk is not None:
+        outcome = "sunk"
+    elif result.hit:
+        outcome = "hit"
+    else:
+        outcome = "miss"
+    return f"SHOT {result.shooter} {result.row} {result.col} {outcome}"
+
+
+def _computer_turn(game):
+    """
+    Доигрывает ход компьютера до промаха или конца партии.
+
+    Выполняется в пуле потоков.
+
+    :param game: Игровой движок.
+    :type game: game.Game
+    :returns: Результаты выстрелов компьютера.
+    :rtype: list[game.ShotResult]
+    """
+    results = []
+    while game.turn == COMPUTER:
+        results.append(game.step())
+    return results
+
+
+class GameServer:
+    """
+    Сервер партий.
+
+    :ivar sessions: Активные партии по идентификаторам.
+    :vartype sessions: dict[str, Session]
+    :ivar idle_timeout: Через сколько секунд без команд партия вытесняется.
+    :vartype idle_timeout: float
+    :ivar rules: Правила всех партий сервера.
+    :vartype rules: Rules
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, idle_timeout=300.0, executor=None,
+                 rules=DEFAULT_RULES):
+        """
+        Конструктор класса GameServer.
+
+        :param host: Адрес для прослушивания.
+        :type host: str
+        :param port: Порт (0 — выбрать свободный).
+        :type port: int
+        :param idle_timeout: Через сколько секунд без команд партия вытесняется.
+        :type idle_timeout: float
+        :param executor: Пул для ходов компьютера (None — собственный пул потоков).
+        :type executor: concurrent.futures.Executor | None
+        :param rules: Правила всех партий сервера.
+        :type rules: Rules
+        """
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.rules = rules
+        self.sessions = {}
+        self._executor = executor
+        self._own_executor = executor is None
+        self._server = None
+        self._evictor = None
+
+    async def start(self):
+        """
+        Начинает принимать соединения.
+
+        :returns: Фактический порт сервера.
+        :rtype: int
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._evictor = asyncio.create_task(self._evict_loop())
+        return self.port
+
+    async def serve_forever(self):
+        """
+        Запускает сервер и обслуживает соединения до отмены.
+        """
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """
+        Останавливает сервер и закрывает все соединения.
+        """
+        if self._evictor is not None:
+            self._evictor.cancel()
+            self._evictor = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for session in list(self.sessions.values()):
+            self._drop(session, "shutdown")
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _drop(self, session, reason):
+        """
+        Удаляет партию и закрывает её соединение.
+        """
+        self.sessions.pop(session.id, None)
+        writer = session.writer
+        session.writer = None
+        if writer is not None and not writer.is_closing():
+            writer.write(f"BYE {reason}\n".encode())
+            writer.close()
+
+    def evict_idle(self, now=None):
+        """
+        Вытесняет партии, простаивающие дольше ``idle_timeout``.
+
+        :param now: Текущее время ``time.monotonic`` (для тестов).
+        :type now: float | None
+        :returns: Число вытесненных партий.
+        :rtype: int
+        """
+        if now is None:
+            now = time.monotonic()
+        idle = [
+            session for session in self.sessions.values()
+            if now - session.last_active > self.idle_timeout and not session.lock.locked()
+        ]
+        for session in idle:
+            self._drop(session, "idle")
+        return len(idle)
+
+    async def _evict_loop(self):
+        """
+        Периодически вытесняет простаивающие партии.
+        """
+        period = max(self.idle_timeout / 4, 0.05)
+        while True:
+            await asyncio.sleep(period)
+            self.evict_idle()
+
+    async def _handle(self, reader, writer):
+        """
+        Обслуживает одно соединение.
+        """
+        session = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(b"ERR line too long\n")
+                    break
+                if not line:
+                    break
+                try:
+                    command = line.decode().split()
+                except UnicodeDecodeError:
+                    writer.write(b"ERR bad encoding\n")
+                    continue
+                if not command:
+                    continue
+                name = command[0].upper()
+                if name == "QUIT":
+                    writer.write(b"OK bye\n")
+                    break
+                try:
+                    if name in ("NEW", "RESUME"):
+                        response, found = self._open(command, writer)
+                        if found is not None:
+                            if session is not None and session is not found:
+                                session.writer = None
+                            session = found
+                    elif session is None or session.id not in self.sessions:
+                        session = None
+                        response = ["ERR no session"]
+                    else:
+                        async with session.lock:
+                            session.last_active = time.monotonic()
+                            try:
+                                response = await self._command(session, name, command[1:])
+                            finally:
+                                session.last_active = time.monotonic()
+                except Exception:
+                    # Ошибка одной команды не должна обрывать соединение и партию.
+                    _log.exception("Ошибка при выполнении команды %s", name)
+                    response = ["ERR internal error"]
+                writer.write(("\n".join(response) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if session is not None and session.writer is writer:
+                session.writer = None
+            if not writer.is_closing():
+                writer.close()
+
+    def _open(self, command, writer):
+        """
+        Обрабатывает NEW и RESUME.
+
+        :returns: Ответ и партия (None при ошибке).
+        :rtype: tuple[list[str], Session | None]
+        """
+        if command[0].upper() == "NEW":
+            ai = command[1] if len(command) > 1 else "classic"
+            if ai not in Game.AI_MODES:
+                return [f"ERR unknown ai {ai}"], None
+            game = Game(auto_place_computer(rules=self.rules), ai=ai, rules=self.rules)
+            session = Session(secrets.token_hex(8), game)
+            self.sessions[session.id] = session
+        else:
+            session = self.sessions.get(command[1]) if len(command) > 1 else None
+            if session is None:
+                return ["ERR unknown session"], None
+            if session.writer is not None and session.writer is not writer:
+                session.writer.close()
+        session.writer = writer
+        session.last_active = time.monotonic()
+        return [f"OK {session.id}"], session
+
+    async def _command(self, session, name, args):
+        """
+        Выполняет команду партии.
+
+        :returns: Строки ответа, последняя — OK или ERR.
+        :rtype: list[str]
+        """
+        game = session.game
+        if name == "PING":
+            return ["OK pong"]
+        if name == "BOARD":
+            lines = [f"OWN {''.join(row)}" for row in game.player_board]
+            lines += [f"ENEMY {''.join(row).translate(_HIDE_SHIPS)}" for row in game.computer_board]
+            return lines + ["OK"]
+        if name != "FIRE":
+            return [f"ERR unknown command {name}"]
+
+        try:
+            r, c = (int(arg) for arg in args)
+        except ValueError:
+            return ["ERR usage: FIRE <row> <col>"]
+        if not game.rules.contains(r, c):
+            return ["ERR coordinates out of range"]
+        if game.winner is not None:
+            return ["ERR game over"]
+
+        results = [game.fire(r, c)]
+        if game.turn == COMPUTER:
+            loop = asyncio.get_running_loop()
+            results += await loop.run_in_executor(self._executor, _computer_turn, game)
+        lines = [format_shot(result) for result in results]
+        if game.winner is not None:
+            lines.append(f"OVER {game.winner}")
+        return lines + ["OK"]
+
+
+def main():
+    """
+    Запускает сервер из командной строки.
+    """
+    parser = argparse.ArgumentParser(description="Сервер партий морского боя")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес")
+    parser.add_argument("--port", type=int, default=8765, help="порт")
+    parser.add_argument("--idle-timeout", type=float, default=300.0, help="вытеснение партии без команд, с")
+    parser.add_argument("--threads", type=int, default=None, help="потоков для ходов компьютера")
+    parser.add_argument("--mc-budget", type=float, default=montecarlo.BUDGET,
+                        help="бюджет времени на ход ИИ montecarlo, с")
+    parser.add_argument("--mc-workers", type=int, default=0,
+                        help="процессов для выборки ИИ montecarlo (0 — в потоке хода)")
+    parser.add_argument("--cache", default=None, help="файл кэша решений ИИ (прогрев и сохранение)")
+    parser.add_argument("--width", type=int, default=DEFAULT_RULES.width, help="ширина доски")
+    parser.add_argument("--height", type=int, default=DEFAULT_RULES.height, help="высота доски")
+    parser.add_argument("--fleet", default=",".join(map(str, DEFAULT_RULES.fleet)),
+                        help="длины кораблей через запятую")
+    args = parser.parse_args()
+
+    rules = Rules(args.width, args.height, tuple(map(int, args.fleet.split(","))))
+
+    if args.cache:
+        zobrist.CACHE.warm(args.cache)
+    montecarlo.BUDGET = args.mc_budget
+    if args.mc_workers:
+        montecarlo.start_pool(args.mc_workers)
+    server = GameServer(args.host, args.port, args.idle_timeout, ThreadPoolExecutor(args.threads), rules)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        montecarlo.stop_pool()
+        if args.cache:
+            zobrist.CACHE.save(args.cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,43 @@
 from utils import *
+from rules import DEFAULT_RULES
 
 
-def manual_place():
+def manual_place(rules=DEFAULT_RULES):
     """
     Ручная расстановка кораблей на доске через консольный интерфейс.
 
+    :param rules: Правила партии: размер доски и состав флота.
+    :type rules: Rules
     :returns: Доска с расставленными кораблями.
     :rtype: list[list[str]]
     """
-    board = create_board()
-    ships = [4, 3, 3, 2, 2, 2, 1, 1, 1, 1]
+    board = create_board(rules)
+    labels = rules.labels
 
-    print("Расстановка кораблей: 1×4, 2×3, 3×2, 4×1\n")
+    print(f"Расстановка кораблей: {rules.fleet_summary()}\n")
 
-    for size in ships:
+    for size in rules.fleet:
         while True:
-            print_board(board)
+            print_board(board, rules)
             print(f"Разместите корабль длиной {size}")
 
             try:
-                row_input = input("Строка (А-К): ").upper().strip()
-                if not row_input or row_input not in LETTERS:
-                    print("Ошибка! Используйте буквы А-К.")
+                row_input = input(f"Строка ({labels[0]}-{labels[-1]}): ").upper().strip()
+                if not row_input or row_input not in labels:
+                    print(f"Ошибка! Используйте буквы {labels[0]}-{labels[-1]}.")
                     continue
 
-                r = LETTERS.index(row_input)
+                r = labels.index(row_input)
 
-                col_str = input("Столбец (1-10): ").strip()
+                col_str = input(f"Столбец (1-{rules.width}): ").strip()
                 if not col_str:
-                    print("Ошибка! Введите число от 1 до 10.")
+                    print(f"Ошибка! Введите число от 1 до {rules.width}.")
                     continue
 
                 c = int(col_str) - 1
 
-                if not 0 <= c <= 9:
-                    print("Ошибка! Столбец от 1 до 10.")
+                if not 0 <= c < rules.width:
+                    print(f"Ошибка! Столбец от 1 до {rules.width}.")
                     continue
 
                 if size > 1:
@@ -61,36 +64,44 @@ def manual_place():
     return board
 
 
-def auto_place_player():
+def auto_place_player(rules=DEFAULT_RULES):
     """
     Автоматическая расстановка кораблей для игрока.
 
-    :returns: Доска с автоматически расставленными кораблями или None при ошибке.
-    :rtype: list[list[str]] | None
+    :param rules: Правила партии: размер доски и состав флота.
+    :type rules: Rules
+    :returns: Доска с автоматически расставленными кораблями.
+    :rtype: list[list[str]]
     """
-    return auto_place_computer()
+    return auto_place_computer(rules=rules)
 
 
-def print_board(board):
+def print_board(board, rules=DEFAULT_RULES):
     """
     Выводит игровую доску в консоль в читаемом формате.
 
     :param board: Игровая доска для отображения.
     :type board: list[list[str]]
+    :param rules: Правила партии, задающие обозначения строк.
+    :type rules: Rules
     """
-    print("\n   1 2 3 4 5 6 7 8 9 10")
-    for i in range(10):
-        row_str = " ".join(board[i])
-        print(f"{LETTERS[i]}  {row_str}")
+    width = max(len(label) for label in rules.labels)
+    print("\n" + " " * (width + 2) + " ".join(str(n) for n in range(1, rules.width + 1)))
+    for label, row in zip(rules.labels, board):
+        row_str = " ".join(row)
+        print(f"{label.ljust(width)}  {row_str}")
     print()
 
 
-def main():
+def main(rules=DEFAULT_RULES):
     """
     Основная функция модуля setup.
 
     Предлагает пользователю выбрать способ расстановки кораблей
     (автоматический или ручной), сохраняет результат в файл.
+
+    :param rules: Правила партии: размер доски и состав флота.
+    :type rules: Rules
     """
     while True:
         print("1. Автоматическая расстановка")
@@ -98,19 +109,16 @@ def main():
         choice = input("Выберите вариант: ").strip()
 
         if choice == "1":
-            board = auto_place_player()
-            if board is None:
-                print("Не удалось автоматически расставить корабли. Попробуйте еще раз.")
-                return
+            board = auto_place_player(rules)
             break
         elif choice == "2":
-            board = manual_place()
+            board = manual_place(rules)
             break
         else:
             print("Ошибка! Введите 1 или 2.")
             continue
 
-    print_board(board)
+    print_board(board, rules)
 
     while True:
         filename = input("Введите имя файла для сохранения: ").strip()
@@ -118,7 +126,7 @@ def main():
             print("Ошибка! Введите имя файла.")
             continue
 
-        if save_board(board, filename):
+        if save_board(board, filename, rules):
             print(f"Расстановка сохранена в файл {filename}")
             break
         else:
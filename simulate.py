@@ -0,0 +1,230 @@
+"""
+Безголовый прогон партий "компьютер против компьютера".
+
+Партии играются без ввода и вывода в консоль: каждая сторона получает
+доску из ``auto_place_computer()`` и стреляет через ``Game.computer_shot``.
+Партии распределяются по пулу процессов, а результат сводится в общую
+статистику: распределение числа выстрелов до победы, скорость в партиях
+в секунду и производительность каждого рабочего процесса.
+
+С ключом ``--cache`` кэш решений ИИ (``zobrist.CACHE``) прогревается из
+файла в каждом процессе, а после прогона записи всех процессов
+сливаются и сохраняются обратно.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import zobrist
+from game import Game
+from rules import DEFAULT_RULES, Rules
+from utils import auto_place_computer
+
+# Файлы кэша решений, уже загруженные в этом процессе.
+_warmed = set()
+
+
+def play_game(board_a=None, board_b=None, ai="classic", seed=None, rules=DEFAULT_RULES):
+    """
+    Играет одну партию компьютера против компьютера.
+
+    Сторона 0 стреляет по доске ``board_b``, сторона 1 — по доске ``board_a``.
+    Сторона 0 ходит первой; как и в консольной игре, после попадания
+    сторона стреляет ещё раз.
+
+    :param board_a: Доска стороны 0; если не задана, расставляется автоматически.
+    :type board_a: list[list[str]] | None
+    :param board_b: Доска стороны 1; если не задана, расставляется автоматически.
+    :type board_b: list[list[str]] | None
+    :param ai: Режим прицеливания обеих сторон (см. ``Game.AI_MODES``) или пара
+               режимов (сторона 0, сторона 1).
+    :type ai: str | tuple[str, str]
+    :param seed: Зерно, из которого берутся зёрна партий обеих сторон
+                 (None — из модуля ``random``).
+    :type seed: int | None
+    :param rules: Правила партии.
+    :type rules: Rules
+    :returns: Кортеж (winner, shots) — номер победившей стороны и число её выстрелов.
+    :rtype: tuple[int, int]
+    """
+    if board_a is None:
+        board_a = auto_place_computer(rules=rules)
+    if board_b is None:
+        board_b = auto_place_computer(rules=rules)
+    ai_a, ai_b = (ai, ai) if isinstance(ai, str) else ai
+    seeds = (None, None)
+    if seed is not None:
+        seeder = random.Random(seed)
+        seeds = (seeder.getrandbits(64), seeder.getrandbits(64))
+
+    attackers = (
+        Game(board_b, board_a, ai_a, seeds[0], rules),
+        Game(board_a, board_b, ai_b, seeds[1], rules),
+    )
+    shots = [0, 0]
+    turn = 0
+
+    while True:
+        attacker = attackers[turn]
+        _, _, hit, _ = attacker.computer_shot()
+        shots[turn] += 1
+        if hit:
+            if attacker.player_fleet.alive == 0:
+                return turn, shots[turn]
+        else:
+            turn ^= 1
+
+
+def _play_chunk(count, seed, ai, cache=None, rules=DEFAULT_RULES):
+    """
+    Играет серию партий в рабочем процессе.
+
+    :param count: Количество партий.
+    :type count: int
+    :param seed: Зерно генератора серии (расстановки и зёрна партий) или None.
+    :type seed: int | None
+    :param ai: Режим прицеливания.
+    :type ai: str
+    :param cache: Файл кэша решений для прогрева процесса или None.
+    :type cache: str | None
+    :param rules: Правила партий.
+    :type rules: Rules
+    :returns: Кортеж (pid, elapsed, shots_to_win, wins, cache_stats, entries), где
+              cache_stats — попадания и промахи кэша в этой серии, а entries —
+              записи кэша процесса (None без ``cache``).
+    :rtype: tuple[int, float, Counter, list[int], tuple[int, int], list | None]
+    """
+    if cache is not None and cache not in _warmed:
+        zobrist.CACHE.warm(cache)
+        _warmed.add(cache)
+    rng = random.Random(seed)
+    shots_to_win = Counter()
+    wins = [0, 0]
+    hits, misses = zobrist.CACHE.hits, zobrist.CACHE.misses
+    start = time.perf_counter()
+    for _ in range(count):
+        board_a = auto_place_computer(rng, rules)
+        board_b = auto_place_computer(rng, rules)
+        winner, shots = play_game(board_a, board_b, ai, rng.getrandbits(64), rules)
+        shots_to_win[shots] += 1
+        wins[winner] += 1
+    elapsed = time.perf_counter() - start
+    cache_stats = (zobrist.CACHE.hits - hits, zobrist.CACHE.misses - misses)
+    entries = None if cache is None else zobrist.CACHE.items()
+    return os.getpid(), elapsed, shots_to_win, wins, cache_stats, entries
+
+
+def run_simulation(games, workers=None, chunk_size=200, seed=None, ai="classic", cache=None,
+                   rules=DEFAULT_RULES):
+    """
+    Играет ``games`` партий в пуле процессов и собирает статистику.
+
+    :param games: Общее количество партий.
+    :type games: int
+    :param workers: Число рабочих процессов (None — по числу ядер, 1 — без пула).
+    :type workers: int | None
+    :param chunk_size: Сколько партий отдаётся процессу за одну задачу.
+    :type chunk_size: int
+    :param seed: Зерно для воспроизводимого прогона или None.
+    :type seed: int | None
+    :param ai: Режим прицеливания обеих сторон (см. ``Game.AI_MODES``).
+    :type ai: str
+    :param cache: Файл кэша решений: прогревается перед прогоном и
+                  сохраняется после него (None — без сохранения).
+    :type cache: str | None
+    :param rules: Правила партий.
+    :type rules: Rules
+    :returns: Словарь со статистикой прогона.
+    :rtype: dict
+    :raises ValueError: Если games или chunk_size не положительные.
+    """
+    if games <= 0 or chunk_size <= 0:
+        raise ValueError("Количество партий и размер задачи должны быть положительными")
+
+    seeder = random.Random(seed)
+    chunks = []
+    left = games
+    while left > 0:
+        count = min(chunk_size, left)
+        chunks.append((count, seeder.getrandbits(64) if seed is not None else None))
+        left -= count
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [_play_chunk(count, chunk_seed, ai, cache, rules) for count, chunk_seed in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_play_chunk, count, chunk_seed, ai, cache, rules) for count, chunk_seed in chunks
+            ]
+            results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    shots_to_win = Counter()
+    wins = [0, 0]
+    per_worker = {}
+    cache_hits = cache_misses = 0
+    for (count, _), result in zip(chunks, results):
+        pid, chunk_elapsed, chunk_shots, chunk_wins, (hits, misses), entries = result
+        cache_hits += hits
+        cache_misses += misses
+        if entries is not None and workers != 1:
+            zobrist.CACHE.update(entries)
+        shots_to_win.update(chunk_shots)
+        wins[0] += chunk_wins[0]
+        wins[1] += chunk_wins[1]
+        stats = per_worker.setdefault(pid, {"games": 0, "elapsed": 0.0})
+        stats["games"] += count
+        stats["elapsed"] += chunk_elapsed
+
+    for stats in per_worker.values():
+        stats["games_per_sec"] = stats["games"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    if cache is not None:
+        zobrist.CACHE.save(cache)
+
+    total_shots = sum(shots * n for shots, n in shots_to_win.items())
+    return {
+        "ai": ai,
+        "games": games,
+        "elapsed": elapsed,
+        "games_per_sec": games / elapsed if elapsed else 0.0,
+        "wins": wins,
+        "mean_shots_to_win": total_shots / games,
+        "shots_to_win": dict(sorted(shots_to_win.items())),
+        "workers": per_worker,
+        "cache": {"hits": cache_hits, "misses": cache_misses, "size": len(zobrist.CACHE)},
+    }
+
+
+def main():
+    """
+    Точка входа для запуска симуляции из командной строки.
+
+    Печатает статистику прогона в формате JSON.
+    """
+    parser = argparse.ArgumentParser(description="Прогон партий компьютер против компьютера")
+    parser.add_argument("-n", "--games", type=int, default=1000, help="количество партий")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="число процессов")
+    parser.add_argument("--chunk-size", type=int, default=200, help="партий на задачу")
+    parser.add_argument("--seed", type=int, default=None, help="зерно генератора")
+    parser.add_argument("--ai", choices=Game.AI_MODES, default="classic", help="режим прицеливания")
+    parser.add_argument("--cache", default=None, help="файл кэша решений ИИ (прогрев и сохранение)")
+    parser.add_argument("--width", type=int, default=DEFAULT_RULES.width, help="ширина доски")
+    parser.add_argument("--height", type=int, default=DEFAULT_RULES.height, help="высота доски")
+    parser.add_argument("--fleet", default=",".join(map(str, DEFAULT_RULES.fleet)),
+                        help="длины кораблей через запятую")
+    args = parser.parse_args()
+
+    rules = Rules(args.width, args.height, tuple(map(int, args.fleet.split(","))))
+    stats = run_simulation(args.games, args.workers, args.chunk_size, args.seed, args.ai, args.cache,
+                           rules)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
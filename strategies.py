@@ -0,0 +1,460 @@
+"""
+Стратегии стрельбы: выбор клетки для выстрела, отделённый от движка.
+
+Стратегия знает только то, что видит стреляющая сторона: свои выстрелы
+(журнал ``ShotLedger``), их результаты и правила партии. ``Game``
+спрашивает у стратегии клетку (:meth:`Strategy.choose`), сам выполняет
+выстрел и сообщает результат (:meth:`Strategy.update`). Для пробных
+ходов ``Game.make``/``Game.unmake`` стратегия, как и остальные части
+движка, умеет ставить отметку и откатываться к ней.
+
+Стратегии регистрируются в :data:`STRATEGIES` по именам режимов ИИ
+(``Game.AI_MODES``) и создаются через :func:`create`; партия может
+использовать любую из них, а турнир (``tournament``) — сводить их между
+собой.
+"""
+
+from abc import ABC, abstractmethod
+
+import heatmap
+from density import DensityTargeter
+from endgame import EndgameSolver
+from montecarlo import MonteCarloTargeter
+from zobrist import CACHE
+
+# Направления добивания: вправо, вниз, влево, вверх.
+DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+# Сколько первых выстрелов MonteCarloStrategy делает по тепловой карте (до первого попадания).
+OPENING_SHOTS = 3
+# Сколько случайных клеток пробует ParityStrategy, прежде чем стрелять вне своего цвета.
+PARITY_ATTEMPTS = 16
+
+
+class Strategy(ABC):
+    """
+    Протокол стратегии стрельбы.
+
+    Подкласс обязан переопределить :meth:`choose`; иначе он не создаётся.
+
+    :ivar rules: Правила партии.
+    :vartype rules: Rules
+    :ivar rng: Генератор случайных чисел партии.
+    :vartype rng: random.Random
+    :ivar shots: Журнал выстрелов стреляющей стороны (стратегия его только читает).
+    :vartype shots: ShotLedger
+    """
+
+    def __init__(self, rules, rng, shots):
+        """
+        Конструктор класса Strategy.
+
+        :param rules: Правила партии.
+        :type rules: Rules
+        :param rng: Генератор случайных чисел партии; через него идут все случайные
+                    решения, поэтому партия воспроизводится по зерну.
+        :type rng: random.Random
+        :param shots: Журнал выстрелов стреляющей стороны.
+        :type shots: ShotLedger
+        """
+        self.rules = rules
+        self.rng = rng
+        self.shots = shots
+
+    @abstractmethod
+    def choose(self, state=None):
+        """
+        Выбирает клетку для следующего выстрела.
+
+        :param state: Хеш Зобриста видимой доски противника (см. ``zobrist``).
+        :type state: int | None
+        :returns: Координаты (row, col) открытой клетки.
+        :rtype: tuple[int, int]
+        """
+
+    def update(self, row, col, hit, sunk_cells=None):
+        """
+        Учитывает результат выстрела (в том числе выстрела не в выбранную клетку).
+
+        :param row: Строка выстрела.
+        :type row: int
+        :param col: Столбец выстрела.
+        :type col: int
+        :param hit: Было ли попадание.
+        :type hit: bool
+        :param sunk_cells: Клетки потопленного корабля, если выстрел его потопил.
+        :type sunk_cells: Iterable[tuple[int, int]] | None
+        """
+
+    def mark(self):
+        """
+        Возвращает отметку состояния для :meth:`rollback`.
+
+        :rtype: object
+        """
+        return None
+
+    def rollback(self, mark):
+        """
+        Возвращает состояние на момент отметки ``mark``.
+
+        :param mark: Отметка, полученная от :meth:`mark`.
+        :type mark: object
+        """
+
+    def forget(self):
+        """
+        Забывает отметки (журнал изменений движка выключен).
+        """
+
+
+class HuntStrategy(Strategy):
+    """
+    Случайная стрельба, а после попадания — добивание по соседним клеткам.
+
+    :ivar hunting: Идёт ли добивание подбитого корабля.
+    :vartype hunting: bool
+    :ivar last_hit: Координаты последнего попадания.
+    :vartype last_hit: tuple[int, int] | None
+    :ivar directions_to_try: Направления, которые ещё стоит проверить.
+    :vartype directions_to_try: list[tuple[int, int]]
+    :ivar current_direction: Направление последнего выстрела добивания.
+    :vartype current_direction: tuple[int, int] | None
+    """
+
+    def __init__(self, rules, rng, shots):
+        """
+        Конструктор класса HuntStrategy.
+
+        Параметры совпадают с :class:`Strategy`.
+        """
+        super().__init__(rules, rng, shots)
+        self.hunting = False
+        self.last_hit = None
+        self.directions_to_try = []
+        self.current_direction = None
+        # Клетка, выбранная последним choose(); выстрел в другую сбрасывает направление.
+        self._chosen = None
+
+    def _reset(self):
+        """
+        Заканчивает добивание.
+        """
+        self.hunting = False
+        self.last_hit = None
+        self.directions_to_try = []
+        self.current_direction = None
+
+    def _random(self):
+        """
+        Выбирает клетку для стрельбы вслепую.
+
+        :rtype: tuple[int, int]
+        """
+        return self.shots.random_untried(self.rng)
+
+    def choose(self, state=None):
+        """
+        Выбирает клетку: вслепую или рядом с последним попаданием.
+
+        :param state: Не используется.
+        :type state: int | None
+        :rtype: tuple[int, int]
+        """
+        self._chosen = self._choose()
+        return self._chosen
+
+    def _choose(self):
+        """
+        Выбирает клетку без запоминания выбора (см. :meth:`choose`).
+
+        :rtype: tuple[int, int]
+        """
+        if not self.hunting:
+            return self._random()
+        if not self.directions_to_try:
+            self.directions_to_try = list(DIRECTIONS)
+            self.rng.shuffle(self.directions_to_try)
+
+        start_r, start_c = self.last_hit
+        for dr, dc in self.directions_to_try:
+            nr, nc = start_r + dr, start_c + dc
+            if self.rules.contains(nr, nc) and (nr, nc) not in self.shots:
+                self.current_direction = (dr, dc)
+                return nr, nc
+
+        self._reset()
+        return self._random()
+
+    def update(self, row, col, hit, sunk_cells=None):
+        """
+        Продолжает или заканчивает добивание по результату выстрела.
+
+        Параметры совпадают с :meth:`Strategy.update`.
+        """
+        if (row, col) != self._chosen:
+            self.current_direction = None
+        self._chosen = None
+
+        if not hit:
+            if self.hunting and self.current_direction:
+                if self.current_direction in self.directions_to_try:
+                    self.directions_to_try.remove(self.current_direction)
+                self.current_direction = None
+            return
+
+        if not self.hunting:
+            self.hunting = True
+            self.last_hit = (row, col)
+            self.directions_to_try = list(DIRECTIONS)
+            self.rng.shuffle(self.directions_to_try)
+            self.current_direction = None
+        else:
+            self.last_hit = (row, col)
+            if self.current_direction:
+                opposite = (-self.current_direction[0], -self.current_direction[1])
+                self.directions_to_try = [self.current_direction, opposite]
+        if sunk_cells:
+            self._reset()
+
+    def mark(self):
+        """
+        Возвращает отметку: состояние добивания умещается в несколько полей.
+
+        :rtype: tuple
+        """
+        return self.hunting, self.last_hit, tuple(self.directions_to_try), self.current_direction
+
+    def rollback(self, mark):
+        """
+        Возвращает состояние на момент отметки ``mark``.
+
+        :param mark: Отметка, полученная от :meth:`mark`.
+        :type mark: tuple
+        """
+        self.hunting, self.last_hit, directions, self.current_direction = mark
+        self.directions_to_try = list(directions)
+        self._chosen = None
+
+
+class ParityStrategy(HuntStrategy):
+    """
+    Добивание как у :class:`HuntStrategy`, но вслепую — только по клеткам одного цвета.
+
+    Корабль длиной от двух клеток всегда занимает клетки обоих цветов
+    шахматной раскраски, поэтому для поиска достаточно половины доски.
+    Цвет выбирается случайно в начале партии; когда клеток этого цвета
+    не остаётся (или они не находятся за :data:`PARITY_ATTEMPTS` проб),
+    стрельба идёт по любым клеткам.
+
+    :ivar parity: Цвет клеток поиска: чётность суммы row + col.
+    :vartype parity: int
+    """
+
+    def __init__(self, rules, rng, shots):
+        """
+        Конструктор класса ParityStrategy.
+
+        Параметры совпадают с :class:`Strategy`.
+        """
+        super().__init__(rules, rng, shots)
+        self.parity = rng.randrange(2)
+
+    def _random(self):
+        """
+        Выбирает случайную открытую клетку своего цвета, если такая находится.
+
+        :rtype: tuple[int, int]
+        """
+        for _ in range(PARITY_ATTEMPTS):
+            r, c = self.shots.random_untried(self.rng)
+            if (r + c) % 2 == self.parity:
+                return r, c
+        return r, c
+
+
+class TargeterStrategy(Strategy):
+    """
+    Стрельба по оценке вероятностей: дебют по тепловой карте (если он
+    включён), затем прицел, а когда расстановок остаётся немного — точный
+    перебор.
+
+    Тепловая карта читается при первом дебютном выстреле и не меняется до
+    конца партии, даже если файл карты пересоберут.
+
+    :ivar targeter: Прицел.
+    :vartype targeter: DensityTargeter | MonteCarloTargeter
+    :ivar endgame: Точный расчёт эндшпиля; пока перебор выше порога,
+                   клетку выбирает :attr:`targeter`.
+    :vartype endgame: EndgameSolver
+    :ivar opening_shots: Сколько первых выстрелов до попадания делается по тепловой карте
+                         (0 — без дебюта).
+    :vartype opening_shots: int
+    :ivar opening: Тепловая карта партии или None, если дебютных выстрелов ещё
+                   не было, дебют выключен или карты для правил нет.
+    :vartype opening: heatmap.Heatmap | None
+    """
+
+    opening_shots = 0
+
+    def __init__(self, rules, rng, shots):
+        """
+        Конструктор класса TargeterStrategy.
+
+        Параметры совпадают с :class:`Strategy`.
+        """
+        super().__init__(rules, rng, shots)
+        self.targeter = self._targeter()
+        self.endgame = EndgameSolver(rules.fleet, rules.width, rules.height, rng=rng, cache=CACHE)
+        self.opening = None
+        self._opening = True
+        self._opening_loaded = False
+
+    @abstractmethod
+    def _targeter(self):
+        """
+        Создаёт прицел стратегии.
+
+        :rtype: DensityTargeter | MonteCarloTargeter
+        """
+
+    def choose(self, state=None):
+        """
+        Выбирает клетку: по тепловой карте, точным перебором или прицелом.
+
+        :param state: Хеш Зобриста видимой доски для кэша решений.
+        :type state: int | None
+        :rtype: tuple[int, int]
+        """
+        target = None
+        if self._opening and len(self.shots) < self.opening_shots:
+            target = self._opening_shot()
+        if target is None:
+            target = self.endgame.choose(state)
+        if target is None:
+            target = self.targeter.choose(state)
+        return target
+
+    def _opening_shot(self):
+        """
+        Выбирает дебютный выстрел по тепловой карте не ближе одной клетки к
+        прежним выстрелам.
+
+        :returns: Клетка с наибольшей априорной вероятностью корабля или None,
+                  если карты для правил партии нет.
+        :rtype: tuple[int, int] | None
+        """
+        if not self._opening_loaded:
+            self.opening = heatmap.opening(self.rules)
+            self._opening_loaded = True
+        table = self.opening
+        if table is None:
+            return None
+        width = self.rules.width
+        near = {(r + dr, c + dc) for r, c in self.shots for dr in (-1, 0, 1) for dc in (-1, 0, 1)}
+        cells = table.best(i for i in range(self.rules.cells) if divmod(i, width) not in near)
+        return divmod(self.rng.choice(cells), width) if cells else None
+
+    def update(self, row, col, hit, sunk_cells=None):
+        """
+        Передаёт результат выстрела прицелу и расчёту эндшпиля.
+
+        Параметры совпадают с :meth:`Strategy.update`.
+        """
+        if hit:
+            self._opening = False
+        self.targeter.update(row, col, hit, sunk_cells)
+        self.endgame.update(row, col, hit, sunk_cells)
+
+    def mark(self):
+        """
+        Возвращает отметки прицела и расчёта эндшпиля.
+
+        :rtype: tuple
+        """
+        return self.targeter.mark(), self.endgame.mark(), self._opening
+
+    def rollback(self, mark):
+        """
+        Возвращает состояние на момент отметки ``mark``.
+
+        :param mark: Отметка, полученная от :meth:`mark`.
+        :type mark: tuple
+        """
+        targeter, endgame, self._opening = mark
+        self.targeter.rollback(targeter)
+        self.endgame.rollback(endgame)
+
+    def forget(self):
+        """
+        Забывает отметки прицела и расчёта эндшпиля.
+        """
+        self.targeter.forget()
+        self.endgame.forget()
+
+
+class DensityStrategy(TargeterStrategy):
+    """
+    Стрельба по максимуму плотности размещений (:class:`DensityTargeter`).
+    """
+
+    def _targeter(self):
+        """
+        Создаёт прицел по плотности размещений.
+
+        :rtype: DensityTargeter
+        """
+        rules = self.rules
+        return DensityTargeter(rules.fleet, rules.width, rules.height, rng=self.rng)
+
+
+class MonteCarloStrategy(TargeterStrategy):
+    """
+    Стрельба по выборке согласованных расстановок (:class:`MonteCarloTargeter`).
+
+    Первые выстрелы делаются по тепловой карте: на пустой доске выборка
+    тратит весь бюджет времени хода, а карта даёт ту же оценку сразу.
+    Режим ограничен по времени (``Game.TIMED_AI_MODES``), поэтому
+    ``replay`` берёт его выстрелы из журнала, и от файла карты
+    воспроизведение не зависит.
+    """
+
+    opening_shots = OPENING_SHOTS
+
+    def _targeter(self):
+        """
+        Создаёт прицел по выборке расстановок; карты вероятностей кэшируются.
+
+        :rtype: MonteCarloTargeter
+        """
+        rules = self.rules
+        return MonteCarloTargeter(rules.fleet, rules.width, rules.height, rng=self.rng, cache=CACHE)
+
+
+STRATEGIES = {
+    "classic": HuntStrategy,
+    "parity": ParityStrategy,
+    "density": DensityStrategy,
+    "montecarlo": MonteCarloStrategy,
+}
+
+
+def create(name, rules, rng, shots):
+    """
+    Создаёт стратегию по имени режима ИИ.
+
+    :param name: Имя стратегии (ключ :data:`STRATEGIES`).
+    :type name: str
+    :param rules: Правила партии.
+    :type rules: Rules
+    :param rng: Генератор случайных чисел партии.
+    :type rng: random.Random
+    :param shots: Журнал выстрелов стреляющей стороны.
+    :type shots: ShotLedger
+    :rtype: Strategy
+    :raises ValueError: Если стратегии с таким именем нет.
+    """
+    try:
+        cls = STRATEGIES[name]
+    except KeyError:
+        raise ValueError(f"Неизвестная стратегия: '{name}'") from None
+    return cls(rules, rng, shots)
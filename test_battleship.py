@@ -1,6 +1,44 @@
 import unittest
+import asyncio
+import contextlib
+import io
 import os
-from utils import create_board, can_place, place_ship, count_ships, save_board
+import random
+import struct
+import tempfile
+import time
+from utils import create_board, can_place, place_ship, count_ships, save_board, find_ship_cells, mark_around_sunk
+from utils import read_boards, write_boards
+from bitboard import BitBoard, iter_cells, split_ships
+from simulate import play_game, run_simulation
+from density import DensityTargeter
+import montecarlo
+from endgame import EndgameSolver
+from placements import INDEX
+from fleet import generate_fleet, generate_fleets, fleet_board
+from ledger import ShotLedger
+from registry import ShipRegistry
+from render import BoardRenderer
+import batch
+from corpus import Corpus, CorpusWriter, corpus_to_text, text_to_corpus
+from validate import validate_fleet, validate_many
+import bench
+import metrics
+import server
+import loadtest
+import replay
+from rules import Rules, row_labels
+from utils import coord_to_index
+from game import Game, PLAYER, COMPUTER
+from utils import auto_place_computer
+import zobrist
+import heatmap
+import strategies
+import tournament
+
+# Режимы ИИ, ходы которых определяются только зерном партии.
+DETERMINISTIC_AI = [ai for ai in Game.AI_MODES if ai not in Game.TIMED_AI_MODES]
+
 
 class TestBattleship(unittest.TestCase):
     def test_create_board(self):
@@ -65,6 +103,1062 @@ class TestBattleship(unittest.TestCase):
             else:  # Windows
                 save_board(board, "C:\\Windows\\System32\\test.txt")
 
+class TestBitBoard(unittest.TestCase):
+    def test_round_trip(self):
+        board = create_board()
+        place_ship(board, 2, 3, 4, True)
+        board[2][3] = 'X'
+        board[5][5] = 'O'
+        bb = BitBoard.from_board(board)
+        self.assertEqual(bb.to_board(), board)
+        self.assertEqual(bb.count_ships(), 1)
+
+    def test_matches_list_helpers(self):
+        board = create_board()
+        place_ship(board, 0, 0, 3, True)
+        place_ship(board, 4, 4, 2, False)
+        bb = BitBoard.from_board(board)
+        for r in range(10):
+            for c in range(10):
+                for size in (1, 4):
+                    for h in (True, False):
+                        self.assertEqual(bb.can_place(r, c, size, h), can_place(board, r, c, size, h))
+        self.assertEqual(sorted(iter_cells(bb.find_ship(5, 4))), sorted(find_ship_cells(board, 5, 4)))
+        mark_around_sunk(board, 0, 1)
+        bb.mark_around_sunk(0, 1)
+        self.assertEqual(bb.to_board(), board)
+
+
+class TestPlacementIndex(unittest.TestCase):
+    def test_counts_on_empty_board(self):
+        self.assertEqual(INDEX.count(0, 1), 100)
+        self.assertEqual(INDEX.count(0, 4), 140)
+
+    def test_matches_can_place(self):
+        board = create_board()
+        place_ship(board, 3, 3, 3, False)
+        ships = BitBoard.from_board(board).ships
+        for r in range(10):
+            for c in range(10):
+                for h in (True, False):
+                    self.assertEqual(INDEX.can_place(ships, r, c, 2, h), can_place(board, r, c, 2, h))
+
+    def test_auto_place_uses_full_fleet(self):
+        board = auto_place_computer()
+        self.assertEqual(sum(row.count('S') for row in board), 20)
+        self.assertEqual(count_ships(board), 10)
+
+
+class TestFleetGenerator(unittest.TestCase):
+    def test_batch_yields_legal_fleets(self):
+        rng = random.Random(5)
+        layouts = list(generate_fleets(20, rng=rng))
+        self.assertEqual(len(layouts), 20)
+        for ships in layouts:
+            board = fleet_board(ships)
+            self.assertEqual(count_ships(board), 10)
+            self.assertEqual(sum(row.count('S') for row in board), 20)
+
+    def test_uniform_mode(self):
+        ships = generate_fleet(uniform=True, rng=random.Random(1))
+        self.assertEqual(bin(ships).count('1'), 20)
+
+    def test_impossible_fleet_raises(self):
+        with self.assertRaises(ValueError):
+            generate_fleet(fleet=(4, 4, 4), width=4, height=4)
+
+
+class TestShotLedger(unittest.TestCase):
+    def test_membership_and_history(self):
+        ledger = ShotLedger()
+        self.assertTrue(ledger.add(3, 4))
+        self.assertFalse(ledger.add(3, 4))
+        ledger.append((0, 0))
+        self.assertIn((3, 4), ledger)
+        self.assertNotIn((4, 3), ledger)
+        self.assertEqual(list(ledger), [(3, 4), (0, 0)])
+        self.assertEqual(ledger.untried(), 98)
+
+    def test_random_untried_drains_pool(self):
+        ledger = ShotLedger()
+        ledger.exclude(9, 9)
+        rng = random.Random(3)
+        seen = set()
+        while ledger.untried():
+            cell = ledger.random_untried(rng)
+            self.assertNotIn(cell, seen)
+            seen.add(cell)
+            ledger.add(*cell)
+        self.assertEqual(len(seen), 99)
+        self.assertNotIn((9, 9), seen)
+        with self.assertRaises(ValueError):
+            ledger.random_untried()
+
+
+class TestShipRegistry(unittest.TestCase):
+    def test_hits_and_sinking(self):
+        board = create_board()
+        place_ship(board, 0, 0, 2, True)
+        place_ship(board, 5, 5, 1, True)
+        fleet = ShipRegistry(board)
+        self.assertEqual((len(fleet), fleet.alive), (2, 2))
+        self.assertIsNone(fleet.hit(9, 9))
+        ship_id = fleet.hit(0, 1)
+        self.assertFalse(fleet.is_sunk(ship_id))
+        self.assertEqual(fleet.hit(0, 0), ship_id)
+        self.assertTrue(fleet.is_sunk(ship_id))
+        self.assertEqual(sorted(fleet.cells[ship_id]), [(0, 0), (0, 1)])
+        self.assertEqual(fleet.alive, 1)
+
+    def test_game_sinks_via_registry(self):
+        board = create_board()
+        place_ship(board, 0, 0, 1, True)
+        enemy = create_board()
+        place_ship(enemy, 4, 4, 2, False)
+        game = Game(board, enemy)
+        self.assertTrue(game.player_shot(4, 4))
+        self.assertTrue(game.player_shot(5, 4))
+        self.assertEqual(game.computer_fleet.alive, 0)
+        self.assertEqual(game.computer_board[3][3], 'O')
+        self.assertEqual(game.player_shot(6, 5), "already_empty")
+
+
+class TestBoardRenderer(unittest.TestCase):
+    def _game(self):
+        board = create_board()
+        place_ship(board, 0, 0, 2, True)
+        enemy = create_board()
+        place_ship(enemy, 9, 9, 1, True)
+        return Game(board, enemy)
+
+    def test_single_write_hides_enemy_ships(self):
+        game = self._game()
+        stream = io.StringIO()
+        BoardRenderer(stream).render(game)
+        text = stream.getvalue()
+        self.assertIn("А | S S ~ ~ ~ ~ ~ ~ ~ ~ | А | ~ ~ ~ ~ ~ ~ ~ ~ ~ ~", text)
+        self.assertIn("К | ~ ~ ~ ~ ~ ~ ~ ~ ~ ~ | К | ~ ~ ~ ~ ~ ~ ~ ~ ~ ~", text)
+        self.assertIn("Ваши корабли: 1/1 | Корабли противника: 1/1", text)
+
+    def test_ansi_redraws_only_changed_rows(self):
+        game = self._game()
+        stream = io.StringIO()
+        renderer = BoardRenderer(stream, ansi=True)
+        renderer.render(game)
+        stream.seek(0)
+        stream.truncate()
+        game.player_shot(4, 4)
+        renderer.render(game)
+        text = stream.getvalue()
+        self.assertIn("Д | ~ ~ ~ ~ ~ ~ ~ ~ ~ ~ | Д | ~ ~ ~ ~ O ~ ~ ~ ~ ~", text)
+        self.assertNotIn("А |", text)
+
+
+class TestEngineEvents(unittest.TestCase):
+    def _game(self):
+        board = create_board()
+        place_ship(board, 0, 0, 1, True)
+        enemy = create_board()
+        place_ship(enemy, 4, 4, 2, True)
+        return Game(board, enemy)
+
+    def test_fire_returns_structured_results(self):
+        game = self._game()
+        events = []
+        game.subscribe(events.append)
+        first = game.fire(4, 4)
+        self.assertTrue(first.hit)
+        self.assertIsNone(first.sunk)
+        self.assertEqual(game.turn, PLAYER)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            second = game.fire(4, 5)
+        self.assertEqual(out.getvalue(), "")
+        self.assertIsNotNone(second.sunk)
+        self.assertTrue(second.game_over)
+        self.assertEqual(second.winner, PLAYER)
+        self.assertEqual(events, [first, second])
+        with self.assertRaises(ValueError):
+            game.fire(0, 0)
+
+    def test_turns_alternate_on_miss(self):
+        game = self._game()
+        self.assertEqual(game.fire(9, 9).rejected, None)
+        self.assertEqual(game.turn, COMPUTER)
+        with self.assertRaises(ValueError):
+            game.fire(8, 8)
+        result = game.step()
+        self.assertEqual(result.shooter, COMPUTER)
+        self.assertEqual(game.turn, COMPUTER if result.hit else PLAYER)
+
+
+@unittest.skipIf(batch.np is None, "NumPy не установлен")
+class TestBatchEngine(unittest.TestCase):
+    def test_fire_matches_game_rules(self):
+        enemy = create_board()
+        place_ship(enemy, 0, 0, 2, True)
+        engine = batch.BatchEngine.from_boards([enemy, enemy])
+        hit, sunk = engine.fire([0, 5], [0, 5])
+        self.assertEqual(hit.tolist(), [True, False])
+        hit, sunk = engine.fire([0, 5], [1, 6])
+        self.assertEqual(sunk.tolist(), [True, False])
+        expected = [row[:] for row in enemy]
+        expected[0][0] = expected[0][1] = 'X'
+        mark_around_sunk(expected, 0, 0)
+        self.assertEqual(engine.board(0), expected)
+        self.assertEqual(engine.done.tolist(), [True, False])
+
+    def test_play_finishes_all_games(self):
+        engine = batch.BatchEngine.random(50, rng=random.Random(1))
+        shots = engine.play(batch.np.random.default_rng(1))
+        self.assertTrue(engine.done.all())
+        self.assertTrue(((shots >= 20) & (shots <= 100)).all())
+
+    def test_hunt_continues_line(self):
+        enemy = create_board()
+        place_ship(enemy, 5, 2, 4, True)
+        engine = batch.BatchEngine.from_boards([enemy] * 50)
+        rng = batch.np.random.default_rng(2)
+        engine.fire([5] * 50, [3] * 50)
+        hits = [[3] for _ in range(50)]
+        second = [False] * 50
+        while not engine.done.all():
+            rows, cols = engine.choose(rng)
+            hit, _ = engine.fire(rows, cols)
+            for i in range(50):
+                if second[i]:
+                    # Сразу после второго попадания выстрел продолжает линию.
+                    self.assertEqual((rows[i], cols[i]), (5, 2 * hits[i][1] - hits[i][0]))
+                if hit[i]:
+                    hits[i].append(cols[i])
+                second[i] = bool(hit[i]) and len(hits[i]) == 2
+        self.assertTrue(all(len(h) == 4 for h in hits))
+
+    def test_matches_classic_mode(self):
+        engine = batch.BatchEngine.random(4000, rng=random.Random(3))
+        shots = engine.play(batch.np.random.default_rng(3))
+        # Побеждает сторона, которой нужно меньше выстрелов: попаданий у обеих поровну,
+        # а очередь переходит после каждого промаха.
+        winners = batch.np.minimum(shots[::2], shots[1::2])
+        classic = run_simulation(1000, workers=1, seed=3, ai="classic")
+        self.assertAlmostEqual(winners.mean(), classic["mean_shots_to_win"], delta=1.0)
+
+
+class TestCorpus(unittest.TestCase):
+    def test_round_trip_and_append(self):
+        masks = list(generate_fleets(25, rng=random.Random(4)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fleets.sbc")
+            with CorpusWriter(path) as writer:
+                writer.extend(masks[:20])
+            with CorpusWriter(path) as writer:
+                for ships in masks[20:]:
+                    writer.append(ships)
+            self.assertEqual(os.path.getsize(path), 32 + 25 * 13)
+            with Corpus(path) as corpus:
+                self.assertEqual(len(corpus), 25)
+                self.assertEqual(list(corpus), masks)
+                self.assertEqual(corpus[-1], masks[-1])
+                self.assertEqual(corpus.board(3), fleet_board(masks[3]))
+
+    def test_record_outlives_close(self):
+        masks = list(generate_fleets(3, rng=random.Random(5)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "fleets.sbc")
+            with CorpusWriter(path) as writer:
+                writer.extend(masks)
+            with Corpus(path) as corpus:
+                record = corpus.record(1)
+                rows = iter(corpus)
+                next(rows)
+            self.assertTrue(corpus._file.closed)
+            self.assertTrue(corpus._map.closed)
+            self.assertEqual(int.from_bytes(record, "little"), masks[1])
+
+    def test_text_conversion(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            board_file = os.path.join(tmp, "board.txt")
+            save_board(fleet_board(generate_fleet()), board_file)
+            bad_file = os.path.join(tmp, "bad.txt")
+            with open(bad_file, "w") as f:
+                f.write("not a board\n")
+            path = os.path.join(tmp, "fleets.sbc")
+            self.assertEqual(text_to_corpus([board_file, bad_file], path), [bad_file])
+            self.assertEqual(corpus_to_text(path, os.path.join(tmp, "out")), 1)
+            with open(board_file) as a, open(os.path.join(tmp, "out", "board_000000.txt")) as b:
+                self.assertEqual(a.read(), b.read())
+
+    def test_large_boards_and_version_1_header(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "large.sbc")
+            with CorpusWriter(path, 300, 260) as writer:
+                writer.append(1 << 77999)
+            with Corpus(path) as corpus:
+                self.assertEqual((corpus.width, corpus.height, corpus[0]), (300, 260, 1 << 77999))
+            with self.assertRaises(ValueError):
+                CorpusWriter(os.path.join(tmp, "huge.sbc"), 70000, 1)
+
+            old = os.path.join(tmp, "old.sbc")
+            ships = generate_fleet(rng=random.Random(6))
+            with open(old, "wb") as f:
+                f.write(struct.pack("<8sHBBHHQ8x", b"SBCORPUS", 1, 10, 10, 13, 0, 1))
+                f.write(ships.to_bytes(13, "little"))
+            with CorpusWriter(old) as writer:
+                writer.append(ships)
+            with Corpus(old) as corpus:
+                self.assertEqual(list(corpus), [ships, ships])
+
+    def test_text_conversion_on_non_default_board(self):
+        rules = Rules(12, 9, (4, 3, 2))
+        masks = list(generate_fleets(3, rules.fleet, rng=random.Random(7), width=12, height=9))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "wide.sbc")
+            with CorpusWriter(path, 12, 9) as writer:
+                writer.extend(masks)
+            out = os.path.join(tmp, "out")
+            self.assertEqual(corpus_to_text(path, out), 3)
+            files = sorted(os.path.join(out, name) for name in os.listdir(out))
+            again = os.path.join(tmp, "again.sbc")
+            self.assertEqual(text_to_corpus(files, again, 12, 9), [])
+            with Corpus(again) as corpus:
+                self.assertEqual((corpus.width, corpus.height, list(corpus)), (12, 9, masks))
+            self.assertEqual(text_to_corpus(files, os.path.join(tmp, "classic.sbc")), files)
+
+    def test_rejects_foreign_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".sbc") as f:
+            f.write(b"x" * 64)
+            f.flush()
+            with self.assertRaises(ValueError):
+                Corpus(f.name)
+
+
+class TestBoardStreams(unittest.TestCase):
+    def test_write_then_read_many(self):
+        boards = [fleet_board(ships) for ships in generate_fleets(3, rng=random.Random(9))]
+        stream = io.StringIO()
+        self.assertEqual(write_boards(boards, stream), 3)
+        stream.seek(0)
+        records = list(read_boards(stream))
+        self.assertEqual([line for line, _, _ in records], [1, 12, 23])
+        self.assertEqual([board for _, board, _ in records], boards)
+        self.assertTrue(all(error is None for _, _, error in records))
+
+    def test_bad_record_reported_with_line(self):
+        good = "\n".join(["~" * 10] * 10)
+        bad = "\n".join(["~" * 10] * 9 + ["~~~~Z~~~~~"])
+        short = "\n".join(["~" * 10] * 3)
+        records = list(read_boards(io.StringIO(f"{good}\n\n{bad}\n\n\n{short}\n\n{good}\n")))
+        self.assertEqual([(line, error is None) for line, _, error in records],
+                         [(1, True), (12, False), (24, False), (28, True)])
+        self.assertIn("Z", records[1][2])
+
+
+class TestFleetValidator(unittest.TestCase):
+    def test_generated_fleet_is_valid(self):
+        ships = generate_fleet(rng=random.Random(4))
+        self.assertEqual(validate_fleet(ships), [])
+        self.assertEqual(validate_fleet(fleet_board(ships)), [])
+
+    def test_bent_and_touching_ships(self):
+        board = create_board()
+        place_ship(board, 0, 0, 2, True)
+        board[1][0] = "S"
+        board[1][2] = "S"
+        codes = [error.code for error in validate_fleet(board)]
+        self.assertIn("shape", codes)
+        self.assertEqual(codes.count("touching"), 2)
+
+    def test_wrong_composition(self):
+        ships = generate_fleet(rng=random.Random(5))
+        submarine = next(ship for ship in split_ships(ships) if ship & (ship - 1) == 0)
+        errors = validate_fleet(ships & ~submarine)
+        self.assertEqual([(e.code, e.message) for e in errors],
+                         [("missing", "Не хватает кораблей длины 1: 1")])
+
+    def test_validate_many_keeps_order(self):
+        masks = list(generate_fleets(5, rng=random.Random(6)))
+        masks.insert(2, masks[0] | 1 << 99)
+        results = list(validate_many(masks, workers=1, chunk_size=2))
+        self.assertEqual([i for i, _ in results], list(range(6)))
+        self.assertEqual([bool(errors) for _, errors in results], [False, False, True, False, False, False])
+
+
+class TestBench(unittest.TestCase):
+    def test_run_selected_benchmark(self):
+        report = bench.run_benchmarks(["count_ships"], min_time=0.001, repeat=2)
+        self.assertEqual(list(report["benchmarks"]), ["count_ships"])
+        result = report["benchmarks"]["count_ships"]
+        self.assertGreater(result["median"], 0)
+        self.assertLessEqual(result["best"], result["median"])
+
+    def test_compare_flags_regressions(self):
+        baseline = {"benchmarks": {"a": {"median": 1.0}, "b": {"median": 1.0}, "gone": {"median": 1.0}}}
+        current = {"benchmarks": {"a": {"median": 1.1}, "b": {"median": 1.5}, "new": {"median": 1.0}}}
+        rows = bench.compare(baseline, current, threshold=0.2)
+        self.assertEqual([(name, slower) for name, _, _, _, slower in rows], [("a", False), ("b", True)])
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_quantiles(self):
+        histogram = metrics.Histogram()
+        for _ in range(90):
+            histogram.observe(1.5e-6)
+        for _ in range(10):
+            histogram.observe(1e-3)
+        self.assertEqual(histogram.count, 100)
+        self.assertLessEqual(histogram.quantile(0.5), 2e-6)
+        self.assertGreater(histogram.quantile(0.99), 5e-4)
+
+    def test_enable_and_disable_patch_all_modules(self):
+        import game
+        original = game.can_place
+        registry = metrics.MetricsRegistry()
+        metrics.enable(registry)
+        try:
+            self.assertTrue(metrics.enabled())
+            self.assertIsNot(game.can_place, original)
+            play_game()
+        finally:
+            metrics.disable()
+        self.assertIs(game.can_place, original)
+        self.assertFalse(metrics.enabled())
+
+        summary = registry.to_dict()
+        self.assertGreater(summary["Game.computer_shot"]["count"], 0)
+        self.assertEqual(summary["utils.auto_place_computer"]["count"], 2)
+        text = registry.to_prometheus()
+        self.assertIn('battleship_stage_duration_seconds_count{stage="Game.computer_shot"}', text)
+        self.assertIn('le="+Inf"', text)
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = server.GameServer(port=0, idle_timeout=60)
+        self.port = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def request(self, reader, writer, line):
+        writer.write((line + "\n").encode())
+        await writer.drain()
+        lines = []
+        while True:
+            reply = (await reader.readline()).decode().rstrip("\n")
+            lines.append(reply)
+            if reply.startswith(("OK", "ERR", "BYE")) or not reply:
+                return lines
+
+    async def test_play_until_game_over(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.assertEqual(await self.request(reader, writer, "FIRE 0 0"), ["ERR no session"])
+        (reply,) = await self.request(reader, writer, "NEW")
+        session_id = reply.split()[1]
+        self.assertIn(session_id, self.server.sessions)
+
+        board = await self.request(reader, writer, "BOARD")
+        self.assertEqual(len(board), 21)
+        self.assertTrue(all("S" not in line for line in board if line.startswith("ENEMY")))
+
+        lines = []
+        for r in range(10):
+            for c in range(10):
+                lines += await self.request(reader, writer, f"FIRE {r} {c}")
+                if lines[-2].startswith("OVER"):
+                    break
+            else:
+                continue
+            break
+        self.assertTrue(lines[-2].startswith("OVER"))
+        self.assertEqual(await self.request(reader, writer, "FIRE 0 0"), ["ERR game over"])
+        self.assertEqual(await self.request(reader, writer, "QUIT"), ["OK bye"])
+        writer.close()
+
+    async def test_resume_and_idle_eviction(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        (reply,) = await self.request(reader, writer, "NEW density")
+        session_id = reply.split()[1]
+        writer.close()
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.assertEqual(await self.request(reader, writer, "RESUME nope"), ["ERR unknown session"])
+        self.assertEqual(await self.request(reader, writer, f"RESUME {session_id}"), [f"OK {session_id}"])
+        self.assertEqual(await self.request(reader, writer, "PING"), ["OK pong"])
+
+        self.assertEqual(self.server.evict_idle(time.monotonic() + 120), 1)
+        self.assertEqual(self.server.sessions, {})
+        self.assertEqual(await reader.readline(), b"BYE idle\n")
+        writer.close()
+
+    async def test_command_errors_keep_connection(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        (reply,) = await self.request(reader, writer, "NEW")
+        session_id = reply.split()[1]
+        self.assertEqual(await self.request(reader, writer, "FIRE x"), ["ERR usage: FIRE <row> <col>"])
+
+        def broken(game):
+            raise RuntimeError("сбой хода компьютера")
+
+        old, server._computer_turn = server._computer_turn, broken
+        try:
+            game = self.server.sessions[session_id].game
+            r, c = next((r, c) for r in range(10) for c in range(10) if game.computer_board[r][c] == "~")
+            with self.assertLogs("server", "ERROR"):
+                lines = await self.request(reader, writer, f"FIRE {r} {c}")
+        finally:
+            server._computer_turn = old
+        self.assertEqual(lines[-1], "ERR internal error")
+        self.assertFalse(self.server.sessions[session_id].lock.locked())
+        self.assertEqual(await self.request(reader, writer, "PING"), ["OK pong"])
+        writer.close()
+
+
+class TestLoadTest(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 0.5), 50)
+        self.assertEqual(loadtest.percentile(values, 0.99), 99)
+        self.assertEqual(loadtest.percentile([], 0.5), 0.0)
+
+    def test_sweep_in_process_and_through_server(self):
+        for server_address in (None, "auto"):
+            results = asyncio.run(loadtest.run_sweep([1, 3], duration=0.2, server=server_address, seed=1))
+            self.assertEqual([row["concurrency"] for row in results], [1, 3])
+            for row in results:
+                self.assertGreater(row["turns"], 0)
+                self.assertLessEqual(row["p50"], row["p99"])
+
+    def test_small_rules_keep_global_random(self):
+        rules = Rules(6, 6, (3, 2))
+        self.assertEqual(len(loadtest._script(random.Random(1), rules)), 36)
+        state = random.getstate()
+        row = asyncio.run(loadtest.run_level(2, duration=0.2, seed=3, rules=rules))
+        self.assertGreater(row["games"], 0)
+        self.assertEqual(random.getstate(), state)
+
+
+class TestReplay(unittest.TestCase):
+    def play(self, ai, seed):
+        game = Game(auto_place_computer(random.Random(seed)), ai=ai, seed=seed)
+        cells = [(r, c) for r in range(10) for c in range(10)]
+        random.Random(seed).shuffle(cells)
+        shots = iter(cells)
+        while game.winner is None:
+            if game.turn == PLAYER:
+                game.fire(*next(shots))
+            else:
+                game.step()
+        return game
+
+    def test_same_seed_same_game(self):
+        first, second = self.play("classic", 3), self.play("classic", 3)
+        self.assertEqual(first.moves, second.moves)
+        self.assertEqual(first.computer_board, second.computer_board)
+
+    def test_log_round_trip_and_replay(self):
+        for ai in DETERMINISTIC_AI:
+            game = self.play(ai, 11)
+            log = replay.MoveLog.loads(replay.record(game).dumps())
+            self.assertEqual(log, replay.record(game))
+            again = replay.replay(log)
+            self.assertEqual(again.winner, game.winner)
+            self.assertEqual(again.player_board, game.player_board)
+            self.assertEqual(again.computer_board, game.computer_board)
+
+    def test_replay_to_turn_and_bisect(self):
+        log = replay.record(self.play("classic", 5))
+        self.assertEqual(len(replay.replay(log, 7).moves), 7)
+        turn = replay.bisect(log, lambda game: game.computer_fleet.alive < 10)
+        self.assertEqual(replay.replay(log, turn - 1).computer_fleet.alive, 10)
+        self.assertEqual(replay.replay(log, turn).computer_fleet.alive, 9)
+        self.assertIsNone(replay.bisect(log, lambda game: False))
+
+    def test_divergence_detected(self):
+        log = replay.record(self.play("classic", 8))
+        index = next(i for i, (shooter, _, _) in enumerate(log.shots) if shooter == COMPUTER)
+        _, r, c = log.shots[index]
+        log.shots[index] = (COMPUTER, r, (c + 1) % 10)
+        with self.assertRaises(ValueError):
+            replay.replay(log)
+        with self.assertRaises(ValueError):
+            replay.MoveLog.loads("v1 classic 1 ff - p1x2")
+
+
+class TestRules(unittest.TestCase):
+    RULES = Rules(15, 12, (5, 4, 3, 3, 2, 2, 1))
+
+    def play(self, ai, seed):
+        rules = self.RULES
+        game = Game(auto_place_computer(random.Random(seed), rules), ai=ai, seed=seed, rules=rules)
+        cells = [(r, c) for r in range(rules.height) for c in range(rules.width)]
+        random.Random(seed).shuffle(cells)
+        shots = iter(cells)
+        while game.winner is None:
+            if game.turn == PLAYER:
+                game.fire(*next(shots))
+            else:
+                game.step()
+        return game
+
+    def test_validation_and_labels(self):
+        with self.assertRaises(ValueError):
+            Rules(0, 10)
+        with self.assertRaises(ValueError):
+            Rules(5, 5, (6,))
+        self.assertEqual(row_labels(12)[9:], ("К", "АА", "АБ"))
+        self.assertEqual(self.RULES.fleet_summary(), "1×5, 1×4, 2×3, 2×2, 1×1")
+        self.assertEqual(coord_to_index("аб", 15, self.RULES), (11, 14))
+        self.assertIsNone(coord_to_index("АБ", 16, self.RULES))
+        self.assertIsNone(coord_to_index("АБ", 1))
+
+    def test_custom_game_plays_out(self):
+        for ai in DETERMINISTIC_AI:
+            game = self.play(ai, 4)
+            self.assertEqual(len(game.player_board[0]), 15)
+            shots = [(r, c) for shooter, r, c in game.moves if shooter == COMPUTER]
+            self.assertEqual(len(shots), len(set(shots)))
+            self.assertIsNotNone(game.winner)
+
+    def test_board_size_must_match_rules(self):
+        with self.assertRaises(ValueError):
+            Game(auto_place_computer(), rules=self.RULES)
+
+    def test_replay_and_render_custom_rules(self):
+        game = self.play("density", 6)
+        text = replay.record(game).dumps()
+        self.assertTrue(text.startswith("v2 density 6 15x12 5,4,3,3,2,2,1 "))
+        again = replay.replay(replay.MoveLog.loads(text))
+        self.assertEqual(again.computer_board, game.computer_board)
+        frame = BoardRenderer().frame(again)
+        self.assertTrue(any(line.lstrip().startswith("АБ") for line in frame))
+
+
+class TestSnapshots(unittest.TestCase):
+    def state(self, game):
+        return (
+            [row[:] for row in game.player_board], [row[:] for row in game.computer_board],
+            list(game.player_shots), game.player_shots.untried(), list(game.computer_shots),
+            list(game.player_fleet.hp), list(game.computer_fleet.hp), list(game.moves),
+            game.turn, game.winner, game.rng.getstate(),
+        )
+
+    def test_make_unmake_restores_state(self):
+        for ai in DETERMINISTIC_AI:
+            game = Game(auto_place_computer(random.Random(1)), ai=ai, seed=1)
+            plain = Game(auto_place_computer(random.Random(1)), ai=ai, seed=1)
+            rng = random.Random(2)
+            cells = [(r, c) for r in range(10) for c in range(10)]
+            rng.shuffle(cells)
+            shots = iter(cells)
+            while game.winner is None:
+                before = self.state(game)
+                snapshot = game.snapshot()
+                for _ in range(rng.randint(1, 5)):
+                    if game.winner is not None:
+                        break
+                    if game.turn == PLAYER:
+                        game.make(*rng.choice(cells))
+                    else:
+                        game.make()
+                game.unmake()
+                game.restore(snapshot)
+                self.assertEqual(self.state(game), before)
+                if game.turn == PLAYER:
+                    cell = next(shots)
+                    self.assertEqual(game.fire(*cell), plain.fire(*cell))
+                else:
+                    self.assertEqual(game.step(), plain.step())
+
+    def test_make_is_silent_and_misuse_rejected(self):
+        game = Game(auto_place_computer(random.Random(3)), seed=3)
+        events = []
+        game.subscribe(events.append)
+        game.make(0, 0)
+        self.assertEqual(events, [])
+        self.assertEqual(len(game.moves), 1)
+        game.unmake()
+        self.assertEqual(game.moves, [])
+        with self.assertRaises(ValueError):
+            game.unmake()
+        with self.assertRaises(ValueError):
+            game.make()
+        snapshot = game.snapshot()
+        game.commit()
+        with self.assertRaises(ValueError):
+            game.restore(snapshot)
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def test_samples_are_consistent_fleets(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            ships = montecarlo.sample_fleet(rng, INDEX, montecarlo.FLEET, 0, 0)
+            if ships is not None:
+                self.assertEqual(validate_fleet(ships), [])
+        hits = 1 << 44
+        misses = (1 << 43) | (1 << 45)
+        for _ in range(50):
+            ships = montecarlo.sample_fleet(rng, INDEX, (4, 3, 2, 1), misses, hits)
+            if ships is not None:
+                self.assertTrue(ships & hits)
+                self.assertFalse(ships & misses)
+
+    def test_follows_hit_and_plays_out(self):
+        targeter = montecarlo.MonteCarloTargeter(rng=random.Random(2), budget=0, max_samples=300)
+        targeter.update(4, 4, True)
+        targeter.update(4, 5, False)
+        self.assertIn(targeter.choose(), [(3, 4), (5, 4), (4, 3)])
+
+        game = Game(auto_place_computer(random.Random(3)), ai="montecarlo", seed=3)
+        game.strategy.targeter = montecarlo.MonteCarloTargeter(rng=game.rng, budget=0, max_samples=200)
+        game.turn = COMPUTER
+        while game.winner is None:
+            game.computer_shot()
+        shots = list(game.computer_shots)
+        self.assertEqual(len(shots), len(set(shots)))
+        self.assertEqual(game.winner, COMPUTER)
+
+    def test_fallback_without_samples_stays_orthogonal(self):
+        for seed in range(30):
+            targeter = montecarlo.MonteCarloTargeter(rng=random.Random(seed), budget=0, max_samples=0)
+            targeter.update(4, 4, True)
+            self.assertIn(targeter.choose(), [(3, 4), (5, 4), (4, 3), (4, 5)])
+            self.assertEqual(targeter.samples, 0)
+
+    def test_warm_cache_keeps_moves(self):
+        board = BitBoard.from_board(auto_place_computer(random.Random(8)))
+        cache = zobrist.DecisionCache()
+
+        def play():
+            game = Game(board.to_board(), ai="montecarlo", seed=8)
+            game.strategy.targeter = montecarlo.MonteCarloTargeter(
+                rng=game.rng, budget=0, max_samples=100, cache=cache
+            )
+            game.turn = COMPUTER
+            while game.winner is None:
+                game.computer_shot()
+            return list(game.computer_shots)
+
+        cold = play()
+        self.assertGreater(len(cache), 0)
+        hits = cache.hits
+        self.assertEqual(play(), cold)
+        self.assertGreater(cache.hits, hits)
+
+    def test_budget_and_replay(self):
+        game = Game(auto_place_computer(random.Random(4)), ai="montecarlo", seed=4)
+        game.strategy.targeter.budget = 0.01
+        # Дебютные выстрелы идут по тепловой карте, без выборки.
+        game.strategy.opening_shots = 0
+        game.turn = COMPUTER
+        montecarlo.start_pool(1)
+        try:
+            for _ in range(5):
+                if game.turn == PLAYER:
+                    game.fire(*game.player_shots.random_untried())
+                    continue
+                started = time.perf_counter()
+                game.step()
+                self.assertLess(time.perf_counter() - started, 0.5)
+                self.assertGreater(game.strategy.targeter.samples, 0)
+        finally:
+            montecarlo.stop_pool()
+        again = replay.replay(replay.MoveLog.loads(replay.record(game).dumps()))
+        self.assertEqual(again.player_board, game.player_board)
+
+
+class TestEndgame(unittest.TestCase):
+    def test_exact_probabilities(self):
+        solver = EndgameSolver((2,), 3, 3)
+        probabilities = solver.probabilities()
+        self.assertEqual(solver.fleets, 12)
+        self.assertAlmostEqual(probabilities[4], 4 / 12)
+
+        solver = EndgameSolver((1, 1), 3, 3)
+        pairs = [
+            (a, b) for a in range(9) for b in range(a + 1, 9)
+            if max(abs(a // 3 - b // 3), abs(a % 3 - b % 3)) > 1
+        ]
+        probabilities = solver.probabilities()
+        self.assertEqual(solver.fleets, len(pairs))
+        for cell in range(9):
+            share = sum(cell in pair for pair in pairs) / len(pairs)
+            self.assertAlmostEqual(probabilities[cell], share)
+
+    def test_hits_and_misses_constrain_fleets(self):
+        solver = EndgameSolver((2,), 3, 3)
+        solver.update(1, 1, True)
+        solver.update(0, 1, False)
+        probabilities = solver.probabilities()
+        self.assertEqual(solver.fleets, 3)
+        self.assertEqual(probabilities[1], 0)
+        self.assertIn(solver.choose(), [(1, 0), (1, 2), (2, 1)])
+
+    def test_switches_on_below_threshold(self):
+        solver = EndgameSolver()
+        self.assertGreater(solver.search_size(), solver.threshold)
+        self.assertIsNone(solver.choose())
+
+        game = Game(auto_place_computer(random.Random(5)), ai="density", seed=5)
+        game.turn = COMPUTER
+        used = 0
+        while game.winner is None:
+            game.computer_shot()
+            used += game.strategy.endgame.search_size() <= game.strategy.endgame.threshold
+        self.assertGreater(used, 0)
+
+    def test_work_budget_falls_back(self):
+        solver = EndgameSolver((1, 1), 100, 100)
+        for row in range(100):
+            for col in range(100):
+                if row >= 10 or col >= 14:
+                    solver.update(row, col, False)
+        self.assertLessEqual(solver.search_size(), solver.threshold)
+        self.assertIsNone(solver.choose())
+
+        # Исчерпание бюджета не зависит от запомненных подзадач.
+        self.assertIsNotNone(solver.probabilities())
+        self.assertGreater(solver.fleets, 0)
+        self.assertIsNone(solver.choose())
+
+        solver.work_limit = None
+        self.assertIsNotNone(solver.choose())
+
+    def test_large_board_latency(self):
+        rules = Rules(60, 60, (4,) * 4 + (3,) * 8 + (2,) * 12 + (1,) * 16)
+        game = Game(auto_place_computer(random.Random(0), rules), ai="density", seed=0, rules=rules)
+        worst = 0.0
+        while game.player_fleet.alive:
+            started = time.perf_counter()
+            game.computer_shot()
+            worst = max(worst, time.perf_counter() - started)
+        self.assertLess(worst, 0.1)
+
+
+class TestZobrist(unittest.TestCase):
+    def test_incremental_hashes(self):
+        game = Game(auto_place_computer(random.Random(6)), ai="density", seed=6)
+        empty = (game.player_hash, game.computer_hash)
+        self.assertEqual(empty, (0, 0))
+        rng = random.Random(6)
+        snapshot = None
+        while game.winner is None:
+            if game.turn == PLAYER:
+                game.fire(*game.player_shots.random_untried(rng))
+            else:
+                game.step()
+            self.assertEqual(game.player_hash, zobrist.board_hash(game.computer_board))
+            self.assertEqual(game.computer_hash, zobrist.board_hash(game.player_board))
+            if snapshot is None and len(game.moves) == 30:
+                snapshot = game.snapshot()
+                hashes = (game.player_hash, game.computer_hash)
+        game.restore(snapshot)
+        self.assertEqual((game.player_hash, game.computer_hash), hashes)
+
+    def test_lru_counters_and_persistence(self):
+        cache = zobrist.DecisionCache(maxsize=2)
+        cache.put(("a", 1), (1, ((0, 0.5),)))
+        cache.put(("b", 2), (2, ()))
+        self.assertEqual(cache.get(("a", 1)), (1, ((0, 0.5),)))
+        cache.put(("c", 3), (3, ()))
+        self.assertIsNone(cache.get(("b", 2)))
+        self.assertEqual(cache.stats(), {"size": 2, "maxsize": 2, "hits": 1, "misses": 1, "evictions": 1})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.json")
+            cache.save(path)
+            warm = zobrist.DecisionCache()
+            self.assertEqual(warm.warm(path), 2)
+            self.assertEqual(warm.items(), cache.items())
+            self.assertEqual(warm.warm(os.path.join(tmp, "missing.json")), 0)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("[]")
+            with self.assertRaises(ValueError):
+                warm.load(path)
+
+    def test_cached_decisions_keep_replays(self):
+        cache = zobrist.DecisionCache()
+        solver = EndgameSolver((2, 1), 4, 4, cache=cache)
+        solver.update(1, 1, True)
+        state = 12345
+        first = solver.probabilities(state)
+        self.assertEqual(solver.probabilities(state), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        zobrist.CACHE.clear()
+        games = []
+        for _ in range(2):
+            game = Game(auto_place_computer(random.Random(8)), ai="density", seed=8)
+            game.turn = COMPUTER
+            while game.winner is None:
+                game.computer_shot()
+            games.append(game.moves)
+        self.assertEqual(games[0], games[1])
+        self.assertGreater(zobrist.CACHE.hits, 0)
+
+
+class TestHeatmap(unittest.TestCase):
+    RULES = Rules(5, 5, (3, 2, 1))
+
+    def test_exact_and_sampled_tables(self):
+        table = heatmap.exact(self.RULES)
+        solver = EndgameSolver((3, 2, 1), 5, 5)
+        probabilities = solver.probabilities()
+        self.assertEqual(table.total, solver.fleets)
+        for p, q in zip(table.probabilities(), probabilities):
+            self.assertAlmostEqual(p, q)
+        sampled = heatmap.sample(self.RULES, samples=2000, seed=1)
+        self.assertEqual(sampled, heatmap.sample(self.RULES, samples=2000, seed=1))
+        self.assertEqual(sum(sampled.counts), 2000 * 6)
+        self.assertTrue(sampled.matches(self.RULES))
+        self.assertFalse(sampled.matches(Rules()))
+
+    def test_file_roundtrip_and_lazy_opening(self):
+        table = heatmap.exact(self.RULES)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "heatmap.bin")
+            self.assertIsNone(heatmap.opening(self.RULES, path))
+            heatmap.save(table, path)
+            self.assertEqual(heatmap.load(path), table)
+            self.assertEqual(heatmap.opening(self.RULES, path), table)
+            self.assertIsNone(heatmap.opening(Rules(), path))
+
+            old, heatmap.PATH = heatmap.PATH, path
+            try:
+                game = Game(auto_place_computer(rules=self.RULES), ai="montecarlo", seed=2, rules=self.RULES)
+                density = Game(auto_place_computer(rules=self.RULES), ai="density", seed=2, rules=self.RULES)
+                # Карта читается при первом дебютном выстреле, а не при создании партии.
+                self.assertIsNone(game.strategy.opening)
+                game.turn = density.turn = COMPUTER
+                result = game.step()
+                density.step()
+                self.assertEqual(game.strategy.opening, table)
+                # Карта закреплена за партией: пересборка файла её не меняет.
+                heatmap.save(heatmap.sample(self.RULES, samples=100, seed=3), path)
+                game.turn = COMPUTER
+                game.step()
+            finally:
+                heatmap.PATH = old
+            self.assertIsNone(density.strategy.opening)
+            self.assertEqual(game.strategy.opening, table)
+            self.assertIn(result.row * 5 + result.col, table.best(range(25)))
+
+            with open(path, "r+b") as f:
+                f.truncate(30)
+            with self.assertRaises(ValueError):
+                heatmap.load(path)
+
+
+class TestStrategies(unittest.TestCase):
+    def test_parity_hunts_one_colour(self):
+        game = Game(auto_place_computer(), ai="parity", seed=3)
+        parity = game.strategy.parity
+        for _ in range(30):
+            hunting = game.strategy.hunting
+            r, c, _, _ = game.computer_shot()
+            if not hunting:
+                self.assertEqual((r + c) % 2, parity)
+
+    def test_play_game_with_different_strategies(self):
+        board_a, board_b = BitBoard.from_board(auto_place_computer()), BitBoard.from_board(auto_place_computer())
+        results = [
+            play_game(board_a.to_board(), board_b.to_board(), ("classic", "density"), seed=5) for _ in range(2)
+        ]
+        self.assertEqual(results[0], results[1])
+        with self.assertRaises(ValueError):
+            strategies.create("oracle", Rules(), random.Random(), None)
+
+        class Incomplete(strategies.TargeterStrategy):
+            pass
+
+        with self.assertRaises(TypeError):
+            Incomplete(Rules(), random.Random(), None)
+
+
+class TestTournament(unittest.TestCase):
+    def test_ratings_order_and_bounds(self):
+        games = [("a", "b")] * 30 + [("b", "a")] * 10 + [("a", "c")] * 40
+        elo = tournament.ratings(["a", "b", "c"], games)
+        self.assertGreater(elo["a"], elo["b"])
+        self.assertGreater(elo["b"], elo["c"])
+        self.assertAlmostEqual(sum(elo.values()) / 3, tournament.ELO_BASE)
+        intervals = tournament.confidence_intervals(["a", "b", "c"], games, samples=50)
+        for name, (low, high) in intervals.items():
+            self.assertLessEqual(low, high)
+
+    def test_checkpoint_resume(self):
+        names = ["classic", "parity"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.jsonl")
+            full = tournament.run_tournament(names, layouts=4, workers=1, seed=1, checkpoint=path)
+            self.assertEqual((full["games"], full["played"]), (8, 8))
+            with open(path) as f:
+                lines = f.readlines()
+            # Прерванный турнир: половина партий и оборванная строка.
+            with open(path, "w") as f:
+                f.writelines(lines[:5])
+                f.write('{"game": "clas')
+            resumed = tournament.run_tournament(names, layouts=4, workers=1, seed=1, checkpoint=path)
+            self.assertEqual((resumed["resumed"], resumed["played"]), (4, 4))
+            self.assertEqual(resumed["pairs"], full["pairs"])
+            self.assertEqual(resumed["strategies"], full["strategies"])
+            with self.assertRaises(ValueError):
+                tournament.run_tournament(names, layouts=4, workers=1, seed=2, checkpoint=path)
+
+    def test_custom_rules(self):
+        rules = Rules(7, 6, (3, 2, 2))
+        for first, second, _ in tournament.make_layouts(3, 4, rules):
+            self.assertLess(max(first, second), 1 << 42)
+        stats = tournament.run_tournament(["classic", "density"], layouts=2, workers=1, rules=rules)
+        self.assertEqual(stats["games"], 4)
+
+
+class TestSimulate(unittest.TestCase):
+    def test_play_game(self):
+        winner, shots = play_game()
+        self.assertIn(winner, (0, 1))
+        self.assertTrue(20 <= shots <= 100)
+
+    def test_run_simulation_inline(self):
+        state = random.getstate()
+        stats = run_simulation(10, workers=1, chunk_size=4, seed=7)
+        self.assertEqual(random.getstate(), state)
+        self.assertEqual(stats["games"], 10)
+        self.assertEqual(sum(stats["wins"]), 10)
+        self.assertEqual(sum(stats["shots_to_win"].values()), 10)
+        again = run_simulation(10, workers=1, chunk_size=4, seed=7)
+        self.assertEqual(stats["shots_to_win"], again["shots_to_win"])
+
+
+    def test_run_simulation_custom_rules(self):
+        rules = Rules(8, 7, (3, 2, 2))
+        stats = run_simulation(6, workers=1, chunk_size=3, seed=2, rules=rules)
+        self.assertEqual(sum(stats["wins"]), 6)
+        self.assertTrue(all(7 <= shots <= 56 for shots in stats["shots_to_win"]))
+
+
+class TestDensity(unittest.TestCase):
+    def test_density_game_never_repeats_shots(self):
+        game = Game(auto_place_computer(), ai="density")
+        shots = set()
+        hits = 0
+        while hits < 20:
+            r, c, hit, _ = game.computer_shot()
+            self.assertNotIn((r, c), shots)
+            shots.add((r, c))
+            hits += hit
+        self.assertLessEqual(len(shots), 100)
+
+    def test_density_prefers_centre_and_follows_hits(self):
+        targeter = DensityTargeter()
+        r, c = targeter.choose()
+        self.assertTrue(1 <= r <= 8 and 1 <= c <= 8)
+        targeter.update(0, 0, True)
+        self.assertIn(targeter.choose(), [(0, 1), (1, 0)])
+
+    def test_unknown_ai_mode(self):
+        with self.assertRaises(ValueError):
+            Game(create_board(), create_board(), ai="psychic")
+
 
 if __name__ == '__main__':
     unittest.main()
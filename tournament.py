@@ -0,0 +1,362 @@
+"""
+Турнир стратегий: круговые матчи в пуле процессов и рейтинг Эло.
+
+Каждая пара стратегий играет на одних и тех же расстановках: из зерна
+турнира строится ``layouts`` пар досок (:func:`make_layouts`), и на
+каждой паре досок играются две партии — стратегии меняются досками и
+правом первого хода. Так везение расстановки и первого хода
+взаимно гасится, а результат турнира полностью определяется зерном
+(кроме режимов с бюджетом времени, ``Game.TIMED_AI_MODES``).
+
+Партии раздаются пулу процессов задачами по ``chunk_size`` партий
+одной пары. Итог каждой задачи дописывается в файл контрольной точки
+(JSON, по строке на партию); при повторном запуске с тем же файлом
+уже сыгранные партии пропускаются, поэтому долгий турнир можно
+прервать и продолжить.
+
+Рейтинг считается по модели Брэдли — Терри (метод MM) в шкале Эло со
+средним :data:`ELO_BASE`. К каждой паре добавляется одна виртуальная
+ничья, чтобы рейтинг оставался конечным при разгромном счёте.
+Доверительные интервалы — процентили бутстрепа по партиям.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations
+
+from bitboard import BitBoard
+from fleet import generate_fleets
+from game import Game
+from rules import DEFAULT_RULES, Rules
+from simulate import play_game
+
+FORMAT = "tournament"
+VERSION = 1
+# Средний рейтинг участников.
+ELO_BASE = 1500.0
+# Число выборок бутстрепа и уровень доверия интервалов рейтинга.
+BOOTSTRAP = 200
+CONFIDENCE = 0.95
+
+
+def make_layouts(count, seed, rules=DEFAULT_RULES):
+    """
+    Строит общие для всех матчей расстановки.
+
+    :param count: Число пар досок.
+    :type count: int
+    :param seed: Зерно турнира.
+    :type seed: int
+    :param rules: Правила партий.
+    :type rules: Rules
+    :returns: Пары (маска доски 0, маска доски 1, зерно партии).
+    :rtype: list[tuple[int, int, int]]
+    """
+    rng = random.Random(seed)
+    masks = list(generate_fleets(2 * count, rules.fleet, rng=rng, width=rules.width, height=rules.height))
+    return [(masks[2 * k], masks[2 * k + 1], rng.getrandbits(64)) for k in range(count)]
+
+
+def _game_key(a, b, k, swap):
+    """
+    Возвращает ключ партии для контрольной точки.
+
+    :rtype: str
+    """
+    return f"{a}:{b}:{k}:{int(swap)}"
+
+
+def _play_chunk(a, b, games, rules=DEFAULT_RULES):
+    """
+    Играет серию партий пары стратегий в рабочем процессе.
+
+    :param a: Первая стратегия пары.
+    :type a: str
+    :param b: Вторая стратегия пары.
+    :type b: str
+    :param games: Партии: кортежи (ключ, маска доски 0, маска доски 1, зерно, swap).
+                  Без swap стратегия ``a`` получает доску 0 и ходит первой.
+    :type games: list[tuple[str, int, int, int, bool]]
+    :param rules: Правила партий.
+    :type rules: Rules
+    :returns: Кортежи (ключ, победившая стратегия, число её выстрелов).
+    :rtype: list[tuple[str, str, int]]
+    """
+    results = []
+    for key, first, second, seed, swap in games:
+        board_a = BitBoard(first, width=rules.width, height=rules.height).to_board()
+        board_b = BitBoard(second, width=rules.width, height=rules.height).to_board()
+        sides = (b, a) if swap else (a, b)
+        winner, shots = play_game(board_a, board_b, sides, seed, rules)
+        results.append((key, sides[winner], shots))
+    return results
+
+
+def _read_checkpoint(path, header):
+    """
+    Читает сыгранные партии из файла контрольной точки.
+
+    :param path: Путь к файлу.
+    :type path: str
+    :param header: Ожидаемый заголовок турнира.
+    :type header: dict
+    :returns: Итоги партий по ключам: (победившая стратегия, число выстрелов).
+    :rtype: dict[str, tuple[str, int]]
+    :raises ValueError: Если файл записан для другого турнира.
+    """
+    done = {}
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    if not lines:
+        return done
+    if json.loads(lines[0]) != header:
+        raise ValueError(f"Контрольная точка '{path}' записана для другого турнира")
+    for line in lines[1:]:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # Последняя строка могла оборваться при остановке турнира.
+            continue
+        done[entry["game"]] = (entry["winner"], entry["shots"])
+    return done
+
+
+def ratings(names, games, iterations=10000, tolerance=1e-10):
+    """
+    Считает рейтинги Эло по модели Брэдли — Терри.
+
+    :param names: Участники.
+    :type names: Sequence[str]
+    :param games: Партии: пары (победитель, проигравший).
+    :type games: Iterable[tuple[str, str]]
+    :param iterations: Наибольшее число итераций MM.
+    :type iterations: int
+    :param tolerance: Точность по относительному изменению силы.
+    :type tolerance: float
+    :returns: Рейтинг каждого участника.
+    :rtype: dict[str, float]
+    """
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    wins = [0.0] * n
+    played = [[0.0] * n for _ in range(n)]
+    for winner, loser in games:
+        i, j = index[winner], index[loser]
+        wins[i] += 1
+        played[i][j] += 1
+        played[j][i] += 1
+    for i, j in combinations(range(n), 2):
+        if played[i][j]:
+            wins[i] += 0.5
+            wins[j] += 0.5
+            played[i][j] += 1
+            played[j][i] += 1
+
+    strength = [1.0] * n
+    for _ in range(iterations):
+        updated = []
+        for i in range(n):
+            total = sum(played[i][j] / (strength[i] + strength[j]) for j in range(n) if played[i][j])
+            updated.append(wins[i] / total if total else strength[i])
+        scale = math.exp(sum(math.log(s) for s in updated) / n)
+        updated = [s / scale for s in updated]
+        change = max(abs(u - s) / s for u, s in zip(updated, strength))
+        strength = updated
+        if change < tolerance:
+            break
+    return {name: ELO_BASE + 400 * math.log10(strength[i]) for name, i in index.items()}
+
+
+def confidence_intervals(names, games, samples=BOOTSTRAP, confidence=CONFIDENCE, seed=0):
+    """
+    Оценивает доверительные интервалы рейтингов бутстрепом по партиям.
+
+    :param names: Участники.
+    :type names: Sequence[str]
+    :param games: Партии: пары (победитель, проигравший).
+    :type games: Sequence[tuple[str, str]]
+    :param samples: Число выборок бутстрепа.
+    :type samples: int
+    :param confidence: Уровень доверия.
+    :type confidence: float
+    :param seed: Зерно генератора выборок.
+    :type seed: int
+    :returns: Нижняя и верхняя граница рейтинга каждого участника.
+    :rtype: dict[str, tuple[float, float]]
+    """
+    rng = random.Random(seed)
+    games = list(games)
+    estimates = {name: [] for name in names}
+    for _ in range(samples):
+        resampled = [games[int(rng.random() * len(games))] for _ in games]
+        for name, elo in ratings(names, resampled, tolerance=1e-6).items():
+            estimates[name].append(elo)
+    tail = (1 - confidence) / 2
+    intervals = {}
+    for name, values in estimates.items():
+        values.sort()
+        low = values[int(tail * (len(values) - 1))]
+        high = values[int(math.ceil((1 - tail) * (len(values) - 1)))]
+        intervals[name] = (low, high)
+    return intervals
+
+
+def run_tournament(names, layouts=50, workers=None, seed=0, chunk_size=25, checkpoint=None,
+                   rules=DEFAULT_RULES):
+    """
+    Играет круговой турнир стратегий и считает рейтинги.
+
+    :param names: Стратегии (см. ``Game.AI_MODES``), не меньше двух разных.
+    :type names: Sequence[str]
+    :param layouts: Число пар досок; каждая пара стратегий играет на них 2 * layouts партий.
+    :type layouts: int
+    :param workers: Число рабочих процессов (None — по числу ядер, 1 — без пула).
+    :type workers: int | None
+    :param seed: Зерно турнира.
+    :type seed: int
+    :param chunk_size: Сколько партий отдаётся процессу за одну задачу.
+    :type chunk_size: int
+    :param checkpoint: Файл контрольной точки (None — без сохранения прогресса).
+    :type checkpoint: str | None
+    :param rules: Правила партий.
+    :type rules: Rules
+    :returns: Словарь со статистикой турнира.
+    :rtype: dict
+    :raises ValueError: Если стратегия неизвестна, стратегий меньше двух,
+                        layouts или chunk_size не положительные или контрольная
+                        точка записана для другого турнира.
+    """
+    names = list(dict.fromkeys(names))
+    for name in names:
+        if name not in Game.AI_MODES:
+            raise ValueError(f"Неизвестная стратегия: '{name}'")
+    if len(names) < 2:
+        raise ValueError("Для турнира нужны хотя бы две разные стратегии")
+    if layouts <= 0 or chunk_size <= 0:
+        raise ValueError("Число расстановок и размер задачи должны быть положительными")
+
+    header = {
+        "format": FORMAT, "version": VERSION, "strategies": names, "layouts": layouts, "seed": seed,
+        "rules": {"width": rules.width, "height": rules.height, "fleet": list(rules.fleet)},
+    }
+    done = {}
+    if checkpoint is not None and os.path.exists(checkpoint):
+        done = _read_checkpoint(checkpoint, header)
+    resumed = len(done)
+
+    boards = make_layouts(layouts, seed, rules)
+    chunks = []
+    for a, b in combinations(names, 2):
+        pending = [
+            (_game_key(a, b, k, swap), first, second, game_seed, swap)
+            for k, (first, second, game_seed) in enumerate(boards)
+            for swap in (False, True)
+            if _game_key(a, b, k, swap) not in done
+        ]
+        for start in range(0, len(pending), chunk_size):
+            chunks.append((a, b, pending[start:start + chunk_size], rules))
+
+    log = None
+    if checkpoint is not None:
+        log = open(checkpoint, "a+", encoding="utf-8")
+        if log.tell() == 0:
+            log.write(json.dumps(header) + "\n")
+        else:
+            # Оборванная последняя строка не должна склеиться со следующей записью.
+            log.seek(log.tell() - 1)
+            if log.read(1) != "\n":
+                log.write("\n")
+
+    def record(results):
+        for key, winner, shots in results:
+            done[key] = (winner, shots)
+            if log is not None:
+                log.write(json.dumps({"game": key, "winner": winner, "shots": shots}) + "\n")
+        if log is not None:
+            log.flush()
+
+    start = time.perf_counter()
+    try:
+        if workers == 1:
+            for chunk in chunks:
+                record(_play_chunk(*chunk))
+        elif chunks:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_play_chunk, *chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    record(future.result())
+    finally:
+        if log is not None:
+            log.close()
+    elapsed = time.perf_counter() - start
+
+    games = []
+    shots_to_win = {name: 0 for name in names}
+    pairs = {}
+    for a, b in combinations(names, 2):
+        score = pairs[f"{a} vs {b}"] = {a: 0, b: 0}
+        for k in range(layouts):
+            for swap in (False, True):
+                winner, shots = done[_game_key(a, b, k, swap)]
+                loser = b if winner == a else a
+                games.append((winner, loser))
+                score[winner] += 1
+                shots_to_win[winner] += shots
+
+    elo = ratings(names, games)
+    intervals = confidence_intervals(names, games, seed=seed)
+    standings = {}
+    for name in sorted(names, key=elo.get, reverse=True):
+        wins = sum(winner == name for winner, _ in games)
+        standings[name] = {
+            "elo": round(elo[name], 1),
+            "ci": [round(intervals[name][0], 1), round(intervals[name][1], 1)],
+            "games": 2 * layouts * (len(names) - 1),
+            "wins": wins,
+            "mean_shots_to_win": shots_to_win[name] / wins if wins else None,
+        }
+    return {
+        "strategies": standings,
+        "pairs": pairs,
+        "games": len(games),
+        "played": len(games) - resumed,
+        "resumed": resumed,
+        "elapsed": elapsed,
+        "confidence": CONFIDENCE,
+    }
+
+
+def main():
+    """
+    Точка входа для запуска турнира из командной строки.
+
+    Печатает итоги турнира в формате JSON.
+    """
+    parser = argparse.ArgumentParser(description="Круговой турнир стратегий стрельбы")
+    parser.add_argument("strategies", nargs="*", default=["classic", "parity", "density"],
+                        choices=Game.AI_MODES, help="стратегии-участники")
+    parser.add_argument("-n", "--layouts", type=int, default=50, help="пар досок на каждую пару стратегий")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="число процессов")
+    parser.add_argument("--chunk-size", type=int, default=25, help="партий на задачу")
+    parser.add_argument("--seed", type=int, default=0, help="зерно турнира")
+    parser.add_argument("--checkpoint", default=None,
+                        help="файл контрольной точки; повторный запуск продолжает турнир")
+    parser.add_argument("--width", type=int, default=DEFAULT_RULES.width, help="ширина доски")
+    parser.add_argument("--height", type=int, default=DEFAULT_RULES.height, help="высота доски")
+    parser.add_argument("--fleet", default=",".join(map(str, DEFAULT_RULES.fleet)),
+                        help="длины кораблей через запятую")
+    args = parser.parse_args()
+
+    rules = Rules(args.width, args.height, tuple(map(int, args.fleet.split(","))))
+    stats = run_tournament(args.strategies, args.layouts, args.workers, args.seed, args.chunk_size,
+                           args.checkpoint, rules)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
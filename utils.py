@@ -1,16 +1,21 @@
-import random
+import sys
 
-LETTERS = "АБВГДЕЖЗИК"
+from bitboard import BitBoard
+from fleet import generate_fleet
+from placements import FLEET
+from rules import DEFAULT_RULES, LETTERS
 
 
-def create_board():
+def create_board(rules=DEFAULT_RULES):
     """
-    Создаёт пустую игровую доску размером 10x10.
+    Создаёт пустую игровую доску (по умолчанию 10x10).
 
-    :returns: Двумерный список 10x10, заполненный символом '~'.
+    :param rules: Правила партии, задающие размер доски.
+    :type rules: Rules
+    :returns: Двумерный список, заполненный символом '~'.
     :rtype: list[list[str]]
     """
-    return [["~"] * 10 for _ in range(10)]
+    return rules.create_board()
 
 
 def can_place(board, row, col, size, horizontal):
@@ -19,9 +24,9 @@ def can_place(board, row, col, size, horizontal):
 
     :param board: Игровая доска.
     :type board: list[list[str]]
-    :param row: Начальная строка (0-9).
+    :param row: Начальная строка (с 0).
     :type row: int
-    :param col: Начальный столбец (0-9).
+    :param col: Начальный столбец (с 0).
     :type col: int
     :param size: Длина корабля.
     :type size: int
@@ -31,18 +36,19 @@ def can_place(board, row, col, size, horizontal):
     :rtype: bool
     :raises: Никаких исключений не выбрасывается.
     """
+    height, width = len(board), len(board[0])
     if horizontal:
-        if col + size > 10:
+        if col + size > width:
             return False
-        for i in range(max(0, row - 1), min(10, row + 2)):
-            for j in range(max(0, col - 1), min(10, col + size + 1)):
+        for i in range(max(0, row - 1), min(height, row + 2)):
+            for j in range(max(0, col - 1), min(width, col + size + 1)):
                 if board[i][j] == "S":
                     return False
     else:
-        if row + size > 10:
+        if row + size > height:
             return False
-        for i in range(max(0, row - 1), min(10, row + size + 1)):
-            for j in range(max(0, col - 1), min(10, col + 2)):
+        for i in range(max(0, row - 1), min(height, row + size + 1)):
+            for j in range(max(0, col - 1), min(width, col + 2)):
                 if board[i][j] == "S":
                     return False
     return True
@@ -54,9 +60,9 @@ def place_ship(board, row, col, size, horizontal):
 
     :param board: Игровая доска.
     :type board: list[list[str]]
-    :param row: Начальная строка (0-9).
+    :param row: Начальная строка (с 0).
     :type row: int
-    :param col: Начальный столбец (0-9).
+    :param col: Начальный столбец (с 0).
     :type col: int
     :param size: Длина корабля.
     :type size: int
@@ -88,6 +94,7 @@ def find_ship_cells(board, row, col):
     :rtype: list[tuple[int, int]]
     :raises: Никаких исключений не выбрасывается.
     """
+    height, width = len(board), len(board[0])
     cells = []
     stack = [(row, col)]
     visited = set()
@@ -102,7 +109,7 @@ def find_ship_cells(board, row, col):
             cells.append((r, c))
             for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
                 nr, nc = r + dr, c + dc
-                if 0 <= nr < 10 and 0 <= nc < 10 and (nr, nc) not in visited:
+                if 0 <= nr < height and 0 <= nc < width and (nr, nc) not in visited:
                     stack.append((nr, nc))
 
     return cells
@@ -118,18 +125,40 @@ def mark_around_sunk(board, row, col):
     :type row: int
     :param col: Столбец любой клетки потопленного корабля.
     :type col: int
-    :returns: None (функция изменяет переданную доску).
-    :rtype: None
+    :returns: Список клеток, помеченных этим вызовом (функция изменяет переданную доску).
+    :rtype: list[tuple[int, int]]
+    :raises: Никаких исключений не выбрасывается.
+    """
+    return mark_around(board, find_ship_cells(board, row, col))
+
+
+def mark_around(board, cells):
+    """
+    Помечает пустые клетки вокруг заданных клеток корабля как промахи ('O').
+
+    В отличие от :func:`mark_around_sunk` не ищет корабль на доске, а
+    принимает его клетки готовыми (например, из реестра кораблей).
+
+    :param board: Игровая доска.
+    :type board: list[list[str]]
+    :param cells: Клетки корабля.
+    :type cells: Iterable[tuple[int, int]]
+    :returns: Список клеток, помеченных этим вызовом (функция изменяет переданную доску).
+    :rtype: list[tuple[int, int]]
     :raises: Никаких исключений не выбрасывается.
     """
-    cells = find_ship_cells(board, row, col)
+    height, width = len(board), len(board[0])
+    marked = []
 
     for r, c in cells:
         for dr in [-1, 0, 1]:
             for dc in [-1, 0, 1]:
                 nr, nc = r + dr, c + dc
-                if 0 <= nr < 10 and 0 <= nc < 10 and board[nr][nc] == "~":
+                if 0 <= nr < height and 0 <= nc < width and board[nr][nc] == "~":
                     board[nr][nc] = "O"
+                    marked.append((nr, nc))
+
+    return marked
 
 
 def count_ships(board):
@@ -142,11 +171,12 @@ def count_ships(board):
     :rtype: int
     :raises: Никаких исключений не выбрасывается.
     """
+    height, width = len(board), len(board[0])
     visited = set()
     count = 0
 
-    for i in range(10):
-        for j in range(10):
+    for i in range(height):
+        for j in range(width):
             if board[i][j] == "S" and (i, j) not in visited:
                 count += 1
                 stack = [(i, j)]
@@ -158,20 +188,22 @@ def count_ships(board):
                     if board[r][c] == "S":
                         for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
                             nr, nc = r + dr, c + dc
-                            if 0 <= nr < 10 and 0 <= nc < 10 and (nr, nc) not in visited:
+                            if 0 <= nr < height and 0 <= nc < width and (nr, nc) not in visited:
                                 stack.append((nr, nc))
 
     return count
 
 
-def coord_to_index(letter, number):
+def coord_to_index(letter, number, rules=DEFAULT_RULES):
     """
     Преобразует буквенно-цифровые координаты в индексы строки и столбца.
 
-    :param letter: Буква строки (от 'А' до 'К').
+    :param letter: Обозначение строки (на доске 10x10 — от 'А' до 'К').
     :type letter: str
-    :param number: Номер столбца (от 1 до 10).
+    :param number: Номер столбца (от 1 до ширины доски).
     :type number: int | float
+    :param rules: Правила партии, задающие размер доски.
+    :type rules: Rules
     :returns: Кортеж (row, col) или None, если координаты некорректны.
     :rtype: tuple[int, int] | None
     :raises: Никаких исключений не выбрасывается.
@@ -181,52 +213,87 @@ def coord_to_index(letter, number):
     if not isinstance(number, int):
         return None
 
-    letter = letter.upper().strip()
-
-    if letter not in LETTERS:
-        return None
-    if not 1 <= number <= 10:
-        return None
-
-    return (LETTERS.index(letter), int(number) - 1)
+    return rules.coord(letter, number)
 
 
-def auto_place_computer():
+def auto_place_computer(rng=None, rules=DEFAULT_RULES):
     """
     Автоматически расставляет корабли для компьютера.
 
-    :returns: Игровая доска с расставленными кораблями или None, если расстановка не удалась.
-    :rtype: list[list[str]] | None
+    Расстановка строится генератором :func:`fleet.generate_fleet`, который
+    всегда находит допустимую расстановку за ограниченное время.
+
+    :param rng: Генератор случайных чисел (по умолчанию — модуль ``random``).
+    :type rng: random.Random | None
+    :param rules: Правила партии: размер доски и состав флота.
+    :type rules: Rules
+    :returns: Игровая доска с расставленными кораблями.
+    :rtype: list[list[str]]
     :raises: Никаких исключений не выбрасывается.
     """
-    board = create_board()
-    ships = [4, 3, 3, 2, 2, 2, 1, 1, 1, 1]
+    ships = generate_fleet(rules.fleet, rng=rng, width=rules.width, height=rules.height)
+    return BitBoard(ships, width=rules.width, height=rules.height).to_board()
 
-    for size in ships:
-        placed = False
-        attempts = 0
-        while not placed and attempts < 1000:
-            h = random.choice([True, False])
-            r = random.randint(0, 9)
-            c = random.randint(0, 10 - size) if h else random.randint(0, 9)
 
-            if can_place(board, r, c, size, h):
-                place_ship(board, r, c, size, h)
-                placed = True
-            attempts += 1
+def parse_board(lines, rules=DEFAULT_RULES):
+    """
+    Разбирает доску из строк текста (формат ``save_board``).
 
-        if not placed:
-            return None
+    :param lines: Строки доски без символов перевода строки.
+    :type lines: list[str]
+    :param rules: Правила партии, задающие размер доски.
+    :type rules: Rules
+    :returns: Доска.
+    :rtype: list[list[str]]
+    :raises ValueError: Если строки не образуют доску нужного размера из символов '~' и 'S'.
+    """
+    if len(lines) != rules.height:
+        raise ValueError(f"Ожидается {rules.height} строк, получено {len(lines)}")
+
+    board = []
+    for line in lines:
+        if len(line) != rules.width:
+            raise ValueError(f"Ожидается {rules.width} символов в строке, получено {len(line)}")
+        row = list(line)
+        for cell in row:
+            if cell not in ["~", "S"]:
+                raise ValueError(f"Недопустимый символ в доске: '{cell}'")
+        board.append(row)
 
     return board
 
 
-def load_board(filename):
+def check_board(board, rules=DEFAULT_RULES):
+    """
+    Проверяет, что board — доска нужного размера из допустимых символов.
+
+    :param board: Игровая доска.
+    :type board: list[list[str]]
+    :param rules: Правила партии, задающие размер доски.
+    :type rules: Rules
+    :returns: None
+    :rtype: None
+    :raises ValueError: Если board не является корректной доской.
+    """
+    if not isinstance(board, list) or len(board) != rules.height:
+        raise ValueError(f"Доска должна быть списком из {rules.height} строк")
+
+    for row in board:
+        if not isinstance(row, list) or len(row) != rules.width:
+            raise ValueError(f"Каждая строка доски должна быть списком из {rules.width} символов")
+        for cell in row:
+            if cell not in ['~', 'S', 'X', 'O']:
+                raise ValueError(f"Недопустимый символ в доске: '{cell}'")
+
+
+def load_board(filename, rules=DEFAULT_RULES):
     """
     Загружает доску из файла.
 
     :param filename: Имя файла для загрузки.
     :type filename: str
+    :param rules: Правила партии, задающие размер доски.
+    :type rules: Rules
     :returns: Загруженная доска или None, если произошла ошибка.
     :rtype: list[list[str]] | None
     :raises: Исключения перехватываются внутри функции.
@@ -235,25 +302,12 @@ def load_board(filename):
         with open(filename, "r") as f:
             lines = [line.strip() for line in f]
 
-        if len(lines) != 10:
-            return None
-
-        board = []
-        for line in lines:
-            if len(line) != 10:
-                return None
-            row = list(line)
-            for cell in row:
-                if cell not in ["~", "S"]:
-                    return None
-            board.append(row)
-
-        return board
+        return parse_board(lines, rules)
     except:
         return None
 
 
-def save_board(board, filename):
+def save_board(board, filename, rules=DEFAULT_RULES):
     """
     Сохраняет доску в файл.
 
@@ -261,21 +315,15 @@ def save_board(board, filename):
     :type board: list[list[str]]
     :param filename: Имя файла для сохранения.
     :type filename: str
+    :param rules: Правила партии, задающие размер доски.
+    :type rules: Rules
     :returns: True, если сохранение успешно.
     :rtype: bool
     :raises IOError: При ошибке записи в файл.
     :raises ValueError: Если board не является корректной доской.
     """
     # Проверка корректности доски
-    if not isinstance(board, list) or len(board) != 10:
-        raise ValueError("Доска должна быть списком из 10 строк")
-
-    for row in board:
-        if not isinstance(row, list) or len(row) != 10:
-            raise ValueError("Каждая строка доски должна быть списком из 10 символов")
-        for cell in row:
-            if cell not in ['~', 'S', 'X', 'O']:
-                raise ValueError(f"Недопустимый символ в доске: '{cell}'")
+    check_board(board, rules)
 
     # Попытка записи
     try:
@@ -286,3 +334,114 @@ def save_board(board, filename):
     except (IOError, OSError, PermissionError) as e:
         # Преобразуем файловые ошибки в наше исключение
         raise IOError(f"Ошибка записи в файл '{filename}': {str(e)}")
+
+
+def read_boards(source, rules=DEFAULT_RULES):
+    """
+    Потоково читает много досок из одного файла или потока.
+
+    Доски записываются подряд в формате ``save_board`` и разделяются
+    пустыми строками. В памяти одновременно находится не больше одной
+    доски, а каждая доска проверяется отдельно: ошибка в одной записи не
+    прерывает чтение остальных.
+
+    :param source: Имя файла, открытый текстовый поток или "-" для stdin.
+    :type source: str | io.TextIOBase
+    :param rules: Правила партии, задающие размер доски.
+    :type rules: Rules
+    :returns: Генератор кортежей (line, board, error): номер первой строки
+              записи (с 1), доска (None при ошибке) и текст ошибки (None, если
+              запись корректна).
+    :rtype: Iterator[tuple[int, list[list[str]] | None, str | None]]
+    :raises IOError: Если файл не удаётся открыть.
+    """
+    if source == "-":
+        stream, owned = sys.stdin, False
+    elif isinstance(source, str):
+        try:
+            stream, owned = open(source, "r", encoding="utf-8"), True
+        except OSError as e:
+            raise IOError(f"Ошибка чтения файла '{source}': {str(e)}")
+    else:
+        stream, owned = source, False
+
+    try:
+        start = None
+        lines = []
+        overflow = False
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if line:
+                if start is None:
+                    start = number
+                if len(lines) <= rules.height:
+                    lines.append(line)
+                else:
+                    overflow = True
+                continue
+            if start is not None:
+                yield _board_record(start, lines, overflow, rules)
+                start, lines, overflow = None, [], False
+        if start is not None:
+            yield _board_record(start, lines, overflow, rules)
+    finally:
+        if owned:
+            stream.close()
+
+
+def _board_record(start, lines, overflow, rules):
+    """
+    Превращает накопленные строки в запись для :func:`read_boards`.
+
+    :rtype: tuple[int, list[list[str]] | None, str | None]
+    """
+    if overflow:
+        return start, None, "Слишком много строк в записи"
+    try:
+        return start, parse_board(lines, rules), None
+    except ValueError as e:
+        return start, None, str(e)
+
+
+def write_boards(boards, target, rules=DEFAULT_RULES):
+    """
+    Потоково записывает много досок в один файл или поток.
+
+    Доски разделяются пустой строкой, поэтому результат читается
+    функцией :func:`read_boards`.
+
+    :param boards: Игровые доски.
+    :type boards: Iterable[list[list[str]]]
+    :param target: Имя файла, открытый текстовый поток или "-" для stdout.
+    :type target: str | io.TextIOBase
+    :param rules: Правила партии, задающие размер доски.
+    :type rules: Rules
+    :returns: Количество записанных досок.
+    :rtype: int
+    :raises IOError: При ошибке записи в файл.
+    :raises ValueError: Если очередная доска некорректна.
+    """
+    if target == "-":
+        stream, owned = sys.stdout, False
+    elif isinstance(target, str):
+        try:
+            stream, owned = open(target, "w", encoding="utf-8"), True
+        except OSError as e:
+            raise IOError(f"Ошибка записи в файл '{target}': {str(e)}")
+    else:
+        stream, owned = target, False
+
+    count = 0
+    try:
+        for board in boards:
+            check_board(board, rules)
+            stream.write("\n".join("".join(row) for row in board) + "\n\n")
+            count += 1
+    except OSError as e:
+        raise IOError(f"Ошибка записи в файл '{target}': {str(e)}")
+    finally:
+        if owned:
+            stream.close()
+        else:
+            stream.flush()
+    return count
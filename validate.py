@@ -0,0 +1,193 @@
+"""
+Проверка допустимости расстановки флота.
+
+Расстановка корректна, если каждый корабль — прямая линия клеток,
+корабли не касаются друг друга даже углами, а состав флота совпадает с
+заданным (по умолчанию 1×4, 2×3, 3×2, 4×1). Все три проверки выполняются
+за один проход по кораблям битовой маски. Для больших корпусов есть
+пакетный режим, который распределяет проверку по пулу процессов.
+"""
+
+import argparse
+import os
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import SIZE, BitBoard, iter_cells, neighbourhood, split_ships
+from corpus import Corpus
+from placements import FLEET
+from utils import read_boards
+
+FleetError = namedtuple("FleetError", ["code", "message", "cells"])
+FleetError.__doc__ = """
+Ошибка в расстановке флота.
+
+:ivar code: Вид ошибки: "shape" (корабль не прямой), "touching" (корабли
+            касаются), "missing" (не хватает кораблей), "extra" (лишние корабли)
+            или "symbols" (недопустимые символы, только в пакетном режиме).
+:ivar message: Описание ошибки.
+:ivar cells: Клетки, к которым относится ошибка.
+"""
+
+
+def validate_fleet(board, fleet=FLEET, width=SIZE, height=SIZE):
+    """
+    Проверяет расстановку флота.
+
+    :param board: Доска (список списков символов) или маска кораблей.
+    :type board: list[list[str]] | int
+    :param fleet: Ожидаемые длины кораблей.
+    :type fleet: Iterable[int]
+    :param width: Ширина доски (для маски).
+    :type width: int
+    :param height: Высота доски (для маски).
+    :type height: int
+    :returns: Список ошибок; пустой список, если расстановка корректна.
+    :rtype: list[FleetError]
+    :raises ValueError: Если на доске встречается недопустимый символ.
+    """
+    if isinstance(board, int):
+        ships = board
+    else:
+        bb = BitBoard.from_board(board)
+        ships, width, height = bb.ships, bb.width, bb.height
+
+    errors = []
+    sizes = Counter()
+    for ship in split_ships(ships, width, height):
+        cells = list(iter_cells(ship, width))
+        if len({r for r, _ in cells}) > 1 and len({c for _, c in cells}) > 1:
+            errors.append(FleetError("shape", "Корабль должен быть прямой линией", cells))
+        else:
+            sizes[len(cells)] += 1
+        # Корабли, касающиеся сторонами, уже слились в одну фигуру выше,
+        # поэтому здесь остаются только касания углами.
+        if neighbourhood(ship, width, height) & ships & ~ship:
+            errors.append(FleetError("touching", "Корабль касается другого корабля", cells))
+
+    expected = Counter(fleet)
+    for size in sorted(set(expected) | set(sizes), reverse=True):
+        diff = sizes[size] - expected[size]
+        if diff < 0:
+            errors.append(FleetError("missing", f"Не хватает кораблей длины {size}: {-diff}", []))
+        elif diff > 0:
+            errors.append(FleetError("extra", f"Лишние корабли длины {size}: {diff}", []))
+    return errors
+
+
+def _validate_chunk(items, fleet, width, height):
+    """
+    Проверяет пачку расстановок в рабочем процессе.
+
+    :rtype: list[list[FleetError]]
+    """
+    results = []
+    for item in items:
+        try:
+            results.append(validate_fleet(item, fleet, width, height))
+        except ValueError as e:
+            results.append([FleetError("symbols", str(e), [])])
+    return results
+
+
+def validate_many(boards, fleet=FLEET, workers=None, chunk_size=2000, width=SIZE, height=SIZE):
+    """
+    Проверяет много расстановок в пуле процессов.
+
+    Расстановки отдаются процессам пачками, результаты возвращаются в
+    исходном порядке по мере готовности.
+
+    :param boards: Доски или маски кораблей.
+    :type boards: Iterable[list[list[str]] | int]
+    :param fleet: Ожидаемые длины кораблей.
+    :type fleet: Iterable[int]
+    :param workers: Число процессов (None — по числу ядер, 1 — без пула).
+    :type workers: int | None
+    :param chunk_size: Размер пачки.
+    :type chunk_size: int
+    :param width: Ширина доски (для масок).
+    :type width: int
+    :param height: Высота доски (для масок).
+    :type height: int
+    :returns: Генератор кортежей (index, errors) для каждой расстановки.
+    :rtype: Iterator[tuple[int, list[FleetError]]]
+    """
+    fleet = tuple(fleet)
+
+    def chunks():
+        chunk = []
+        for item in boards:
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    index = 0
+    if workers == 1:
+        for chunk in chunks():
+            for errors in _validate_chunk(chunk, fleet, width, height):
+                yield index, errors
+                index += 1
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        limit = 2 * (workers or os.cpu_count() or 1)
+        for chunk in chunks():
+            pending.append(pool.submit(_validate_chunk, chunk, fleet, width, height))
+            # Ограничиваем число пачек в работе, чтобы не держать весь корпус в памяти.
+            while len(pending) >= limit:
+                for errors in pending.pop(0).result():
+                    yield index, errors
+                    index += 1
+        for future in pending:
+            for errors in future.result():
+                yield index, errors
+                index += 1
+
+
+def main():
+    """
+    Проверка корпуса или текстовых файлов с досками из командной строки.
+
+    Печатает найденные ошибки и итоговую сводку.
+    """
+    parser = argparse.ArgumentParser(description="Проверка расстановок флота")
+    parser.add_argument("source", help="корпус (.sbc) или текстовый файл с досками ('-' — stdin)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="число процессов")
+    args = parser.parse_args()
+
+    if args.source.endswith(".sbc"):
+        corpus = Corpus(args.source)
+        items = iter(corpus)
+        labels = None
+        width, height = corpus.width, corpus.height
+    else:
+        labels = []
+        width = height = SIZE
+
+        def boards():
+            for line, board, error in read_boards(args.source):
+                if error is not None:
+                    print(f"строка {line}: {error}")
+                    continue
+                labels.append(line)
+                yield board
+
+        items = boards()
+
+    total = bad = 0
+    for index, errors in validate_many(items, workers=args.workers, width=width, height=height):
+        total += 1
+        if errors:
+            bad += 1
+            where = f"строка {labels[index]}" if labels is not None else f"запись {index}"
+            for error in errors:
+                print(f"{where}: {error.message}")
+    print(f"Проверено: {total}, с ошибками: {bad}")
+
+
+if __name__ == "__main__":
+    main()
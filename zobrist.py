@@ -0,0 +1,253 @@
+"""
+Хеши Зобриста видимого состояния доски и кэш решений ИИ.
+
+Противник видит на доске только промахи (``O``) и попадания (``X``);
+корабли (``S``) для него неотличимы от воды. Каждой паре (клетка,
+видимое значение) сопоставлен случайный 64-битный ключ, а хеш доски —
+XOR ключей всех открытых клеток. Клетка открывается один раз, поэтому
+после выстрела хеш обновляется одним XOR (см. ``Game._set``), а
+потопленные корабли отдельно учитывать не нужно: корабль потоплен
+ровно тогда, когда вокруг его попаданий не осталось закрытых клеток.
+
+Ключи берутся из генератора с постоянным зерном и совпадают во всех
+процессах и запусках, поэтому хеши можно сохранять на диск.
+
+Решения ИИ, которые зависят только от видимого состояния (карты
+вероятностей ``endgame`` и ``montecarlo``), хранятся в ограниченном
+кэше :class:`DecisionCache` с вытеснением давно не использованных
+записей. Кэш можно сохранить в файл и загрузить при следующем запуске
+(у ``simulate.py`` и сервера — ключ ``--cache``).
+"""
+
+import json
+import os
+import random
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# Зерно генератора ключей; его изменение делает недействительными сохранённые кэши.
+SEED = 0x5EA_BA77
+# Наибольшее число записей в кэше решений по умолчанию.
+MAXSIZE = 4096
+
+FORMAT = "decisions"
+VERSION = 1
+
+
+@lru_cache(maxsize=None)
+def keys(cells):
+    """
+    Возвращает ключи Зобриста доски из ``cells`` клеток.
+
+    :param cells: Число клеток доски.
+    :type cells: int
+    :returns: Кортеж (ключи промахов, ключи попаданий) по индексам клеток.
+    :rtype: tuple[tuple[int, ...], tuple[int, ...]]
+    """
+    rng = random.Random(SEED)
+    misses = tuple(rng.getrandbits(64) for _ in range(cells))
+    hits = tuple(rng.getrandbits(64) for _ in range(cells))
+    return misses, hits
+
+
+def board_hash(board):
+    """
+    Считает хеш видимого состояния доски с нуля.
+
+    :param board: Игровая доска.
+    :type board: list[list[str]]
+    :rtype: int
+    """
+    width = len(board[0])
+    misses, hits = keys(len(board) * width)
+    h = 0
+    for r, row in enumerate(board):
+        for c, cell in enumerate(row):
+            if cell == "O":
+                h ^= misses[r * width + c]
+            elif cell == "X":
+                h ^= hits[r * width + c]
+    return h
+
+
+def _freeze(value):
+    """
+    Превращает списки, прочитанные из JSON, обратно в кортежи.
+    """
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class DecisionCache:
+    """
+    Ограниченный кэш решений ИИ с вытеснением давно не использованных записей.
+
+    Ключ — кортеж из вида решения, правил и хеша видимой доски, значение —
+    кортеж чисел. Методы потокобезопасны: сервер считает ходы в пуле потоков.
+
+    :ivar maxsize: Наибольшее число записей.
+    :vartype maxsize: int
+    :ivar hits: Число найденных записей.
+    :vartype hits: int
+    :ivar misses: Число промахов кэша.
+    :vartype misses: int
+    :ivar evictions: Число вытесненных записей.
+    :vartype evictions: int
+    """
+
+    def __init__(self, maxsize=MAXSIZE):
+        """
+        Конструктор класса DecisionCache.
+
+        :param maxsize: Наибольшее число записей.
+        :type maxsize: int
+        :raises ValueError: Если maxsize не положительный.
+        """
+        if maxsize < 1:
+            raise ValueError("Размер кэша должен быть положительным")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Возвращает число записей в кэше.
+
+        :rtype: int
+        """
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        Возвращает значение по ключу и отмечает запись как недавно использованную.
+
+        :param key: Ключ решения.
+        :type key: tuple
+        :returns: Значение или None, если записи нет.
+        :rtype: tuple | None
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Добавляет запись, при переполнении вытесняя самую давнюю.
+
+        :param key: Ключ решения.
+        :type key: tuple
+        :param value: Значение (кортеж чисел и кортежей).
+        :type value: tuple
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def items(self):
+        """
+        Возвращает записи от самой давней к самой свежей.
+
+        :rtype: list[tuple[tuple, tuple]]
+        """
+        with self._lock:
+            return list(self._entries.items())
+
+    def update(self, items):
+        """
+        Добавляет записи (например, собранные в другом процессе) по порядку.
+
+        :param items: Пары (ключ, значение).
+        :type items: Iterable[tuple[tuple, tuple]]
+        """
+        for key, value in items:
+            self.put(key, value)
+
+    def clear(self):
+        """
+        Удаляет все записи и обнуляет счётчики.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """
+        Возвращает счётчики кэша.
+
+        :returns: Словарь с ключами size, maxsize, hits, misses, evictions.
+        :rtype: dict[str, int]
+        """
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def save(self, path):
+        """
+        Сохраняет записи в файл JSON; файл заменяется целиком.
+
+        :param path: Путь к файлу.
+        :type path: str
+        """
+        data = {"format": FORMAT, "version": VERSION, "seed": SEED, "entries": self.items()}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """
+        Загружает записи из файла, сохранённого :meth:`save`.
+
+        :param path: Путь к файлу.
+        :type path: str
+        :returns: Число загруженных записей.
+        :rtype: int
+        :raises ValueError: Если файл не является кэшем решений или сохранён
+                            с другими ключами Зобриста.
+        """
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except ValueError:
+                raise ValueError(f"Файл '{path}' не является кэшем решений") from None
+        if not isinstance(data, dict) or data.get("format") != FORMAT or data.get("version") != VERSION:
+            raise ValueError(f"Файл '{path}' не является кэшем решений")
+        if data.get("seed") != SEED:
+            raise ValueError(f"Кэш решений '{path}' построен с другими ключами")
+        entries = data.get("entries", [])
+        self.update((_freeze(key), _freeze(value)) for key, value in entries)
+        return len(entries)
+
+    def warm(self, path):
+        """
+        Загружает записи из файла, если он существует (прогрев при запуске).
+
+        :param path: Путь к файлу.
+        :type path: str
+        :returns: Число загруженных записей.
+        :rtype: int
+        """
+        if not os.path.exists(path):
+            return 0
+        return self.load(path)
+
+
+# Общий кэш решений процесса; его используют партии ``Game``.
+CACHE = DecisionCache()